@@ -8,6 +8,7 @@ Uses GitHub token from .env file.
 import os
 import json
 import csv
+import sys
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 from urllib.parse import urljoin
@@ -16,6 +17,10 @@ import requests
 from dotenv import load_dotenv
 from tqdm import tqdm
 
+# repo_tree.py lives in rust-ci and is shared with the Rust scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "rust-ci"))
+from repo_tree import get_repo_trees
+
 # Load environment variables
 load_dotenv()
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
@@ -91,21 +96,9 @@ EXCLUDE_PATTERNS = [
 
 
 def get_repo_files(owner: str, repo: str, timeout: int = 10) -> List[str]:
-    """Get list of files in the repository."""
+    """Get list of files in the repository (default branch, one cached tree listing per SHA)."""
     try:
-        url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/main?recursive=1"
-        response = requests.get(url, headers=headers, timeout=timeout)
-        
-        if response.status_code == 404:
-            # Try master branch
-            url = url.replace("/main?", "/master?")
-            response = requests.get(url, headers=headers, timeout=timeout)
-        
-        if response.status_code == 200:
-            data = response.json()
-            files = [item["path"].lower() for item in data.get("tree", []) if item["type"] == "blob"]
-            return files
-        return []
+        return [path.lower() for path in get_repo_trees().tree(owner, repo).files()]
     except Exception as e:
         print(f"Error fetching files for {owner}/{repo}: {e}")
         return []
@@ -47,6 +47,54 @@ def get_bug_issues(owner, repo, ci_date):
     
     return result
 
+# COUNT_MODE = "search" counts bug-like issues server-side: two search/issues
+# requests per repo instead of paging through every issue. Search matches
+# whole words (at most five OR operators per query, so 'hang', 'freeze',
+# 'not working' and 'does not work' are dropped), so its counts only
+# approximate the keyword-in-body heuristic above; "scan" keeps that heuristic.
+COUNT_MODE = "scan"
+SEARCH_KEYWORDS = ['bug', 'error', 'crash', 'fail', 'broken', 'exception']
+
+SEARCH_RETRIES = 5
+
+def rate_limit_wait(resp):
+    """Seconds to wait if resp is a rate-limit response, else None (e.g. a permission 403)."""
+    if resp.status_code not in (403, 429):
+        return None
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return int(retry_after)
+    reset = resp.headers.get("X-RateLimit-Reset")
+    if resp.headers.get("X-RateLimit-Remaining") == "0" and reset and reset.isdigit():
+        return max(1, int(reset) - int(datetime.now().timestamp()) + 1)
+    if resp.status_code == 429 or "rate limit" in resp.text.lower():
+        return 60
+    return None
+
+def search_total(query):
+    for attempt in range(1, SEARCH_RETRIES + 1):
+        resp = requests.get("https://api.github.com/search/issues", headers=HEADERS,
+                            params={"q": query, "per_page": 1}, timeout=30)
+        wait = rate_limit_wait(resp)
+        if wait is not None and attempt < SEARCH_RETRIES:
+            print(f"Rate limited; retrying search in {wait}s...")
+            sleep(min(wait, 900))
+            continue
+        resp.raise_for_status()
+        data = resp.json()
+        if data.get("incomplete_results"):
+            raise RuntimeError(f"incomplete search results for: {query}")
+        sleep(2)  # search API allows 30 requests per minute
+        return data["total_count"]
+
+def search_bug_issues(owner, repo, ci_date):
+    query = f"repo:{owner}/{repo} is:issue in:title,body " + " OR ".join(SEARCH_KEYWORDS)
+    day = ci_date.strftime("%Y-%m-%d")
+    return {
+        "before": search_total(f"{query} created:<{day}"),
+        "after": search_total(f"{query} created:>={day}"),
+    }
+
 # Load project list
 df = pd.read_csv("data/1_github_projects_stats.csv")
 results = []
@@ -65,7 +113,10 @@ for _, row in df.iterrows():
         owner, repo = path[0], path[1]
         print(f"Processing {owner}/{repo}...")
 
-        stats = get_bug_issues(owner, repo, ci_date)
+        if COUNT_MODE == "search":
+            stats = search_bug_issues(owner, repo, ci_date)
+        else:
+            stats = get_bug_issues(owner, repo, ci_date)
         results.append({
             "Project": project,
             "Bug Issues Before CI": stats["before"],
@@ -28,6 +28,16 @@ def extract_keywords_from_file(file_path, keywords):
         pass
     return found
 
+def scan_ci_file(file_path):
+    """Read a CI config once and return (test keywords, coverage keywords) found in it."""
+    found = extract_keywords_from_file(file_path, TEST_KEYWORDS + COVERAGE_KEYWORDS)
+    return found & set(TEST_KEYWORDS), found & set(COVERAGE_KEYWORDS)
+
+def add_ci_file(results, file_path):
+    tests, coverage = scan_ci_file(file_path)
+    results["Test Tools"].update(tests)
+    results["Coverage Tools"].update(coverage)
+
 def check_readme_for_badges(repo_path):
     readme_files = list(Path(repo_path).glob("README*"))
     for file in readme_files:
@@ -80,8 +90,7 @@ def analyze_repo(path):
         ci_detected.append("GitHub Actions")
         results["CI Workflows Used"] = "Yes"
         for wf_file in workflow_path.glob("*.yml"):
-            results["Test Tools"].update(extract_keywords_from_file(wf_file, TEST_KEYWORDS))
-            results["Coverage Tools"].update(extract_keywords_from_file(wf_file, COVERAGE_KEYWORDS))
+            add_ci_file(results, wf_file)
         if results["Test Tools"]:
             results["Tests in Workflow"] = "Yes"
 
@@ -90,8 +99,7 @@ def analyze_repo(path):
     if travis_file.exists():
         ci_detected.append("Travis CI")
         results["CI Workflows Used"] = "Yes"
-        results["Test Tools"].update(extract_keywords_from_file(travis_file, TEST_KEYWORDS))
-        results["Coverage Tools"].update(extract_keywords_from_file(travis_file, COVERAGE_KEYWORDS))
+        add_ci_file(results, travis_file)
         if results["Test Tools"]:
             results["Tests in Workflow"] = "Yes"
 
@@ -100,8 +108,7 @@ def analyze_repo(path):
     if circleci_config.exists():
         ci_detected.append("CircleCI")
         results["CI Workflows Used"] = "Yes"
-        results["Test Tools"].update(extract_keywords_from_file(circleci_config, TEST_KEYWORDS))
-        results["Coverage Tools"].update(extract_keywords_from_file(circleci_config, COVERAGE_KEYWORDS))
+        add_ci_file(results, circleci_config)
         if results["Test Tools"]:
             results["Tests in Workflow"] = "Yes"
 
@@ -110,8 +117,7 @@ def analyze_repo(path):
     if gitlab_ci_file.exists():
         ci_detected.append("GitLab CI")
         results["CI Workflows Used"] = "Yes"
-        results["Test Tools"].update(extract_keywords_from_file(gitlab_ci_file, TEST_KEYWORDS))
-        results["Coverage Tools"].update(extract_keywords_from_file(gitlab_ci_file, COVERAGE_KEYWORDS))
+        add_ci_file(results, gitlab_ci_file)
         if results["Test Tools"]:
             results["Tests in Workflow"] = "Yes"
 
@@ -1,56 +1,45 @@
-import requests
 import os
+import sys
 import csv
 from dotenv import load_dotenv
 from ci_foundation_projects import projects
 
+# repo_tree.py lives in rust-ci and is shared with the Rust scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "rust-ci"))
+from repo_tree import PathIndex, get_repo_trees
+
 load_dotenv()
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-HEADERS = {"Authorization": f"token {GITHUB_TOKEN}"} if GITHUB_TOKEN else {}
+trees = get_repo_trees()
 
 def fetch_repo_files(owner, repo):
-    for branch in ["main", "master", "ernie-kit-open-v1.0"]:
-        url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/{branch}?recursive=10"
-        r = requests.get(url, headers=HEADERS)
-        if r.status_code == 200:
-            return r.json().get("tree", [])
-    print(f"⚠️ Failed to fetch files for {owner}/{repo}")
-    return []
+    # One recursive listing of the default branch's tree (cached by SHA); every path check below is in memory
+    try:
+        return trees.tree(owner, repo)
+    except Exception as e:
+        print(f"⚠️ Failed to fetch files for {owner}/{repo}: {e}")
+        return PathIndex([])
 
-def fetch_text_file(owner, repo, path):
-    for branch in ["main", "master"]:
-        url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{path}"
-        r = requests.get(url)
-        if r.status_code == 200:
-            return r.text.lower()
-    return ""
+def fetch_text_file(owner, repo, path, index):
+    # Downloaded by blob SHA once and cached; skipped when the listing shows the file is not there
+    return trees.read_text(owner, repo, index, path).lower()
 
-def scan_python_files_for_keywords(owner, repo, files, keywords):
+def scan_python_files_for_keywords(owner, repo, index, keywords):
     matched_deps = set()
-    for f in files:
-        path = f["path"]
+    for path in index.files():
         if not path.endswith(".py"):
             continue
+        try:
+            content = fetch_text_file(owner, repo, path, index)
+        except Exception:
+            continue
+        for key in keywords:
+            if key in content:
+                matched_deps.add(key)
 
-        # Try fetching raw content
-        for branch in ["main", "master"]:
-            url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{path}"
-            try:
-                r = requests.get(url)
-                if r.status_code == 200:
-                    content = r.text.lower()
-                    for key in keywords:
-                        if key in content:
-                            matched_deps.add(key)
-                break  # Stop after first successful fetch
-            except Exception:
-                continue
-            
     return list(matched_deps)
 
-def analyze_training_signals(owner, repo, files, requirements_text):
-    filepaths = [f["path"].lower() for f in files if f["type"] == "blob"]
-    folderpaths = [f["path"].lower() for f in files if "/" in f["path"]]
+def analyze_training_signals(owner, repo, index, requirements_text):
+    filepaths = [path.lower() for path in index.files()]
 
     training_deps = ["torch", "torch.nn", "deepspeed", "megatron", "fsdp", "fairscale", "apex", "flash_attn",
     "transformers", "accelerate", "trl", "t5x", "flax", "jax",
@@ -60,14 +49,15 @@ def analyze_training_signals(owner, repo, files, requirements_text):
     
         # Add code-level signals if requirements were incomplete
     if not deps_found:
-        code_matches = scan_python_files_for_keywords(owner, repo, files, training_deps)
+        code_matches = scan_python_files_for_keywords(owner, repo, index, training_deps)
         if code_matches:
             deps_found = code_matches
 
     # Check for Gin config files or TensorFlow training scripts
     #has_gin = any(p.endswith(".gin") for p in filepaths)
     #has_mtf_train_script = any("train_mtf.py" in p or "t5/scripts" in p or "mesh_transformer.py" in p for p in filepaths)
-    has_finetune = any("finetune" in p for p in filepaths + folderpaths)
+    # Every folder holds at least one file, so file paths cover folder names too
+    has_finetune = any("finetune" in p for p in filepaths)
 
     #training_signal = bool(deps_found or has_gin or has_mtf_train_script)
     training_signal = bool(deps_found)
@@ -82,9 +72,9 @@ def analyze_training_signals(owner, repo, files, requirements_text):
 results = []
 for proj in projects:
     print(f"🔍 Checking {proj['owner']}/{proj['repo']}...")
-    files = fetch_repo_files(proj["owner"], proj["repo"])
-    requirements_text = fetch_text_file(proj["owner"], proj["repo"], "requirements.txt")
-    result = analyze_training_signals(proj["owner"], proj["repo"], files, requirements_text)
+    index = fetch_repo_files(proj["owner"], proj["repo"])
+    requirements_text = fetch_text_file(proj["owner"], proj["repo"], "requirements.txt", index)
+    result = analyze_training_signals(proj["owner"], proj["repo"], index, requirements_text)
     results.append({
         "Repo": f"{proj['owner']}/{proj['repo']}",
         "Training Dependencies": result["Training Dependencies"],
@@ -226,6 +226,128 @@ def detect_ci(owner: str, name: str) -> Tuple[List[str], int]:
             found.append(label)
     return found, workflows_count
 
+# ----------------------------
+# Batched GraphQL probes (CI paths + commits/year in one query per batch)
+# ----------------------------
+GQL_URL = "https://api.github.com/graphql"
+GQL_BATCH = 25          # starting repos per query; adapted to the reported cost
+GQL_MAX_BATCH = 100
+GQL_TARGET_COST = 10    # rate-limit points we are happy to spend on one query
+# Error types/messages that mean "query too big": only these shrink the batch
+GQL_HEAVY_ERRORS = ("RESOURCE_LIMITS_EXCEEDED", "MAX_NODE_LIMIT_EXCEEDED", "timeout", "Something went wrong")
+
+class GraphQLTooHeavy(RuntimeError):
+    pass
+
+def _gql_repo_block(alias: str, owner: str, name: str, since_iso: str) -> str:
+    probes = []
+    for i, (label, path) in enumerate(CI_PATHS):
+        if path == ".github/workflows":
+            probes.append(f'c{i}: object(expression: {json.dumps("HEAD:" + path)}) {{ ... on Tree {{ entries {{ type }} }} }}')
+        else:
+            probes.append(f'c{i}: object(expression: {json.dumps("HEAD:" + path)}) {{ __typename }}')
+    history = f"history(since: {json.dumps(since_iso)}) {{ totalCount }}"
+    return (
+        f"  {alias}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{\n"
+        f"    defaultBranchRef {{ target {{ ... on Commit {{ {history} }} }} }}\n"
+        f"    " + "\n    ".join(probes) + "\n  }"
+    )
+
+def gh_graphql(query: str, retries: int = 5) -> Dict[str, Any]:
+    for i in range(retries):
+        try:
+            r = requests.post(GQL_URL, headers=HEADERS, json={"query": query}, timeout=60)
+        except requests.Timeout as e:
+            raise GraphQLTooHeavy(str(e))
+        if r.status_code in (502, 504):
+            raise GraphQLTooHeavy(f"HTTP {r.status_code}")
+        if r.status_code in (403, 429):
+            reset = r.headers.get("X-RateLimit-Reset")
+            retry_after = r.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                wait = int(retry_after)
+            elif reset and reset.isdigit():
+                wait = max(1, int(reset) - int(time.time()) + 1)
+            else:
+                wait = 60
+            time.sleep(min(wait, 180))
+            continue
+        r.raise_for_status()
+        payload = r.json()
+        errors = payload.get("errors") or []
+        heavy = [e for e in errors if any(h in (e.get("type", "") + e.get("message", "")) for h in GQL_HEAVY_ERRORS)]
+        if heavy or payload.get("data") is None:
+            if heavy or not errors:
+                raise GraphQLTooHeavy(str(heavy or "no data")[:300])
+            # Query, permission or credential errors: smaller batches would fail the same way
+            raise RuntimeError(f"GraphQL errors: {str(errors)[:300]}")
+        return payload
+    raise requests.HTTPError(f"GraphQL retries exhausted ({r.status_code})", response=r)
+
+def batch_repo_probes(full_names: List[str], verbose: bool = False) -> Dict[str, Tuple[List[str], int, int]]:
+    """
+    {full_name: (ci_tools, workflows_count, commits_last_year)} for every repo
+    GraphQL could answer. Batch size grows while queries stay cheap and is
+    halved when GitHub times out. Needs a token; returns {} without one.
+    """
+    if not GITHUB_TOKEN:
+        return {}
+    since_iso = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - 365 * 86400))
+    out: Dict[str, Tuple[List[str], int, int]] = {}
+    pending = list(full_names)
+    batch_size = GQL_BATCH
+    while pending:
+        batch = pending[:batch_size]
+        blocks = []
+        for i, full in enumerate(batch):
+            owner, name = full.split("/", 1)
+            blocks.append(_gql_repo_block(f"r{i}", owner, name, since_iso))
+        query = "query {\n" + "\n".join(blocks) + "\n  rateLimit { cost remaining }\n}"
+        try:
+            payload = gh_graphql(query)
+        except GraphQLTooHeavy as e:
+            if len(batch) == 1:
+                if verbose:
+                    print(f"  GraphQL gave up on {batch[0]}: {e}")
+                pending = pending[1:]
+                continue
+            batch_size = max(1, len(batch) // 2)
+            if verbose:
+                print(f"  GraphQL query too heavy; batch size -> {batch_size}")
+            continue
+        except Exception as e:
+            if verbose:
+                print(f"  GraphQL probes failed ({e}); falling back to REST")
+            return out
+        pending = pending[len(batch):]
+
+        data = payload["data"]
+        for i, full in enumerate(batch):
+            node = data.get(f"r{i}")
+            if not node:
+                continue
+            found: List[str] = []
+            workflows_count = 0
+            for j, (label, path) in enumerate(CI_PATHS):
+                obj = node.get(f"c{j}")
+                if obj is None:
+                    continue
+                if "entries" in obj:
+                    workflows_count = len([e for e in obj["entries"] or [] if e.get("type") == "blob"])
+                found.append(label)
+            target = (node.get("defaultBranchRef") or {}).get("target") or {}
+            commits = (target.get("history") or {}).get("totalCount") or 0
+            out[full] = (found, workflows_count, commits)
+
+        cost = int((data.get("rateLimit") or {}).get("cost") or 1)
+        if cost > GQL_TARGET_COST:
+            batch_size = max(1, int(batch_size * GQL_TARGET_COST / cost))
+        else:
+            batch_size = min(GQL_MAX_BATCH, int(batch_size * 1.5) + 1)
+        if verbose:
+            print(f"  GraphQL: {len(out)}/{len(full_names)} repos probed (cost {cost}, next batch {batch_size})")
+    return out
+
 # ----------------------------
 # Commit activity (last 52 weeks)
 # ----------------------------
@@ -294,6 +416,9 @@ def main():
         "ci_tools", "workflows_count"
     ]
 
+    # One GraphQL pass for CI paths + commit counts; repos it misses use the REST probes below
+    probes = batch_repo_probes([r["full_name"] for r in repos], verbose=args.verbose)
+
     for idx, r in enumerate(repos, start=1):
         full_name = r["full_name"]  # owner/repo
         owner, name = full_name.split("/", 1)
@@ -308,22 +433,27 @@ def main():
         if args.verbose:
             print(f"[{idx}/{len(repos)}] {full_name} — Detecting CI...")
 
-        try:
-            ci_tools, workflows_count = detect_ci(owner, name)
-        except Exception as e:
-            if args.verbose:
-                print(f"  CI detect error: {e}")
-            ci_tools, workflows_count = [], 0
+        probed = probes.get(full_name)
+        if probed:
+            ci_tools, workflows_count, commits_yr = probed
+        else:
+            try:
+                ci_tools, workflows_count = detect_ci(owner, name)
+            except Exception as e:
+                if args.verbose:
+                    print(f"  CI detect error: {e}")
+                ci_tools, workflows_count = [], 0
 
         if args.verbose:
             print(f"  CI tools: {', '.join(ci_tools) if ci_tools else 'none'}; workflows: {workflows_count}")
 
-        try:
-            commits_yr = get_commits_last_year(owner, name)
-        except Exception as e:
-            if args.verbose:
-                print(f"  Commit stats error: {e}")
-            commits_yr = 0
+        if not probed:
+            try:
+                commits_yr = get_commits_last_year(owner, name)
+            except Exception as e:
+                if args.verbose:
+                    print(f"  Commit stats error: {e}")
+                commits_yr = 0
 
         bucket = size_bucket(commits_yr)
 
@@ -1,11 +1,34 @@
 import os
 import csv
+import subprocess
+import numpy as np
 from git import Repo
 from datetime import datetime, timedelta
-from statistics import mean, stdev
 
 from ci_foundation_projects import projects  # Your list of GitHub repos
 
+def git_log_sizes(repo_path, branch, since, until):
+    """
+    Lines changed (insertions + deletions) per commit, from one streamed
+    `git log --numstat` instead of a `git diff` per commit via commit.stats.
+    """
+    args = [
+        "git", "-C", repo_path, "log", "--format=%H%x00%ct%x00%an",
+        "--numstat", "--no-renames", "--diff-merges=first-parent",  # same numbers as commit.stats
+        f"--since={since}", f"--until={until}", branch, "--",
+    ]
+    sizes = []
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, encoding="utf-8", errors="replace")
+    for line in proc.stdout:
+        if "\x00" in line:
+            sizes.append(0)
+        elif "\t" in line:
+            added, removed, _path = line.split("\t", 2)
+            sizes[-1] += (int(added) if added != "-" else 0) + (int(removed) if removed != "-" else 0)
+    if proc.wait() != 0:
+        raise Exception(f"git log failed for {repo_path}")
+    return np.asarray(sizes, dtype=np.int64)
+
 def get_commit_sizes(repo_path, branch="main"):
     repo = Repo(repo_path)
     if branch not in repo.refs:
@@ -18,13 +41,9 @@ def get_commit_sizes(repo_path, branch="main"):
     last_date = datetime.fromtimestamp(last_commit.committed_date)
     since = last_date - timedelta(days=90)
 
-    sizes = []
-    for commit in repo.iter_commits(branch, since=since.isoformat(), until=last_date.isoformat()):
-        stats = commit.stats.total
-        size = stats["insertions"] + stats["deletions"]
-        sizes.append(size)
+    sizes = git_log_sizes(repo_path, branch, since.isoformat(), last_date.isoformat())
 
-    if not sizes:
+    if not len(sizes):
         return {
             "Total Commits": 0,
             "Avg Commit Size": 0,
@@ -35,10 +54,10 @@ def get_commit_sizes(repo_path, branch="main"):
 
     return {
         "Total Commits": len(sizes),
-        "Avg Commit Size": round(mean(sizes), 2),
-        "Max Commit Size": max(sizes),
-        "Min Commit Size": min(sizes),
-        "Std Dev": round(stdev(sizes), 2) if len(sizes) > 1 else 0
+        "Avg Commit Size": round(float(sizes.mean()), 2),
+        "Max Commit Size": int(sizes.max()),
+        "Min Commit Size": int(sizes.min()),
+        "Std Dev": round(float(sizes.std(ddof=1)), 2) if len(sizes) > 1 else 0
     }
 
 # Analyze all projects
@@ -7,14 +7,17 @@ Checks GitHub Actions workflows, Travis CI, and other CI configurations for trai
 import os
 import json
 import re
-import base64
+import sys
 from typing import Dict, List, Tuple
 from collections import defaultdict
 
-import requests
 from dotenv import load_dotenv
 from tqdm import tqdm
 
+# repo_tree.py lives in rust-ci and is shared with the Rust scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "rust-ci"))
+from repo_tree import get_repo_trees
+
 # Load environment variables
 load_dotenv()
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
@@ -25,85 +28,104 @@ headers = {"Authorization": f"token {GITHUB_TOKEN}", "Accept": "application/vnd.
 
 
 def get_workflow_content(owner: str, repo: str, workflow_path: str, timeout: int = 10) -> str:
-    """Get the content of a workflow file."""
+    """Get the content of a workflow file (fetched by blob SHA, cached)."""
     try:
-        url = f"https://api.github.com/repos/{owner}/{repo}/contents/{workflow_path}"
-        response = requests.get(url, headers=headers, timeout=timeout)
-        
-        if response.status_code == 200:
-            content = response.json().get("content", "")
-            if content:
-                try:
-                    return base64.b64decode(content).decode('utf-8', errors='ignore')
-                except:
-                    return ""
-        return ""
+        trees = get_repo_trees()
+        index = trees.tree(owner, repo)
+        if index.truncated and not index.is_file(workflow_path):
+            # Found through the contents API: the truncated listing has no blob SHA for it
+            content = trees.read_contents(owner, repo, workflow_path)
+            return content.decode("utf-8", errors="ignore") if content else ""
+        return trees.read_text(owner, repo, index, workflow_path)
     except Exception as e:
         return ""
 
 
 def get_github_workflows(owner: str, repo: str, timeout: int = 10) -> List[Dict]:
-    """Get all GitHub Actions workflow files."""
+    """Get all GitHub Actions workflow files from the repo's cached tree listing."""
     try:
-        url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/main?recursive=1"
-        response = requests.get(url, headers=headers, timeout=timeout)
-        
-        if response.status_code == 404:
-            url = url.replace("/main?", "/master?")
-            response = requests.get(url, headers=headers, timeout=timeout)
-        
-        workflows = []
-        if response.status_code == 200:
-            data = response.json()
-            for item in data.get("tree", []):
-                if ".github/workflows" in item["path"] and item["path"].endswith((".yml", ".yaml")):
-                    workflows.append({
-                        "path": item["path"],
-                        "url": item.get("url")
-                    })
-        
-        return workflows
+        trees = get_repo_trees()
+        index = trees.tree(owner, repo)
+        paths = [path for path in index.files() if ".github/workflows" in path]
+        if not paths and index.truncated:
+            # A truncated listing may just have left the directory out
+            paths = trees.list_contents(owner, repo, ".github/workflows")
+        return [{"path": path} for path in paths if path.endswith((".yml", ".yaml"))]
     except Exception as e:
         return []
 
 
+# Keywords that indicate training is happening
+TRAINING_KEYWORDS = [
+    r"python.*train",
+    r"python.*\.py\s+--train",
+    r"python\s+train\.py",
+    r"python\s+-m.*train",
+    r"python.*finetune",
+    r"python.*fine-tune",
+    r"python.*pretrain",
+    r"torchrun.*train",
+    r"torch\.distributed",
+    r"accelerate.*launch.*train",
+    r"deepspeed.*train",
+    r"python\s+.*trainer",
+    r"python.*fit\(",
+    r"model\.train\(",
+]
+
+# Keywords that indicate testing/inference (not training)
+TEST_KEYWORDS = [
+    r"pytest",
+    r"python.*test",
+    r"python.*eval",
+    r"python.*inference",
+    r"python.*predict",
+]
+
+TRAVIS_TRAINING_KEYWORDS = [
+    r"python.*train",
+    r"python\s+train\.py",
+    r"python.*finetune",
+    r"torchrun.*train",
+]
+
+
+def compile_any(patterns: List[str]) -> "re.Pattern":
+    """One alternation over all patterns: a single scan tells whether any of them occurs."""
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+WORKFLOW_ANY = compile_any(TRAINING_KEYWORDS + TEST_KEYWORDS)
+TRAVIS_ANY = compile_any(TRAVIS_TRAINING_KEYWORDS)
+
+
+def matching_lines(content: str, any_pattern: "re.Pattern") -> List[str]:
+    """
+    Lines (split on \\n, as `.` never crosses it) that match any rule, found in
+    one pass. Per-rule checks then only look at these few lines.
+    """
+    return [line for line in content.split("\n") if any_pattern.search(line)]
+
+
+def lines_for(lines: List[str], pattern: str) -> List[str]:
+    """Same lines re.findall(f".*{pattern}.*", ..., re.MULTILINE) returns."""
+    rx = re.compile(pattern, re.IGNORECASE)
+    return [line for line in lines if rx.search(line)]
+
+
 def check_training_in_workflow(workflow_content: str) -> Tuple[bool, List[str], List[str]]:
     """Check if a workflow file contains training commands."""
-    
-    # Keywords that indicate training is happening
-    training_keywords = [
-        r"python.*train",
-        r"python.*\.py\s+--train",
-        r"python\s+train\.py",
-        r"python\s+-m.*train",
-        r"python.*finetune",
-        r"python.*fine-tune",
-        r"python.*pretrain",
-        r"torchrun.*train",
-        r"torch\.distributed",
-        r"accelerate.*launch.*train",
-        r"deepspeed.*train",
-        r"python\s+.*trainer",
-        r"python.*fit\(",
-        r"model\.train\(",
-    ]
-    
-    # Keywords that indicate testing/inference (not training)
-    test_keywords = [
-        r"pytest",
-        r"python.*test",
-        r"python.*eval",
-        r"python.*inference",
-        r"python.*predict",
-    ]
-    
     has_training = False
     training_commands = []
     test_commands = []
+
+    candidates = matching_lines(workflow_content, WORKFLOW_ANY)
+    if not candidates:
+        return has_training, training_commands, test_commands
     
     # Look for training patterns
-    for keyword_pattern in training_keywords:
-        matches = re.findall(f".*{keyword_pattern}.*", workflow_content, re.IGNORECASE | re.MULTILINE)
+    for keyword_pattern in TRAINING_KEYWORDS:
+        matches = lines_for(candidates, keyword_pattern)
         if matches:
             has_training = True
             for match in matches[:3]:  # Get top 3 matches
@@ -112,8 +134,8 @@ def check_training_in_workflow(workflow_content: str) -> Tuple[bool, List[str],
                     training_commands.append(clean_match)
     
     # Look for test patterns
-    for keyword_pattern in test_keywords:
-        matches = re.findall(f".*{keyword_pattern}.*", workflow_content, re.IGNORECASE | re.MULTILINE)
+    for keyword_pattern in TEST_KEYWORDS:
+        matches = lines_for(candidates, keyword_pattern)
         if matches:
             for match in matches[:2]:
                 clean_match = match.strip()
@@ -126,36 +148,30 @@ def check_training_in_workflow(workflow_content: str) -> Tuple[bool, List[str],
 def check_travis_ci(owner: str, repo: str, timeout: int = 10) -> Tuple[bool, List[str]]:
     """Check .travis.yml for training commands."""
     try:
-        url = f"https://api.github.com/repos/{owner}/{repo}/contents/.travis.yml"
-        response = requests.get(url, headers=headers, timeout=timeout)
-        
-        if response.status_code == 200:
-            content = response.json().get("content", "")
-            if content:
-                try:
-                    travis_content = base64.b64decode(content).decode('utf-8', errors='ignore')
-                    
-                    training_patterns = [
-                        r"python.*train",
-                        r"python\s+train\.py",
-                        r"python.*finetune",
-                        r"torchrun.*train",
-                    ]
-                    
-                    has_training = False
-                    commands = []
-                    
-                    for pattern in training_patterns:
-                        matches = re.findall(f".*{pattern}.*", travis_content, re.IGNORECASE | re.MULTILINE)
-                        if matches:
-                            has_training = True
-                            commands.extend([m.strip() for m in matches[:2]])
-                    
-                    return has_training, commands
-                except:
-                    pass
-        
-        return False, []
+        trees = get_repo_trees()
+        index = trees.tree(owner, repo)
+        if index.is_file(".travis.yml"):
+            travis_content = trees.read_text(owner, repo, index, ".travis.yml")
+        elif index.truncated:
+            # A truncated listing may just have left the file out; probe it directly
+            content = trees.read_contents(owner, repo, ".travis.yml")
+            travis_content = content.decode("utf-8", errors="ignore") if content else ""
+        else:
+            return False, []
+        if not travis_content:
+            return False, []
+
+        has_training = False
+        commands = []
+        candidates = matching_lines(travis_content, TRAVIS_ANY)
+
+        for pattern in TRAVIS_TRAINING_KEYWORDS if candidates else []:
+            matches = lines_for(candidates, pattern)
+            if matches:
+                has_training = True
+                commands.extend([m.strip() for m in matches[:2]])
+
+        return has_training, commands
     except:
         return False, []
 
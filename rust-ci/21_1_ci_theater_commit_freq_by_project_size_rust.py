@@ -6,6 +6,11 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from tables import read_table
+
+# Frequency columns across 20's current, legacy and malformed headers (see process_cohort)
+FREQ_COLUMNS = ["name", "Last Commit Date", "Avg_Commits_Weekday", "Avg Commits/Weekday (Mon–Fri)", "Weekday (Mon–Fri)"]
+
 
 def categorize_project(sloc: int) -> str:
     """Categorizes a project based on its Source Lines of Code (SLOC)."""
@@ -19,8 +24,9 @@ def categorize_project(sloc: int) -> str:
 
 def process_cohort(freq_file: str, sizes_file: str, cohort_name: str):
     try:
-        commit_freq_df = pd.read_csv(freq_file)
-        project_sizes_df = pd.read_csv(sizes_file)
+        # No schema for the frequency file: the malformed-header repair below needs the raw strings.
+        commit_freq_df = read_table(freq_file, FREQ_COLUMNS)
+        project_sizes_df = read_table(sizes_file, ["repo", "rust_sloc"], "sloc_summary")
     except FileNotFoundError as e:
         print(f"Error: Input file not found: {e.filename}")
         return None, None, None
@@ -1,17 +1,19 @@
 #!/usr/bin/env python3
 import os
-import csv
-import time
-import math
-import re
+import asyncio
 import argparse
 import importlib
 from datetime import datetime, timezone, timedelta
 
-import requests
 from tabulate import tabulate
 from dotenv import load_dotenv
 
+from github_cache import get_cache
+from ci_warehouse import Warehouse, ingest
+from github_client import MAX_CONCURRENCY
+from run_store import get_run_store
+from tables import write_table
+
 # --- Setup & Auth ---
 load_dotenv()
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
@@ -20,7 +22,6 @@ if not GITHUB_TOKEN:
         "GITHUB_TOKEN is required. Unauthenticated requests are limited to 60/hour "
         "and will make this script take many days."
     )
-HEADERS = {"Authorization": f"token {GITHUB_TOKEN}"}
 
 # --- Adapter for flat slugs ---
 def _parse_slug(slug: str) -> tuple[str, str]:
@@ -59,104 +60,14 @@ def _to_project_dicts(slugs: list[str]) -> list[dict]:
     return out
 
 # --- Tunables for ~2-day runtime target ---
-PER_PAGE     = 50              # GitHub max per_page
-MAX_RUNS     = 50             # cap runs collected per repo (was 5000)
-PAGE_SLEEP   = 0.10             # pause between pages (was 0.5)
+MAX_RUNS     = 50             # runs with a valid duration counted per repo (was 5000)
+MAX_FETCH    = 1000             # never read more than this many runs per repo looking for them
 CUTOFF_DAYS  = 365              # ~1 year; stop paging once runs are older than this
 DURATION_MAX = 240              # discard runs longer than 4 hours
-TIMEOUT_S    = 20               # request timeout
-
-# --- Session (reuses TCP connections; faster & friendlier) ---
-SESSION = requests.Session()
-SESSION.headers.update(HEADERS)
-
-def _maybe_sleep_for_ratelimit(resp):
-    """
-    If near the rate limit, sleep until reset.
-    Safe-guards long runs without hard failing on 403.
-    """
-    try:
-        remaining = int(resp.headers.get("X-RateLimit-Remaining", "1"))
-        reset     = int(resp.headers.get("X-RateLimit-Reset", "0"))
-    except ValueError:
-        remaining, reset = 1, 0
-    if remaining <= 1:
-        wait = max(0, reset - int(time.time())) + 2
-        print(f"⚠️  Near rate limit. Sleeping {wait}s until reset…")
-        time.sleep(wait)
-
-def get_workflow_durations(
-    owner: str,
-    name: str,
-    *,
-    max_runs: int = MAX_RUNS,
-    per_page: int = PER_PAGE,
-    page_sleep: float = PAGE_SLEEP,
-    cutoff_days: int = CUTOFF_DAYS,
-    timeout_s: int = TIMEOUT_S,
-) -> tuple[list[float], int]:
-    """
-    Fetch workflow run durations (in minutes) for a given repo, with runtime-bounding:
-      - cap total collected runs to `max_runs`
-      - early-stop when run.created_at < now - cutoff_days
-      - small sleep between pages
-      - reuse a Session and respect rate-limit headers
-
-    Returns (durations, count).
-    """
-    durations: list[float] = []
-    page = 1
-    cutoff_date = datetime.now(timezone.utc) - timedelta(days=cutoff_days)
 
-    try:
-        while len(durations) < max_runs:
-            url = f"https://api.github.com/repos/{owner}/{name}/actions/runs"
-            params = {"per_page": per_page, "page": page}
-            resp = SESSION.get(url, params=params, timeout=timeout_s)
-
-            # Handle rate-limit gently
-            if resp.status_code == 403 and "rate limit" in resp.text.lower():
-                _maybe_sleep_for_ratelimit(resp)
-                continue
-
-            resp.raise_for_status()
-            runs = resp.json().get("workflow_runs", [])
-            if not runs:
-                break  # no more pages
-
-            stop_due_to_cutoff = False
-            for run in runs:
-                try:
-                    start = datetime.fromisoformat(run["created_at"].replace("Z", "+00:00"))
-                    if start < cutoff_date:
-                        stop_due_to_cutoff = True
-                        break
-
-                    end = datetime.fromisoformat(run["updated_at"].replace("Z", "+00:00"))
-                    duration_min = (end - start).total_seconds() / 60.0
-                    if 0 <= duration_min <= DURATION_MAX:
-                        durations.append(duration_min)
-                        if len(durations) >= max_runs:
-                            break
-                except Exception:
-                    # Skip malformed run
-                    continue
-
-            if stop_due_to_cutoff or len(durations) >= max_runs:
-                break
-
-            page += 1
-            time.sleep(page_sleep)
-            _maybe_sleep_for_ratelimit(resp)
-
-        return durations, len(durations)
-
-    except Exception as e:
-        print(f"Error fetching {owner}/{name}: {e}")
-        return None, 0
-
-def summarize_durations(name: str, durations: list[float] | None) -> dict:
-    if not durations:
+def summarize_durations(name: str, stats: dict | None) -> dict:
+    """Format one row of Warehouse.duration_summary() (None → repo had no usable runs)."""
+    if not stats:
         return {
             "name": name,
             "Avg Duration (min)": "",
@@ -164,18 +75,50 @@ def summarize_durations(name: str, durations: list[float] | None) -> dict:
             "Long Builds >10min": "",
             "Runs Counted": 0,
         }
-    run_count = len(durations)
-    avg_duration = round(sum(durations) / run_count, 2)
-    max_duration = round(max(durations), 2)
-    long_build_pct = round(100 * sum(1 for d in durations if d > 10) / run_count, 1)
     return {
         "name": name,
-        "Avg Duration (min)": avg_duration,
-        "Max Duration (min)": max_duration,
-        "Long Builds >10min": f"{long_build_pct}%",
-        "Runs Counted": run_count,
+        "Avg Duration (min)": round(stats["avg_min"], 2),
+        "Max Duration (min)": round(stats["max_min"], 2),
+        "Long Builds >10min": f"{round(stats['long_pct'], 1)}%",
+        "Runs Counted": stats["runs"],
     }
 
+def collect(projects: list[dict], concurrency: int) -> list[dict]:
+    """
+    Land the latest runs of every repo in the CI warehouse (only runs newer than
+    the run-store watermark hit the API), then compute durations in one query.
+    Runs longer than DURATION_MAX do not count, so a repo that ends up with
+    fewer than MAX_RUNS valid durations is synced again with twice the window,
+    until it has MAX_RUNS, runs out of history before the cutoff, or reaches
+    MAX_FETCH runs. Rows keep the input order.
+    """
+    warehouse = Warehouse()
+    cutoff_date = datetime.now(timezone.utc) - timedelta(days=CUTOFF_DAYS)
+    slugs = [f"{p['owner']}/{p['name']}" for p in projects]
+    failures: dict[str, str] = {}
+    pending, limit = projects, MAX_RUNS
+    while pending:
+        print(f"📥 Syncing up to {limit} runs for {len(pending)} repos…")
+        failures.update(asyncio.run(ingest(pending, warehouse, concurrency=concurrency, since=cutoff_date, max_runs=limit)))
+        pending_slugs = [f"{p['owner']}/{p['name']}" for p in pending]
+        stats = warehouse.duration_summary(pending_slugs, CUTOFF_DAYS, MAX_RUNS, DURATION_MAX)
+        stored = warehouse.run_counts(pending_slugs, CUTOFF_DAYS)
+        if limit >= MAX_FETCH:
+            break
+        pending = [
+            p for p, slug in zip(pending, pending_slugs)
+            if slug not in failures
+            and stats.get(slug.lower(), {}).get("runs", 0) < MAX_RUNS
+            and stored.get(slug.lower(), 0) >= limit   # fewer stored runs: the window holds no more
+        ]
+        limit = min(limit * 2, MAX_FETCH)
+    stats = warehouse.duration_summary(slugs, CUTOFF_DAYS, MAX_RUNS, DURATION_MAX)
+    warehouse.close()
+    return [
+        summarize_durations(slug, None if slug in failures else stats.get(slug.lower()))
+        for slug in slugs
+    ]
+
 def main():
     parser = argparse.ArgumentParser(description="Fetch workflow run durations for a list of GitHub repos.")
     parser.add_argument(
@@ -188,6 +131,12 @@ def main():
         required=True,
         help="Path to the output CSV file.",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=MAX_CONCURRENCY,
+        help="Maximum number of in-flight GitHub requests.",
+    )
     args = parser.parse_args()
 
     try:
@@ -205,27 +154,19 @@ def main():
     CSV_FILE = args.output_file
     os.makedirs(os.path.dirname(CSV_FILE) or ".", exist_ok=True)
 
-    results: list[dict] = []
-    total = len(projects)
-    for i, project in enumerate(projects, start=1):
-        owner, name = project["owner"], project["name"]
-        print(f"[{i}/{total}] Checking {owner}/{name}…")
-        durations, run_count = get_workflow_durations(owner, name)
-        full_slug = f"{owner}/{name}"
-        row = summarize_durations(full_slug, durations)
-        results.append(row)
+    results = collect(projects, args.concurrency)
 
     # Display results in table format
     if results:
         print("\n" + tabulate(results, headers="keys", tablefmt="grid"))
 
-        # Write to CSV
-        with open(CSV_FILE, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=results[0].keys())
-            writer.writeheader()
-            writer.writerows(results)
+        # Write to CSV (and/or Parquet, see tables.py)
+        written = write_table(results, CSV_FILE, "long_builds", fieldnames=list(results[0].keys()))
 
-        print(f"\n✅ Results saved to {CSV_FILE}")
+        print(f"\n✅ Results saved to {', '.join(written)}")
+        print(f"🏃 Run store: {get_run_store().summary()}")
+        if get_cache():
+            print(f"🗄️  HTTP cache: {get_cache().summary()}")
     else:
         print("No results to write.")
 
@@ -6,13 +6,15 @@ import argparse
 import importlib
 import base64
 import re
+import asyncio
 from datetime import datetime, timezone, timedelta
-from collections import defaultdict
 
 import requests
 from tabulate import tabulate
 from dotenv import load_dotenv
 
+from ci_warehouse import Warehouse, ingest
+
 # --- Setup & Authentication ---
 load_dotenv()
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
@@ -25,8 +27,6 @@ HEADERS = {"Authorization": f"token {GITHUB_TOKEN}", "Accept": "application/vnd.
 
 # --- Configuration ---
 MAX_RUNS_TO_CHECK = 25
-PER_PAGE = 50
-PAGE_SLEEP = 0.1
 CUTOFF_DAYS = 90
 TIMEOUT_S = 20
 
@@ -82,89 +82,37 @@ def get_submodules(owner: str, repo: str) -> list[str]:
         print(f" [warn] Could not decode .gitmodules for {owner}/{repo}.")
         return []
 
-def get_job_timings(owner: str, repo: str) -> list[dict]:
-    """Fetches job timings for a repository's recent workflow runs."""
-    runs_url = f"https://api.github.com/repos/{owner}/{repo}/actions/runs"
-    cutoff_date = datetime.now(timezone.utc) - timedelta(days=CUTOFF_DAYS)
-    
-    runs_checked = 0
-    all_jobs = []
-
-    for page in range(1, 10):
-        if runs_checked >= MAX_RUNS_TO_CHECK:
-            break
-            
-        try:
-            runs_resp = SESSION.get(runs_url, params={"per_page": PER_PAGE, "page": page}, timeout=TIMEOUT_S)
-            _maybe_sleep_for_ratelimit(runs_resp)
-            runs_resp.raise_for_status()
-            runs = runs_resp.json().get("workflow_runs", [])
-            if not runs: break
-
-            for run in runs:
-                if runs_checked >= MAX_RUNS_TO_CHECK: break
-                
-                created_at = datetime.fromisoformat(run["created_at"])
-                if created_at < cutoff_date: return all_jobs
-
-                jobs_url = run["jobs_url"]
-                try:
-                    jobs_resp = SESSION.get(jobs_url, timeout=TIMEOUT_S)
-                    _maybe_sleep_for_ratelimit(jobs_resp)
-                    if jobs_resp.status_code == 404: continue
-                    jobs_resp.raise_for_status()
-                    
-                    jobs = jobs_resp.json().get("jobs", [])
-                    for job in jobs:
-                        if job["status"] == "completed" and job["started_at"] and job["completed_at"]:
-                            start = datetime.fromisoformat(job["started_at"])
-                            end = datetime.fromisoformat(job["completed_at"])
-                            duration = (end - start).total_seconds()
-                            all_jobs.append({
-                                "name": job["name"],
-                                "duration_s": duration,
-                                "run_url": run["html_url"],
-                            })
-                except requests.RequestException as e:
-                    print(f" [warn] Could not fetch jobs for run {run['id']}: {e}")
-                    continue
-
-                runs_checked += 1
-            time.sleep(PAGE_SLEEP)
-        
-        except requests.RequestException as e:
-            print(f" [error] Failed to fetch runs for {owner}/{repo}: {e}")
-            return []
-
-    return all_jobs
-
-def summarize_repo_jobs(repo_slug: str, jobs: list[dict]) -> dict:
-    """Analyzes a list of job timings to find the slowest ones."""
-    if not jobs:
+def summarize_repo_jobs(repo_slug: str, stats: dict | None) -> dict:
+    """Format one row of Warehouse.job_summary() (None → no completed jobs in the window)."""
+    if not stats:
         return {"Repo": repo_slug, "Runs Checked": 0}
-
-    longest_job_instance = max(jobs, key=lambda j: j["duration_s"])
-    jobs_by_name = defaultdict(list)
-    for job in jobs:
-        jobs_by_name[job["name"]].append(job["duration_s"])
-
-    avg_durations = {
-        name: sum(durations) / len(durations)
-        for name, durations in jobs_by_name.items()
-    }
-    
-    slowest_job_type_name = max(avg_durations, key=avg_durations.get)
-    slowest_avg_duration = avg_durations[slowest_job_type_name]
-
     return {
         "Repo": repo_slug,
-        "Slowest Job Type (Avg)": slowest_job_type_name,
-        "Avg Duration": _format_duration(slowest_avg_duration),
-        "Longest Single Job": longest_job_instance["name"],
-        "Max Duration": _format_duration(longest_job_instance["duration_s"]),
+        "Slowest Job Type (Avg)": stats["slowest_name"],
+        "Avg Duration": _format_duration(stats["slowest_avg_s"]),
+        "Longest Single Job": stats["longest_name"],
+        "Max Duration": _format_duration(stats["longest_s"]),
         "Runs Checked": MAX_RUNS_TO_CHECK,
     }
 
+def get_job_summaries(projects: list[dict]) -> dict:
+    """
+    Land the recent runs and their jobs in the CI warehouse, then pick the
+    slowest job types per repo in one query. Jobs already in the warehouse
+    are not fetched again.
+    """
+    warehouse = Warehouse()
+    cutoff_date = datetime.now(timezone.utc) - timedelta(days=CUTOFF_DAYS)
+    print(f"📥 Syncing runs and jobs for {len(projects)} repos…")
+    asyncio.run(ingest(
+        projects, warehouse, since=cutoff_date, max_runs=MAX_RUNS_TO_CHECK,
+        with_jobs=True, jobs_since=cutoff_date, jobs_max_runs=MAX_RUNS_TO_CHECK,
+    ))
+    slugs = [f"{p['owner']}/{p['name']}" for p in projects]
+    summaries = warehouse.job_summary(slugs, CUTOFF_DAYS, MAX_RUNS_TO_CHECK)
+    warehouse.close()
+    return summaries
+
 def main():
     parser = argparse.ArgumentParser(
         description="Analyze GitHub Actions job durations and submodules for a list of repositories."
@@ -200,14 +148,15 @@ def main():
         "Longest Single Job", "Max Duration", "Runs Checked"
     ]
     
+    job_summaries = get_job_summaries(projects)
+
     for i, project in enumerate(projects, start=1):
         owner, repo = project["owner"], project["name"]
         slug = f"{owner}/{repo}"
         print(f"[{i}/{total}] Analyzing {slug}...")
 
-        # Get job timings as before
-        jobs = get_job_timings(owner, repo)
-        summary = summarize_repo_jobs(slug, jobs)
+        # Job timings come from the warehouse query
+        summary = summarize_repo_jobs(slug, job_summaries.get(slug.lower()))
         
         # Get submodules and add to the summary
         submodules = get_submodules(owner, repo)
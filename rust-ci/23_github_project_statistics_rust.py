@@ -1,7 +1,6 @@
 import os
-import csv
 import time
-import threading
+import asyncio
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -12,6 +11,13 @@ import requests
 from requests.utils import parse_header_links
 from dotenv import load_dotenv
 
+from ci_warehouse import Warehouse, ingest
+from github_cache import cached_request, get_cache
+from github_client import retry_delay, with_jitter
+from github_graphql import GraphQLBatcher
+from rate_limiter import get_limiter, resource_for_url
+from tables import write_table
+
 # Import flat list of "owner/repo" slugs
 
 # --- Adapter for flat slugs ---
@@ -56,7 +62,6 @@ def _to_project_dicts(slugs: list[str]) -> list[dict]:
 load_dotenv()
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GH_REST = "https://api.github.com"
-GH_GQL  = f"{GH_REST}/graphql"
 
 DEFAULT_TIMEOUT = (5, 30)  # connect, read
 MAX_RETRIES = 4
@@ -64,8 +69,7 @@ BACKOFF_BASE = 1.7
 
 def make_session() -> requests.Session:
     s = requests.Session()
-    if GITHUB_TOKEN:
-        s.headers.update({"Authorization": f"Bearer {GITHUB_TOKEN}"})  # works for REST & GraphQL
+    # Authorization is added per request by the rate limiter (token rotation)
     s.headers.update({
         "Accept": "application/vnd.github+json",
         "User-Agent": "ci-foundation-stats-script"
@@ -80,40 +84,8 @@ session = make_session()
 # =========================
 # Global rate limiter
 # =========================
-class RateLimiter:
-    """
-    Thread-safe limiter that sleeps *before* requests when remaining calls are low,
-    and updates itself from response headers.
-    """
-    def __init__(self, min_remaining: int = 50):
-        self._lock = threading.Lock()
-        self.remaining: Optional[int] = None
-        self.reset_epoch: Optional[int] = None
-        self.min_remaining = min_remaining
-
-    def preflight(self):
-        with self._lock:
-            if self.remaining is not None and self.reset_epoch:
-                now = int(time.time())
-                if self.remaining <= self.min_remaining and self.reset_epoch > now:
-                    sleep_for = min(120, self.reset_epoch - now + 1)
-                    if sleep_for > 0:
-                        print(f"⏸️  Rate limit guard: sleeping {sleep_for}s (remaining={self.remaining})")
-                        time.sleep(sleep_for)
-
-    def update_from_resp(self, resp: requests.Response):
-        with self._lock:
-            try:
-                rem = resp.headers.get("X-RateLimit-Remaining")
-                rst = resp.headers.get("X-RateLimit-Reset")
-                if rem is not None:
-                    self.remaining = int(rem)
-                if rst is not None:
-                    self.reset_epoch = int(rst)
-            except Exception:
-                pass
-
-RATE = RateLimiter(min_remaining=50)
+# Shared across processes and rotates over GITHUB_TOKENS (see rate_limiter.py)
+RATE = get_limiter()
 
 # =========================
 # Unified request: retries + rate limit handling
@@ -121,58 +93,30 @@ RATE = RateLimiter(min_remaining=50)
 def _request_with_retries(method: str, url: str, **kwargs) -> requests.Response:
     """
     Handles:
-      - Core rate limit (preflight sleep using X-RateLimit headers)
-      - Retry-After on 403/429
-      - Secondary rate limit / abuse detection (backoff)
-      - 5xx retries with exponential backoff
+      - Budget pacing + token rotation (shared rate_limiter, REST core and GraphQL)
+      - Throttling and 5xx retries via the shared github_client.retry_delay policy
     """
+    resource = resource_for_url(url)
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
     for attempt in range(1, MAX_RETRIES + 1):
-        RATE.preflight()
+        token = RATE.acquire_blocking(resource)
         try:
-            kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
-            resp = session.request(method, url, **kwargs)
+            resp = cached_request(session, method, url, headers=RATE.auth_headers(token), **kwargs)
 
             # Always update limiter state from headers
-            RATE.update_from_resp(resp)
-
-            # Retryable server errors
-            if resp.status_code >= 500:
-                wait = min(60, int(BACKOFF_BASE ** (attempt - 1)))
-                print(f"🔁 {resp.status_code} retry in {wait}s … {url}")
-                time.sleep(wait)
-                continue
-
-            # Handle throttling
-            if resp.status_code in (403, 429):
-                # Retry-After honored if present
-                ra = resp.headers.get("Retry-After")
-                body = (resp.text or "").lower()
-                # If core rate limit reached, preflight will sleep next time; give it a moment
-                if ra and ra.isdigit():
-                    wait = min(180, int(ra))
-                    print(f"⏳ Throttled ({resp.status_code}): sleeping {wait}s (Retry-After)")
-                    time.sleep(wait)
-                    continue
-                if "secondary rate limit" in body or "abuse detection" in body:
-                    wait = min(120, int(BACKOFF_BASE ** (attempt - 1)) * 3)
-                    print(f"⏳ Secondary limit: backoff {wait}s …")
-                    time.sleep(wait)
-                    continue
-                if resp.headers.get("X-RateLimit-Remaining") == "0":
-                    reset = resp.headers.get("X-RateLimit-Reset")
-                    if reset and reset.isdigit():
-                        wait = max(0, int(reset) - int(time.time())) + 2
-                        wait = min(wait, 180)
-                        print(f"⏳ Core rate limit: sleeping {wait}s until reset …")
-                        time.sleep(wait)
-                        continue
-                # Generic short backoff
-                wait = min(60, int(BACKOFF_BASE ** (attempt - 1)))
-                print(f"⏳ Throttled ({resp.status_code}): retry in {wait}s …")
-                time.sleep(wait)
+            RATE.update_from_headers(token, resp.headers)
+            if getattr(resp, "from_cache", False):
+                RATE.refund(token, resource)
+
+            wait = retry_delay(resp.status_code, resp.headers, resp.text, attempt)
+            if wait is not None and attempt < MAX_RETRIES:
+                print(f"⏳ {resp.status_code}: retry in {wait:.0f}s … {url}")
+                if resp.status_code in (403, 429):
+                    RATE.penalize(token, wait, resource)  # limiter rotates tokens or waits
+                else:
+                    time.sleep(with_jitter(wait))
                 continue
 
-            # Also cover explicit 429/503 branch already done above; if not in those, return
             return resp
 
         except requests.RequestException as e:
@@ -220,94 +164,64 @@ def fast_count(endpoint: str, params: Dict[str, str]) -> int:
     except Exception:
         return 0
 
-def get_workflow_runs_summary(owner: str, name: str) -> Tuple[int, int, Optional[datetime]]:
-    """REST: summarize Actions runs (GraphQL does not expose Actions)."""
-    success = 0
-    failure = 0
-    earliest: Optional[datetime] = None
-    page = 1
-    while True:
-        url = f"{GH_REST}/repos/{owner}/{name}/actions/runs"
-        resp = _request_with_retries("GET", url, params={"per_page": "100", "page": str(page)})
-        if resp.status_code != 200:
-            print(f"Runs fetch error {owner}/{name} p{page} → {resp.status_code}: {resp.text[:200]}")
-            break
-        payload = resp.json()
-        runs = payload.get("workflow_runs", [])
-        if not runs:
-            break
-        for run in runs:
-            c = run.get("conclusion")
-            if c == "success":
-                success += 1
-            elif c == "failure":
-                failure += 1
-            ca = run.get("created_at")
-            if ca:
-                try:
-                    created = datetime.strptime(ca, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
-                    if earliest is None or created < earliest:
-                        earliest = created
-                except Exception:
-                    pass
-        # pagination using Link header
-        last = _parse_last_page(resp)
-        if not last or page >= last:
-            break
-        page += 1
-    return success, failure, earliest
+def get_workflow_runs_summaries(projects: List[Dict[str, str]]) -> Dict[str, Tuple[int, int, Optional[datetime]]]:
+    """
+    REST: summarize Actions runs (GraphQL does not expose Actions).
+    Full run history is landed in the CI warehouse (only runs newer than each
+    repo's run-store watermark hit the API), then success/failure counts and
+    the first CI run date come from one query. Keyed by lower-case 'owner/name'.
+    """
+    warehouse = Warehouse()
+    print(f"📥 Syncing workflow runs for {len(projects)} repos…")
+    failures = asyncio.run(ingest(projects, warehouse))
+    for slug, err in failures.items():
+        print(f"Runs fetch error {slug}: {err}")
+    summaries = warehouse.ci_summary([f"{p['owner']}/{p['name']}" for p in projects])
+    warehouse.close()
+    return summaries
 
 # =========================
 # GraphQL batching
 # =========================
-def build_repos_batch_query(batch: List[Dict[str, str]]) -> str:
-    """
-    We alias each repo lookup (r0, r1, ...) to fetch:
-      - createdAt
-      - issues: OPEN & CLOSED counts (sum client-side → total)
-      - pullRequests: OPEN, CLOSED, MERGED counts (sum → total)
-    """
-    parts = []
-    for i, p in enumerate(batch):
-        alias = f"r{i}"
-        owner = p["owner"]
-        name  = p["name"]
-        parts.append(f"""
-  {alias}: repository(owner: "{owner}", name: "{name}") {{
-    nameWithOwner
-    url
+# Extra fields per aliased repository(...) block; issues / PRs summed client-side
+REPO_STATS_FIELDS = """url
     createdAt
-    issuesOpen: issues(states: OPEN) {{ totalCount }}
-    issuesClosed: issues(states: CLOSED) {{ totalCount }}
-    prsOpen: pullRequests(states: OPEN) {{ totalCount }}
-    prsClosed: pullRequests(states: CLOSED) {{ totalCount }}
-    prsMerged: pullRequests(states: MERGED) {{ totalCount }}
-  }}
-""")
-    repo_block = "\n".join(parts)
-    # include rateLimit so we can see remaining
-    return f"""
-query RepoBatch {{
-{repo_block}
-  rateLimit {{ cost remaining resetAt }}
-}}
-""".strip()
-
-def gql_post(query: str, variables: Optional[Dict] = None) -> Dict:
-    payload = {"query": query}
-    if variables:
-        payload["variables"] = variables
-    resp = _request_with_retries("POST", GH_GQL, json=payload)
-    if resp.status_code != 200:
-        raise RuntimeError(f"GraphQL HTTP {resp.status_code}: {resp.text[:200]}")
-    data = resp.json()
-    if "errors" in data:
-        raise RuntimeError(f"GraphQL errors: {data['errors']}")
-    return data["data"]
-
-def chunked(lst, n):
-    for i in range(0, len(lst), n):
-        yield lst[i:i+n]
+    issuesOpen: issues(states: OPEN) { totalCount }
+    issuesClosed: issues(states: CLOSED) { totalCount }
+    prsOpen: pullRequests(states: OPEN) { totalCount }
+    prsClosed: pullRequests(states: CLOSED) { totalCount }
+    prsMerged: pullRequests(states: MERGED) { totalCount }"""
+
+def fetch_repo_stats(projects: List[Dict[str, str]]) -> Dict[str, Dict]:
+    """Issue / PR totals and createdAt for all repos, keyed by "owner/name"."""
+    batcher = GraphQLBatcher()
+    try:
+        facts = batcher.repo_facts(projects, fields=REPO_STATS_FIELDS)
+    except Exception as e:
+        print(f"❌ GraphQL fetch failed: {e}")
+        return {}
+    print(f"✅ GraphQL complete: {batcher.summary()}")
+
+    results: Dict[str, Dict] = {}
+    for p in projects:
+        key = f"{p['owner']}/{p['name']}"
+        node = (facts.get(key) or {}).get("node")
+        if not node:
+            print(f"⚠️ Skipping {key} (no GraphQL data)")
+            continue
+        results[key] = {
+            "url": node["url"],
+            "createdAt": node["createdAt"],
+            "issuesOpen": node["issuesOpen"]["totalCount"],
+            "issuesClosed": node["issuesClosed"]["totalCount"],
+            "prsOpen": node["prsOpen"]["totalCount"],
+            "prsClosed": node["prsClosed"]["totalCount"],
+            "prsMerged": node["prsMerged"]["totalCount"],
+            "name": p["name"],
+            "owner": p["owner"],
+            "repo": p["repo"],
+        }
+    return results
 
 # =========================
 # Aggregation
@@ -394,46 +308,17 @@ def main() -> None:
     print(f"📊 Starting analysis for {len(projects_list)} projects...")
     start_time = time.time()
 
-    # 1) GraphQL in batches (e.g., 20 repos per query)
-    batch_size = 20
-    gql_results: Dict[str, Dict] = {}  # key: "owner/name"
+    # 1) GraphQL in cost-sized batches
+    print(f"🔍 Fetching GraphQL stats for {len(projects_list)} repos...")
+    gql_results = fetch_repo_stats(projects_list)  # key: "owner/name"
 
-    for batch_num, batch in enumerate(chunked(projects_list, batch_size), start=1):
-        print(f"🔍 Fetching GraphQL batch {batch_num} ({len(batch)} repos)...")
-        q = build_repos_batch_query(batch)
-        try:
-            data = gql_post(q)
-        except Exception as e:
-            print(f"❌ GraphQL batch {batch_num} failed: {e}")
-            continue
+    # 2) Actions summary for all repos (warehouse), then contributors fast count (REST) in parallel
+    run_summaries = get_workflow_runs_summaries(projects_list)
 
-        # collect per alias
-        for i, p in enumerate(batch):
-            alias = f"r{i}"
-            node = data.get(alias)
-            if not node:
-                print(f"⚠️ Skipping {p['owner']}/{p['name']} (no GraphQL data)")
-                continue
-            key = f"{p['owner']}/{p['name']}"
-            gql_results[key] = {
-                "url": node["url"],
-                "createdAt": node["createdAt"],
-                "issuesOpen": node["issuesOpen"]["totalCount"],
-                "issuesClosed": node["issuesClosed"]["totalCount"],
-                "prsOpen": node["prsOpen"]["totalCount"],
-                "prsClosed": node["prsClosed"]["totalCount"],
-                "prsMerged": node["prsMerged"]["totalCount"],
-                "name": p["name"],
-                "owner": p["owner"],
-                "repo": p["repo"],
-            }
-        print(f"✅ GraphQL batch {batch_num} complete.")
-
-    # 2) For each repo, get Actions summary (REST) + contributors fast count (REST) in parallel
     def rest_bundle(p):
         owner, name = p["owner"], p["name"]
         print(f"   ⏳ REST fetch {owner}/{name}...")
-        success_runs, failed_runs, first_run_dt = get_workflow_runs_summary(owner, name)
+        success_runs, failed_runs, first_run_dt = run_summaries.get(f"{owner}/{name}".lower(), (0, 0, None))
         contributors = fast_count(f"{GH_REST}/repos/{owner}/{name}/contributors", {"anon": "true"})
         print(f"   ✅ REST done {owner}/{name} (runs={success_runs+failed_runs}, contribs={contributors})")
         return (owner, name, success_runs, failed_runs, first_run_dt, contributors)
@@ -488,12 +373,11 @@ def main() -> None:
             "Total PRs","Total Issues","Contributors",
             "Workflows Used","Workflow Runs (Success)","Workflow Runs (Failure)"
         ]
-        with open(out_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(all_stats)
+        written = write_table(all_stats, out_path, "github_stats", fieldnames=fieldnames)
         elapsed = round(time.time() - start_time, 1)
-        print(f"✅ CSV export complete: {out_path} ({len(all_stats)} rows, {elapsed}s)")
+        print(f"✅ Export complete: {', '.join(written)} ({len(all_stats)} rows, {elapsed}s)")
+        if get_cache():
+            print(f"🗄️  HTTP cache: {get_cache().summary()}")
     else:
         print("⚠️ No data written.")
 
@@ -29,12 +29,12 @@ Input:
 """
 
 import os
-import io
 import re
-import csv
 import time
 import math
 import base64
+import codecs
+import tempfile
 import threading
 import zipfile
 import xml.etree.ElementTree as ET
@@ -43,12 +43,23 @@ from datetime import datetime, timezone, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import argparse
 import importlib
-from typing import Optional, Tuple, List, Dict, Set
+from typing import IO, Iterator, Optional, Tuple, List, Dict, Set
 
 import requests
 from tabulate import tabulate
 from dotenv import load_dotenv
 
+from ci_warehouse import Warehouse, repo_key
+from github_cache import cached_request, get_cache
+from github_client import retry_delay, with_jitter
+from github_graphql import GraphQLBatcher
+from multi_pattern import MultiPattern
+from rate_limiter import get_limiter, resource_for_url
+from repo_tree import PathIndex, get_repo_trees
+from run_journal import RunJournal
+from run_store import collect_runs_blocking
+from tables import write_table
+
 # ---------- Config ----------
 load_dotenv()
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
@@ -99,15 +110,24 @@ def _to_project_dicts(slugs: list[str]) -> list[dict]:
 
 # Tunables (kept conservative to avoid rate limits)
 WORKERS       = 4            # concurrent repos (raise slowly if stable)
-PER_PAGE_RUNS = 100          # max density per page
 RUNS_PER_REPO = 30           # only the latest few runs
 CUTOFF_DAYS   = 365          # up to ~6 months
-PAGE_SLEEP    = 0.10         # throttle between pages
 TIMEOUT_S     = 25
 
 # Debugging
 DEBUG = True
 
+# Static probes folded into batched GraphQL queries (see fetch_repo_facts)
+STATIC_TEST_DIRS = ["tests", "test", "spec", "__tests__", "benches"]
+WORKFLOWS_DIR    = ".github/workflows"
+
+# Streaming downloads / ZIP scanning
+SPOOL_IN_MEMORY = 8 * 1024 * 1024    # larger archives spill to a temp file
+DOWNLOAD_CHUNK  = 1024 * 1024
+SCAN_CHUNK      = 1024 * 1024        # decompressed bytes per regex pass over a log member
+MAX_CARRY       = 64 * 1024          # longest partial line carried between chunks
+MAX_REPORT_BYTES = 2_000_000_000     # reports are streamed; only absurd members are skipped
+
 # Optional: only download artifacts whose names contain these tokens (speeds things up)
 ARTIFACT_NAME_ALLOWLIST = re.compile(r"(cover|lcov|cobertura|jacoco)", re.IGNORECASE)
 
@@ -116,7 +136,7 @@ COVERAGE_TOOL_HINTS = [
     (re.compile(r"\bgrcov\b", re.IGNORECASE), "grcov"),
     (re.compile(r"\bcargo\s+tarpaulin\b", re.IGNORECASE), "tarpaulin"),
     (re.compile(r"\bllvm-cov\b", re.IGNORECASE), "llvm-cov"),
-    (re.compile(r"RUSTFLAGS\s*[:=].*-C\s*instrument-coverage", re.IGNORECASE), "instrument-coverage"),
+    (re.compile(r"RUSTFLAGS\s*[:=].*?-C\s*instrument-coverage", re.IGNORECASE), "instrument-coverage"),
     (re.compile(r"LLVM_PROFILE_FILE", re.IGNORECASE), "instrument-coverage"),
     (re.compile(r"codecov(?:\.yml|\.yaml)?", re.IGNORECASE), "codecov"),
     (re.compile(r"coveralls", re.IGNORECASE), "coveralls"),
@@ -133,6 +153,7 @@ WORKFLOW_ACTION_HINTS = [
 
 # ---------- Thread-local Session ----------
 _thread_local = threading.local()
+_warehouse_lock = threading.Lock()
 
 def get_session() -> requests.Session:
     s = getattr(_thread_local, "session", None)
@@ -146,32 +167,8 @@ def get_session() -> requests.Session:
     return s
 
 # ---------- Global Rate Limiter ----------
-class RateLimiter:
-    def __init__(self, min_remaining: int = 50):
-        self._lock = threading.Lock()
-        self.remaining: Optional[int] = None
-        self.reset_epoch: Optional[int] = None
-        self.min_remaining = min_remaining  # sleep if we dip below this
-
-    def preflight(self):
-        with self._lock:
-            if self.remaining is not None and self.reset_epoch:
-                now = int(time.time())
-                if self.remaining <= self.min_remaining and self.reset_epoch > now:
-                    sleep_for = min(120, self.reset_epoch - now + 1)
-                    if sleep_for > 0:
-                        print(f"⏸️  Rate limit guard: sleeping {sleep_for}s (remaining={self.remaining})")
-                        time.sleep(sleep_for)
-
-    def update_from_resp(self, resp):
-        with self._lock:
-            try:
-                self.remaining = int(resp.headers.get("X-RateLimit-Remaining", self.remaining or 0))
-                self.reset_epoch = int(resp.headers.get("X-RateLimit-Reset", self.reset_epoch or 0))
-            except Exception:
-                pass
-
-RATE = RateLimiter(min_remaining=50)
+# Shared across processes and rotates over GITHUB_TOKENS (see rate_limiter.py)
+RATE = get_limiter()
 
 # ---------- Allow List Handler ----------
 class AllowList:
@@ -203,44 +200,37 @@ class AllowList:
 # ---------- Unified request with retries + global limiting ----------
 def http_request(method: str, url: str, session: requests.Session, **kwargs) -> requests.Response:
     MAX_RETRIES = 4
-    BACKOFF = 1.7
+    resource = resource_for_url(url)
+    extra_headers = kwargs.pop("headers", None) or {}
     for attempt in range(1, MAX_RETRIES + 1):
-        RATE.preflight()
+        token = RATE.acquire_blocking(resource)
+        headers = dict(extra_headers)
+        if resource:
+            headers.update(RATE.auth_headers(token))
         try:
-            resp = session.request(method, url, timeout=TIMEOUT_S, **kwargs)
-            RATE.update_from_resp(resp)
-
-            # Secondary/abuse throttling
-            if resp.status_code in (403, 429):
-                ra = resp.headers.get("Retry-After")
-                body = (resp.text or "").lower()
-                if ra and ra.isdigit():
-                    wait = min(120, int(ra))
-                    print(f"⏳ Secondary limit: sleeping {wait}s (Retry-After)")
-                    time.sleep(wait)
-                    continue
-                if "secondary rate limit" in body or "abuse detection" in body:
-                    wait = min(120, int(BACKOFF ** (attempt - 1)) * 3)
-                    print(f"⏳ Secondary limit: backoff {wait}s…")
-                    time.sleep(wait)
-                    continue
-                if "rate limit" in body:
-                    time.sleep(2)
-                    continue
-
-            if resp.status_code >= 500:
-                wait = min(60, int(BACKOFF ** (attempt - 1)))
-                print(f"🔁 {resp.status_code} retry in {wait}s … {url}")
-                time.sleep(wait)
+            resp = cached_request(session, method, url, headers=headers, timeout=TIMEOUT_S, **kwargs)
+            RATE.update_from_headers(token, resp.headers)
+            if getattr(resp, "from_cache", False):
+                RATE.refund(token, resource)
+
+            # Throttling (Retry-After, primary reset, secondary/abuse) and 5xx
+            body = resp.text if resp.status_code in (403, 429) else ""
+            wait = retry_delay(resp.status_code, resp.headers, body, attempt)
+            if wait is not None and attempt < MAX_RETRIES:
+                print(f"⏳ {resp.status_code}: retry in {wait:.0f}s … {url}")
+                if resp.status_code in (403, 429):
+                    RATE.penalize(token, wait, resource)  # limiter rotates tokens or waits
+                else:
+                    time.sleep(with_jitter(wait))
                 continue
 
             return resp
         except requests.RequestException as e:
             if attempt == MAX_RETRIES:
                 raise
-            wait = min(60, int(BACKOFF ** (attempt - 1)))
+            wait = min(60, 2 ** attempt)
             print(f"🔁 Network error retry in {wait}s … {e}")
-            time.sleep(wait)
+            time.sleep(with_jitter(wait))
     return resp  # type: ignore
 
 # ---------- Coverage patterns (logs fallback) ----------
@@ -261,51 +251,32 @@ TEST_CMD_PATTERNS = [
     (re.compile(r"\bcargo\s+test\b", re.IGNORECASE), "cargo"),
     (re.compile(r"\bpytest(\s|$)|\bpython\s+-m\s+pytest\b", re.IGNORECASE), "pytest"),
     (re.compile(r"\bgo\s+test\b", re.IGNORECASE), "go"),
-    (re.compile(r"\bmvn\b.*\btest\b", re.IGNORECASE), "maven"),
-    (re.compile(r"\bgradle\b.*\btest\b|\bgradlew\b.*\btest\b", re.IGNORECASE), "gradle"),
+    (re.compile(r"\bmvn\b.*?\btest\b", re.IGNORECASE), "maven"),
+    (re.compile(r"\bgradle\b.*?\btest\b|\bgradlew\b.*?\btest\b", re.IGNORECASE), "gradle"),
     (re.compile(r"\bnpm\s+test\b|\byarn\s+test\b|\bpnpm\s+test\b|\bjest\b", re.IGNORECASE), "jest"),
     (re.compile(r"\bdotnet\s+test\b", re.IGNORECASE), ".net"),
     (re.compile(r"\bctest\b", re.IGNORECASE), "ctest"),
     (re.compile(r"\btox\b|\bnox\b", re.IGNORECASE), "pytest"),
-    (re.compile(r"actions-rs/cargo.*\bcommand:\s*test\b", re.IGNORECASE | re.DOTALL), "cargo"),
+    (re.compile(r"actions-rs/cargo.*?\bcommand:\s*test\b", re.IGNORECASE | re.DOTALL), "cargo"),
 ]
 
+# One-pass matchers over the rule lists above (lazy `.*?` keeps matches short so
+# one rule's span does not hide another's)
+COVERAGE_MATCHER      = MultiPattern([(pat, i) for i, pat in enumerate(COVERAGE_PATTERNS)])
+TEST_CMD_MATCHER      = MultiPattern(TEST_CMD_PATTERNS)
+COVERAGE_HINT_MATCHER = MultiPattern(COVERAGE_TOOL_HINTS + WORKFLOW_ACTION_HINTS)
+COVERAGE_FILE_MATCHER = MultiPattern(COVERAGE_TOOL_HINTS)
+
+# Step logs worth reading first (and trusting) when looking for a coverage summary
+LOG_MEMBER_HINT = re.compile(r"(cover|tarpaulin|llvm-cov|grcov|codecov|coveralls|lcov)", re.IGNORECASE)
+
 RUST_TEST_FILE = re.compile(r".*(_test\.rs|/tests?/|/benches?/)", re.IGNORECASE)
 
 # ---------- Helpers: runs, jobs, logs ----------
-def list_recent_runs(owner: str, name: str, per_page: int, max_runs: int, cutoff_days: int) -> List[Dict]:
-    """Return up to `max_runs` recent workflow runs within cutoff."""
-    s = get_session()
-    out = []
-    page = 1
+def list_recent_runs(owner: str, name: str, max_runs: int, cutoff_days: int) -> List[Dict]:
+    """Return up to `max_runs` recent workflow runs within cutoff (served from the local run store)."""
     cutoff_date = datetime.now(timezone.utc) - timedelta(days=cutoff_days)
-
-    while len(out) < max_runs:
-        url = f"https://api.github.com/repos/{owner}/{name}/actions/runs"
-        params = {"per_page": min(100, per_page), "page": page}
-        resp = http_request("GET", url, s, params=params)
-        if resp.status_code == 404:
-            break
-        resp.raise_for_status()
-        runs = resp.json().get("workflow_runs", [])
-        if not runs:
-            break
-
-        for run in runs:
-            try:
-                created = datetime.fromisoformat(run["created_at"].replace("Z", "+00:00"))
-            except Exception:
-                created = None
-            if created and created < cutoff_date:
-                return out  # stop early, older than cutoff
-            out.append(run)
-            if len(out) >= max_runs:
-                return out
-
-        page += 1
-        time.sleep(PAGE_SLEEP)
-
-    return out
+    return collect_runs_blocking(owner, name, since=cutoff_date, limit=max_runs)
 
 def list_run_jobs(owner: str, name: str, run_id: int) -> List[Dict]:
     """Return jobs (with steps) for a run (few pages max)."""
@@ -327,18 +298,61 @@ def list_run_jobs(owner: str, name: str, run_id: int) -> List[Dict]:
         page += 1
     return jobs
 
-def fetch_run_logs(owner: str, name: str, run_id: int) -> Optional[bytes]:
-    """Download ZIP logs for a run, following single redirect."""
+def spool_download(url: str) -> Optional[IO[bytes]]:
+    """
+    Stream a (ZIP) download into a spooled temp file, following a single
+    redirect. Small bodies stay in memory, large ones go to disk, so log and
+    artifact archives of any size never sit in RAM. Returns the file rewound
+    to 0 (caller closes it), or None on HTTP errors.
+    """
     s = get_session()
-    url = f"https://api.github.com/repos/{owner}/{name}/actions/runs/{run_id}/logs"
-    resp = http_request("GET", url, s)
+    resp = http_request("GET", url, s, stream=True)
     if resp.status_code == 302:
         loc = resp.headers.get("Location")
+        resp.close()
         if loc:
-            resp = http_request("GET", loc, s)
-    if resp.status_code >= 400:
-        return None
-    return resp.content
+            resp = http_request("GET", loc, s, stream=True)
+    with resp:
+        if resp.status_code >= 400:
+            return None
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_IN_MEMORY)
+        try:
+            for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                spool.write(chunk)
+        except Exception:
+            spool.close()
+            raise
+    spool.seek(0)
+    return spool
+
+def fetch_run_logs(owner: str, name: str, run_id: int) -> Optional[IO[bytes]]:
+    """Download ZIP logs for a run into a spooled temp file."""
+    return spool_download(f"https://api.github.com/repos/{owner}/{name}/actions/runs/{run_id}/logs")
+
+def iter_member_text(zf: zipfile.ZipFile, info: zipfile.ZipInfo, chunk_size: int = SCAN_CHUNK) -> Iterator[str]:
+    """
+    Decompress one ZIP member incrementally and yield decoded text blocks that
+    end on a line boundary (so line-oriented regexes never see a split match).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    carry = ""
+    with zf.open(info, "r") as f:
+        while True:
+            raw = f.read(chunk_size)
+            if not raw:
+                break
+            text = carry + decoder.decode(raw)
+            cut = text.rfind("\n") + 1
+            if cut == 0 and len(text) < MAX_CARRY:
+                carry = text
+                continue
+            if cut == 0:
+                cut = len(text)
+            carry = text[cut:]
+            yield text[:cut]
+    tail = carry + decoder.decode(b"", final=True)
+    if tail:
+        yield tail
 
 # ---------- Check Runs (e.g., Codecov) ----------
 def parse_checks_for_coverage(owner: str, name: str, sha: str) -> Optional[float]:
@@ -393,119 +407,202 @@ def list_run_artifacts(owner: str, name: str, run_id: int) -> List[Dict]:
             print(f"   ↳ artifact: id={a.get('id')} name='{a.get('name')}' size={a.get('size_in_bytes')} expired={a.get('expired')}")
     return arts
 
-def download_artifact_zip(owner: str, name: str, artifact_id: int) -> Optional[bytes]:
-    s = get_session()
+def download_artifact_zip(owner: str, name: str, artifact_id: int) -> Optional[IO[bytes]]:
     # GitHub returns a 302 to the storage URL
-    url = f"https://api.github.com/repos/{owner}/{name}/actions/artifacts/{artifact_id}/zip"
-    resp = http_request("GET", url, s)
-    if resp.status_code == 302:
-        loc = resp.headers.get("Location")
-        if loc:
-            resp = http_request("GET", loc, s)
-    if resp.status_code >= 400:
-        return None
-    return resp.content
+    return spool_download(f"https://api.github.com/repos/{owner}/{name}/actions/artifacts/{artifact_id}/zip")
 
 # ---------- Structured coverage parsers ----------
-def parse_lcov_text(text: str) -> Optional[float]:
+# All parsers take a binary file-like object (e.g. straight from zf.open()) and
+# stream it, returning (headline %, per-file {path: (covered_lines, total_lines)}).
+FileCoverage = Dict[str, Tuple[int, int]]
+
+def _add_file(files: FileCoverage, path: Optional[str], covered: int, total: int) -> None:
+    if not path or total <= 0:
+        return
+    c, t = files.get(path, (0, 0))
+    files[path] = (c + covered, t + total)
+
+def parse_lcov_stream(f: IO[bytes]) -> Tuple[Optional[float], FileCoverage]:
     """
-    LCOV format: accumulate DA:<line>,<hits> within each file block.
+    LCOV format, read line by line. Each SF:...end_of_record block counts its
+    LF/LH summary when present, else its DA:<line>,<hits> records.
     Coverage = sum(covered_lines) / sum(total_lines) * 100
     """
+    files: FileCoverage = {}
     total_lines = 0
     covered_lines = 0
-    for line in text.splitlines():
+    path = None
+    da_total = da_covered = 0
+    lf = lh = None
+
+    def flush():
+        nonlocal total_lines, covered_lines
+        tot, cov = (lf, lh) if lf is not None and lh is not None else (da_total, da_covered)
+        total_lines += tot
+        covered_lines += cov
+        _add_file(files, path, cov, tot)
+
+    for raw in f:
+        line = raw.decode("utf-8", errors="ignore").strip() if isinstance(raw, bytes) else raw.strip()
         if line.startswith("DA:"):
             try:
-                _, payload = line.split("DA:", 1)
-                _lineno, hits = payload.split(",", 1)
+                _lineno, hits = line[3:].split(",", 2)[:2]
                 if int(hits) > 0:
-                    covered_lines += 1
-                total_lines += 1
+                    da_covered += 1
+                da_total += 1
             except Exception:
                 continue
+        elif line.startswith("SF:"):
+            path = line[3:]
+        elif line.startswith("LF:") or line.startswith("LH:"):
+            try:
+                if line[1] == "F":
+                    lf = int(line[3:])
+                else:
+                    lh = int(line[3:])
+            except ValueError:
+                continue
+        elif line == "end_of_record":
+            flush()
+            path, da_total, da_covered, lf, lh = None, 0, 0, None, None
+    if da_total or lf:
+        flush()   # truncated last record
+
     if total_lines == 0:
-        return None
-    return (covered_lines / total_lines) * 100.0
+        return None, files
+    return (covered_lines / total_lines) * 100.0, files
 
-def parse_cobertura_xml(xml_bytes: bytes) -> Optional[float]:
+def parse_cobertura_stream(f: IO[bytes]) -> Tuple[Optional[float], FileCoverage]:
     """
-    Cobertura root often has line-rate in [0,1]. If not, sum over <classes>/<class> <line hits="">
+    Cobertura root often has line-rate in [0,1]. If not, sum over <classes>/<class> <line hits="">.
+    Parsed with iterparse; each <class> is cleared once its lines are counted.
+    Per-file counts use the class-level <lines> only (method lines repeat them).
     """
-    try:
-        root = ET.fromstring(xml_bytes)
-    except Exception:
-        return None
-
-    lr = root.attrib.get("line-rate")
-    if lr is not None:
-        try:
-            val = float(lr) * 100.0
-            if 0.0 <= val <= 100.0:
-                return val
-        except Exception:
-            pass
-
+    files: FileCoverage = {}
+    root_pct = None
     total_lines = 0
     covered_lines = 0
-    for cls in root.findall(".//class"):
-        for ln in cls.findall(".//line"):
-            hits = ln.attrib.get("hits")
-            if hits is None:
-                continue
-            try:
-                total_lines += 1
-                if int(hits) > 0:
-                    covered_lines += 1
-            except Exception:
+    seen_root = False
+    cls_file = None
+    cls_total = cls_covered = 0
+    in_methods = 0
+    try:
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                if not seen_root:
+                    seen_root = True
+                    lr = elem.attrib.get("line-rate")
+                    if lr is not None:
+                        try:
+                            val = float(lr) * 100.0
+                            if 0.0 <= val <= 100.0:
+                                root_pct = val
+                        except Exception:
+                            pass
+                elif tag == "class":
+                    cls_file = elem.attrib.get("filename") or elem.attrib.get("name")
+                    cls_total = cls_covered = 0
+                elif tag == "methods":
+                    in_methods += 1
                 continue
+
+            if tag == "line" and cls_file is not None:
+                hits = elem.attrib.get("hits")
+                if hits is None:
+                    continue
+                try:
+                    total_lines += 1
+                    hit = int(hits) > 0
+                    if hit:
+                        covered_lines += 1
+                except Exception:
+                    continue
+                if not in_methods:
+                    cls_total += 1
+                    cls_covered += hit
+            elif tag == "methods":
+                in_methods -= 1
+            elif tag == "class":
+                _add_file(files, cls_file, cls_covered, cls_total)
+                cls_file = None
+                elem.clear()
+            elif tag == "package":
+                elem.clear()
+    except ET.ParseError:
+        return None, {}
+
+    if root_pct is not None:
+        return root_pct, files
     if total_lines > 0:
-        return (covered_lines / total_lines) * 100.0
-    return None
+        return (covered_lines / total_lines) * 100.0, files
+    return None, files
 
-def parse_jacoco_xml(xml_bytes: bytes) -> Optional[float]:
+def parse_jacoco_stream(f: IO[bytes]) -> Tuple[Optional[float], FileCoverage]:
     """
     JaCoCo: <counter type="LINE" missed=".." covered="..">. Prefer root-level; else sum all LINE counters.
+    Parsed with iterparse; per-file counts come from each <sourcefile>'s LINE counter.
     """
-    try:
-        root = ET.fromstring(xml_bytes)
-    except Exception:
-        return None
-
-    for c in root.findall("./counter"):
-        if c.attrib.get("type") == "LINE":
-            try:
-                missed = int(c.attrib.get("missed", "0"))
-                covered = int(c.attrib.get("covered", "0"))
-                total = missed + covered
-                return (covered / total) * 100.0 if total > 0 else None
-            except Exception:
-                pass
-
+    files: FileCoverage = {}
+    stack: List[str] = []
+    package = sourcefile = None
+    root_counter: Optional[Tuple[int, int]] = None
     missed_sum = 0
     covered_sum = 0
-    for c in root.findall(".//counter"):
-        if c.attrib.get("type") == "LINE":
-            try:
-                missed_sum += int(c.attrib.get("missed", "0"))
-                covered_sum += int(c.attrib.get("covered", "0"))
-            except Exception:
+    try:
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                stack.append(tag)
+                if tag == "package":
+                    package = elem.attrib.get("name") or ""
+                elif tag == "sourcefile":
+                    sourcefile = elem.attrib.get("name")
                 continue
+
+            stack.pop()
+            if tag == "counter" and elem.attrib.get("type") == "LINE":
+                try:
+                    missed = int(elem.attrib.get("missed", "0"))
+                    covered = int(elem.attrib.get("covered", "0"))
+                except Exception:
+                    continue
+                missed_sum += missed
+                covered_sum += covered
+                if len(stack) == 1:
+                    if root_counter is None:
+                        root_counter = (missed, covered)
+                elif stack[-1] == "sourcefile" and sourcefile:
+                    _add_file(files, f"{package}/{sourcefile}" if package else sourcefile, covered, missed + covered)
+            elif tag in ("sourcefile", "class", "package"):
+                elem.clear()
+    except ET.ParseError:
+        return None, {}
+
+    if root_counter is not None:
+        missed, covered = root_counter
+        total = missed + covered
+        return ((covered / total) * 100.0 if total > 0 else None), files
     total = missed_sum + covered_sum
     if total > 0:
-        return (covered_sum / total) * 100.0
-    return None
+        return (covered_sum / total) * 100.0, files
+    return None, files
 
-def parse_artifact_zip_for_coverage(zip_bytes: bytes) -> Tuple[Optional[float], Optional[str]]:
+def parse_artifact_zip_for_coverage(zip_file: IO[bytes]) -> Tuple[Optional[float], Optional[str], FileCoverage]:
+    """
+    Only the central directory is read up front; just the candidate reports are
+    decompressed, and those are streamed into the parsers.
+    Returns (coverage %, method tag, per-file coverage).
+    """
     try:
-        zf = zipfile.ZipFile(io.BytesIO(zip_bytes))
+        zf = zipfile.ZipFile(zip_file)
     except Exception:
-        return None, None
+        return None, None, {}
 
     candidates = []
     for info in zf.infolist():
         name = (info.filename or "").lower()
-        if info.file_size == 0 or info.file_size > 200_000_000:
+        if info.file_size == 0 or info.file_size > MAX_REPORT_BYTES:
             continue
         if (
             name.endswith((".xml", ".info", ".lcov", ".json")) or
@@ -513,42 +610,23 @@ def parse_artifact_zip_for_coverage(zip_bytes: bytes) -> Tuple[Optional[float],
         ):
             candidates.append(info)
 
-    # LCOV
-    for info in candidates:
-        n = info.filename.lower()
-        if n.endswith(".lcov") or n.endswith("lcov.info") or n.endswith(".info") or "lcov" in n:
-            try:
-                with zf.open(info, "r") as f:
-                    text = f.read().decode("utf-8", errors="ignore")
-                pct = parse_lcov_text(text)
-                if pct is not None:
-                    return pct, "artifacts:lcov"
-            except Exception:
-                continue
-
-    # Cobertura
-    for info in candidates:
-        n = info.filename.lower()
-        if n.endswith("cobertura.xml") or ("cobertura" in n and n.endswith(".xml")) or n.endswith("coverage.xml"):
-            try:
-                with zf.open(info, "r") as f:
-                    xml_bytes = f.read()
-                pct = parse_cobertura_xml(xml_bytes)
-                if pct is not None:
-                    return pct, "artifacts:cobertura"
-            except Exception:
+    structured = [
+        ("artifacts:lcov", parse_lcov_stream,
+         lambda n: n.endswith(".lcov") or n.endswith("lcov.info") or n.endswith(".info") or "lcov" in n),
+        ("artifacts:cobertura", parse_cobertura_stream,
+         lambda n: n.endswith("cobertura.xml") or ("cobertura" in n and n.endswith(".xml")) or n.endswith("coverage.xml")),
+        ("artifacts:jacoco", parse_jacoco_stream,
+         lambda n: n.endswith("jacoco.xml") or ("jacoco" in n and n.endswith(".xml"))),
+    ]
+    for tag, parse, wanted in structured:
+        for info in candidates:
+            if not wanted(info.filename.lower()):
                 continue
-
-    # JaCoCo
-    for info in candidates:
-        n = info.filename.lower()
-        if n.endswith("jacoco.xml") or ("jacoco" in n and n.endswith(".xml")):
             try:
                 with zf.open(info, "r") as f:
-                    xml_bytes = f.read()
-                pct = parse_jacoco_xml(xml_bytes)
+                    pct, files = parse(f)
                 if pct is not None:
-                    return pct, "artifacts:jacoco"
+                    return pct, tag, files
             except Exception:
                 continue
 
@@ -565,88 +643,139 @@ def parse_artifact_zip_for_coverage(zip_bytes: bytes) -> Tuple[Optional[float],
                     data.get("totals", {}).get("lines", {}).get("percent")
                 )
                 if pct is not None:
-                    return float(pct), "artifacts:json"
+                    return float(pct), "artifacts:json", {}
             except Exception:
                 continue
 
-    return None, None
+    return None, None, {}
+
 
+# ---------- Repo tree listing (one per SHA, shared by every static probe) ----------
+def repo_tree(owner: str, name: str, facts: Optional[Dict] = None) -> PathIndex:
+    """Default-branch tree of the repo; the GraphQL head_tree_oid (if known) saves the HEAD lookup."""
+    trees = get_repo_trees(get=lambda url, **kw: http_request("GET", url, get_session(), **kw))
+    return trees.tree(owner, name, sha=(facts or {}).get("head_tree_oid"))
+
+def contents_text(owner: str, name: str, path: str) -> str:
+    """Text of one file via the contents API ("" if missing)."""
+    s = get_session()
+    r = http_request("GET", f"https://api.github.com/repos/{owner}/{name}/contents/{path}", s)
+    if r.status_code != 200:
+        return ""
+    j = r.json()
+    dl = j.get("download_url")
+    if dl:
+        rf = http_request("GET", dl, s)
+        return rf.text if rf.status_code == 200 else ""
+    # fallback: some contents responses include base64 "content"
+    b64 = j.get("content")
+    if b64:
+        try:
+            return base64.b64decode(b64).decode("utf-8", errors="ignore")
+        except Exception:
+            return ""
+    return ""
+
+def contents_listing(owner: str, name: str, path: str = "") -> List[Dict]:
+    """Directory entries via the contents API ([] if missing or not a directory)."""
+    r = http_request("GET", f"https://api.github.com/repos/{owner}/{name}/contents/{path}", get_session())
+    if r.status_code != 200:
+        return []
+    j = r.json()
+    return j if isinstance(j, list) else []
 
 # ---------- Repo static scanning (cheap) ----------
-def detect_repo_tests_static(owner: str, name: str) -> Tuple[bool, Optional[str], Set[str]]:
+def detect_repo_tests_static(owner: str, name: str, facts: Optional[Dict] = None) -> Tuple[bool, Optional[str], Set[str]]:
     """
     Cheap heuristics first (few path probes). Only fall back to heavier checks if needed.
+    `facts` are this repo's batched GraphQL probes (see fetch_repo_facts); without
+    them the same probes are made one REST call at a time.
     Returns (has_tests, tool_guess, evidence_set)
     """
     evidence: Set[str] = set()
     tool_guess: Optional[str] = None
-    s = get_session()
 
-    candidate_dirs = ["tests", "test", "spec", "__tests__", "benches"]
-    found = False
-    for d in candidate_dirs:
-        url = f"https://api.github.com/repos/{owner}/{name}/contents/{d}"
-        resp = http_request("GET", url, s)
-        if resp.status_code == 200:
-            found = True
+    if facts and facts.get("exists"):
+        found = any(facts["paths"].get(d) for d in STATIC_TEST_DIRS)
+        if not found:
+            root = facts["trees"].get("") or []
+            found = any((e.get("name") or "").endswith("_test.rs") for e in root)
+        if found:
             evidence.add("files")
-            break
-        if resp.status_code == 404:
-            continue
-        resp.raise_for_status()
+            return True, "cargo", evidence
+        return False, None, evidence
 
+    # One recursive tree listing per SHA (repo_tree.py); the probes are in-memory lookups
+    index = repo_tree(owner, name)
+    found = any(index.exists(d) for d in STATIC_TEST_DIRS)
     if not found:
-        url = f"https://api.github.com/repos/{owner}/{name}/contents"
-        resp = http_request("GET", url, s)
-        if resp.status_code == 200:
-            for it in resp.json() or []:
-                p = it.get("name", "")
-                if p.endswith("_test.rs"):
-                    found = True
-                    evidence.add("files")
-                    break
+        found = any(n.endswith("_test.rs") for n in index.children(""))
+    if not found and index.truncated:
+        # Listing incomplete: probe the paths themselves
+        s = get_session()
+        found = any(
+            http_request("GET", f"https://api.github.com/repos/{owner}/{name}/contents/{d}", s).status_code == 200
+            for d in STATIC_TEST_DIRS
+        )
+        if not found:
+            found = any((e.get("name") or "").endswith("_test.rs") for e in contents_listing(owner, name))
 
     if found:
+        evidence.add("files")
         tool_guess = "cargo"  # rust-first default for this pass
         return True, tool_guess, evidence
 
     return False, None, evidence
 
+# ---------- Workflow files ----------
+def workflow_texts(owner: str, name: str, facts: Optional[Dict] = None) -> List[str]:
+    """
+    Contents of .github/workflows/*.yml|yaml. Taken from the batched GraphQL
+    tree listing when available, else from the repo's cached tree listing
+    (or the contents API if that listing was truncated).
+    """
+    if facts and facts.get("exists"):
+        entries = facts["trees"].get(WORKFLOWS_DIR) or []
+        return [
+            e["text"] for e in entries
+            if e.get("type") == "blob" and e.get("text")
+            and re.search(r"\.(yml|yaml)$", e.get("name") or "", re.IGNORECASE)
+        ]
+
+    index = repo_tree(owner, name)
+    texts = []
+    for n in index.children(WORKFLOWS_DIR):
+        path = f"{WORKFLOWS_DIR}/{n}"
+        if not index.is_file(path) or not re.search(r"\.(yml|yaml)$", n, re.IGNORECASE):
+            continue
+        text = get_repo_trees().read_text(owner, name, index, path)
+        if text:
+            texts.append(text)
+    if not texts and index.truncated:
+        # Listing incomplete: list the workflows directory itself
+        for e in contents_listing(owner, name, WORKFLOWS_DIR):
+            if e.get("type") == "file" and re.search(r"\.(yml|yaml)$", e.get("name") or "", re.IGNORECASE):
+                text = contents_text(owner, name, e.get("path") or f"{WORKFLOWS_DIR}/{e['name']}")
+                if text:
+                    texts.append(text)
+    return texts
+
 # ---------- Workflow scan for test commands ----------
-def detect_workflow_tests_config(owner: str, name: str) -> Tuple[bool, Optional[str], Set[str]]:
+def detect_workflow_tests_config(owner: str, name: str, facts: Optional[Dict] = None) -> Tuple[bool, Optional[str], Set[str]]:
     """
     Look inside .github/workflows/*.yml for test commands or steps named 'test'.
     Returns (configured, tool_guess, evidence_set)
     """
     evidence: Set[str] = set()
     tool_guess: Optional[str] = None
-    s = get_session()
-    url = f"https://api.github.com/repos/{owner}/{name}/contents/.github/workflows"
-    resp = http_request("GET", url, s)
-    if resp.status_code == 404:
-        return False, None, evidence
-    resp.raise_for_status()
-    items = resp.json() or []
     configured = False
 
-    for it in items:
-        if it.get("type") != "file":
-            continue
-        if not re.search(r"\.(yml|yaml)$", it.get("name", ""), re.IGNORECASE):
-            continue
-        dl = it.get("download_url")
-        if not dl:
-            continue
-        fr = http_request("GET", dl, s)
-        if fr.status_code != 200:
-            continue
-        text = fr.text
-
-        for pat, tool in TEST_CMD_PATTERNS:
-            if pat.search(text):
-                configured = True
-                evidence.add("workflow")
-                tool_guess = tool_guess or tool
+    for text in workflow_texts(owner, name, facts):
+        tool = TEST_CMD_MATCHER.first_label(text)
+        if tool:
+            configured = True
+            evidence.add("workflow")
+            tool_guess = tool_guess or tool
 
         if re.search(r"name:\s*.*\btest\b", text, re.IGNORECASE):
             configured = True
@@ -690,29 +819,29 @@ def detect_tests_from_runs(owner: str, name: str, runs: List[Dict]) -> Tuple[boo
                 tool_guess = tool_guess or "cargo"
 
     if tests_seen and not tool_guess:
-        blob = fetch_run_logs(owner, name, int(candidate["id"]))
-        if blob:
+        spool = fetch_run_logs(owner, name, int(candidate["id"]))
+        if spool:
             txt_hint = ""
             try:
-                zf = zipfile.ZipFile(io.BytesIO(blob))
-                for i, info in enumerate(zf.infolist()):
-                    if i > 4:
-                        break
-                    if info.file_size and info.file_size < 1_000_000:
-                        with zf.open(info, "r") as f:
-                            part = f.read(15000).decode("utf-8", errors="ignore")
-                            txt_hint += "\n" + part
+                with spool:
+                    zf = zipfile.ZipFile(spool)
+                    for i, info in enumerate(zf.infolist()):
+                        if i > 4:
+                            break
+                        if info.file_size and info.file_size < 1_000_000:
+                            with zf.open(info, "r") as f:
+                                part = f.read(15000).decode("utf-8", errors="ignore")
+                                txt_hint += "\n" + part
             except Exception:
                 pass
-            for pat, tool in TEST_CMD_PATTERNS:
-                if pat.search(txt_hint):
-                    tool_guess = tool
-                    evidence.add("logs")
-                    break
+            tool = TEST_CMD_MATCHER.first_label(txt_hint)
+            if tool:
+                tool_guess = tool
+                evidence.add("logs")
 
     return tests_seen, tool_guess, evidence
 
-def detect_coverage_integration(owner: str, name: str) -> Tuple[bool, str, Set[str]]:
+def detect_coverage_integration(owner: str, name: str, facts: Optional[Dict] = None) -> Tuple[bool, str, Set[str]]:
     """
     Checks whether coverage tools are configured in the repo/workflows.
     Returns: (configured?, tool_label, evidence_set)
@@ -720,49 +849,25 @@ def detect_coverage_integration(owner: str, name: str) -> Tuple[bool, str, Set[s
     - tool_label: best-guess tool(s)
     - evidence_set: {'workflow','files','env','uploader','report-file'} etc.
     """
-    s = get_session()
     evidence: Set[str] = set()
     tools: Set[str] = set()
     configured = False
 
     # 1) Scan workflows
-    url = f"https://api.github.com/repos/{owner}/{name}/contents/.github/workflows"
-    resp = http_request("GET", url, s)
-    if resp.status_code == 200:
-        items = resp.json() or []
-        for it in items:
-            if it.get("type") != "file":
-                continue
-            if not re.search(r"\.(yml|yaml)$", it.get("name", ""), re.IGNORECASE):
-                continue
-            dl = it.get("download_url")
-            if not dl:
-                continue
-            fr = http_request("GET", dl, s)
-            if fr.status_code != 200:
-                continue
-            text = fr.text
-
-            # Strong signals: commands/envs/uploaders in workflow
-            for pat, label in COVERAGE_TOOL_HINTS:
-                if pat.search(text):
-                    configured = True
-                    tools.add(label)
-                    evidence.add("workflow")
-
-            for pat, label in WORKFLOW_ACTION_HINTS:
-                if pat.search(text):
-                    configured = True
-                    tools.add(label)
-                    evidence.add("workflow")
-
-            # If steps named "coverage" or similar
-            if re.search(r"name:\s*.*\bcoverage\b", text, re.IGNORECASE):
-                configured = True
-                evidence.add("workflow")
-
-    # 2) Probe common repo files quickly (cheap contents calls)
-    #    Note: we avoid a full tree walk to keep requests low.
+    for text in workflow_texts(owner, name, facts):
+        # Strong signals: commands/envs/uploaders in workflow
+        labels = COVERAGE_HINT_MATCHER.labels(text)
+        if labels:
+            configured = True
+            tools |= labels
+            evidence.add("workflow")
+
+        # If steps named "coverage" or similar
+        if re.search(r"name:\s*.*\bcoverage\b", text, re.IGNORECASE):
+            configured = True
+            evidence.add("workflow")
+
+    # 2) Probe common repo files in the cached tree listing; only files that exist are downloaded
     candidate_files = [
         "codecov.yml", ".codecov.yml", ".codecov.yaml", "codecov.yaml",
         ".github/codecov.yml", ".github/codecov.yaml",
@@ -770,27 +875,14 @@ def detect_coverage_integration(owner: str, name: str) -> Tuple[bool, str, Set[s
         ".cargo/config.toml", ".cargo/config",
         "Cargo.toml",
     ]
+    index = repo_tree(owner, name, facts)
     for path in candidate_files:
-        furl = f"https://api.github.com/repos/{owner}/{name}/contents/{path}"
-        r = http_request("GET", furl, s)
-        if r.status_code != 200:
-            continue
-        j = r.json()
-
-        text = ""
-        dl = j.get("download_url")
-        if dl:
-            rf = http_request("GET", dl, s)
-            if rf.status_code == 200:
-                text = rf.text
+        if index.is_file(path):
+            text = get_repo_trees().read_text(owner, name, index, path)
+        elif index.truncated:
+            text = contents_text(owner, name, path)   # listing incomplete: probe the path itself
         else:
-            # fallback: some contents responses include base64 "content"
-            b64 = j.get("content")
-            if b64:
-                try:
-                    text = base64.b64decode(b64).decode("utf-8", errors="ignore")
-                except Exception:
-                    text = ""
+            continue
         if not text:
             continue
 
@@ -801,11 +893,11 @@ def detect_coverage_integration(owner: str, name: str) -> Tuple[bool, str, Set[s
             evidence.add("files")
 
         # light content scan
-        for pat, label in COVERAGE_TOOL_HINTS:
-            if pat.search(text):
-                configured = True
-                tools.add(label)
-                evidence.add("files")
+        labels = COVERAGE_FILE_MATCHER.labels(text)
+        if labels:
+            configured = True
+            tools |= labels
+            evidence.add("files")
 
         # rust-toolchain hints (llvm-tools-preview often used with llvm-cov)
         if "llvm-tools-preview" in text:
@@ -817,20 +909,37 @@ def detect_coverage_integration(owner: str, name: str) -> Tuple[bool, str, Set[s
     return configured, tool_label, evidence
 
 
+# ---------- Batched static probes (GraphQL) ----------
+def fetch_repo_facts(projects: List[Dict]) -> Dict[str, Dict]:
+    """
+    One GraphQL pass over all repos: test-dir probes, the root listing (for
+    *_test.rs) and the workflow files with their text. Replaces ~8 REST calls
+    per repo; repos missing from the result fall back to REST.
+    """
+    batcher = GraphQLBatcher()
+    try:
+        facts = batcher.repo_facts(projects, paths=STATIC_TEST_DIRS, trees=[""], tree_texts=[WORKFLOWS_DIR])
+    except Exception as e:
+        print(f"⚠️ GraphQL probes failed, falling back to REST: {e}")
+        return {}
+    print(f"🧬 GraphQL probes: {batcher.summary()}")
+    return facts
+
 # ---------- Coverage + Test detection per repo ----------
-def extract_repo_coverage_and_tests(owner: str, name: str) -> Tuple[Dict, List[float]]:
+def extract_repo_coverage_and_tests(owner: str, name: str, facts: Optional[Dict] = None) -> Tuple[Dict, List[float], List[Tuple]]:
     """
     A) detect tests (static, workflow, recent runs)
     B) compute coverage stats prioritizing structured reports from artifacts (LCOV/Cobertura/JaCoCo),
        then fall back to check runs, then to regex on logs.
+    Also returns per-file coverage rows (run_id, source, path, covered, total) from the artifact reports.
     """
     # A) test detection
-    has_tests_static, tool_from_files, ev_files = detect_repo_tests_static(owner, name)
-    runs = list_recent_runs(owner, name, PER_PAGE_RUNS, RUNS_PER_REPO, CUTOFF_DAYS)
+    has_tests_static, tool_from_files, ev_files = detect_repo_tests_static(owner, name, facts)
+    runs = list_recent_runs(owner, name, RUNS_PER_REPO, CUTOFF_DAYS)
     tests_recent_runs, tool_from_runs, ev_runs = detect_tests_from_runs(owner, name, runs)
-    tests_in_workflow, tool_from_wf, ev_wf = detect_workflow_tests_config(owner, name)
+    tests_in_workflow, tool_from_wf, ev_wf = detect_workflow_tests_config(owner, name, facts)
 
-    cov_cfg, cov_tool_label, ev_cov = detect_coverage_integration(owner, name)
+    cov_cfg, cov_tool_label, ev_cov = detect_coverage_integration(owner, name, facts)
 
     evidence = set()
     evidence |= ev_files | ev_runs | ev_wf | ev_cov
@@ -840,6 +949,7 @@ def extract_repo_coverage_and_tests(owner: str, name: str) -> Tuple[Dict, List[f
 
     # B) coverage (artifacts → checks → logs)
     coverages: List[float] = []
+    file_rows: List[Tuple] = []
     method_flags = set()
     latest_run_id = None
     latest_run_date = None
@@ -859,12 +969,14 @@ def extract_repo_coverage_and_tests(owner: str, name: str) -> Tuple[Dict, List[f
                     if DEBUG:
                         print(f"   ✗ skip expired artifact: {a.get('name')}")
                     continue
-                blob = download_artifact_zip(owner, name, int(a["id"]))
-                if not blob:
+                spool = download_artifact_zip(owner, name, int(a["id"]))
+                if not spool:
                     continue
-                cov_art, tag = parse_artifact_zip_for_coverage(blob)
+                with spool:
+                    cov_art, tag, files = parse_artifact_zip_for_coverage(spool)
                 if cov_art is not None:
                     coverages.append(cov_art)
+                    file_rows.extend((int(run["id"]), tag, path, c, t) for path, (c, t) in files.items())
                     method_flags.add(tag or "artifacts")
                     found_for_this_run = True
                     if DEBUG:
@@ -897,14 +1009,15 @@ def extract_repo_coverage_and_tests(owner: str, name: str) -> Tuple[Dict, List[f
 
         # (3) Logs fallback (per-run now, not just once)
         try:
-           blob = fetch_run_logs(owner, name, int(run["id"]))
-           if blob:
-            cov2 = parse_logs_zip_for_coverage(blob)
-            if cov2 is not None:
-                coverages.append(cov2)
-                method_flags.add("logs")
-                if DEBUG:
-                    print(f"   ✓ coverage via logs: {cov2:.2f}%")
+            spool = fetch_run_logs(owner, name, int(run["id"]))
+            if spool:
+                with spool:
+                    cov2 = parse_logs_zip_for_coverage(spool)
+                if cov2 is not None:
+                    coverages.append(cov2)
+                    method_flags.add("logs")
+                    if DEBUG:
+                        print(f"   ✓ coverage via logs: {cov2:.2f}%")
         except Exception as e:
             if DEBUG:
                 print(f"   ! logs error: {e}")
@@ -943,15 +1056,30 @@ def extract_repo_coverage_and_tests(owner: str, name: str) -> Tuple[Dict, List[f
         "Coverage Tool (configured)": cov_tool_label,
         "Test Evidence": "/".join(sorted(evidence)) if evidence else "",
     })
-    return row, coverages
+    return row, coverages, file_rows
 
-def process_repo(index: int, owner: str, name: str, allow_list: Optional[AllowList]) -> Optional[Tuple[int, Dict]]:
+def store_file_coverage(owner: str, name: str, rows: List[Tuple]) -> None:
+    """Land per-file coverage in the CI warehouse (short-lived connection; never fails the repo)."""
+    try:
+        with _warehouse_lock:
+            warehouse = Warehouse()
+            try:
+                warehouse.load_file_coverage(repo_key(owner, name), rows)
+            finally:
+                warehouse.close()
+    except Exception as e:
+        print(f"⚠️ Could not store per-file coverage for {owner}/{name}: {e}")
+
+def process_repo(index: int, owner: str, name: str, allow_list: Optional[AllowList],
+                 facts: Optional[Dict] = None) -> Optional[Tuple[int, Dict]]:
     if allow_list and not allow_list.is_allowed(owner, name):
         print(f"[{index}] ⏭️  Skipping {owner}/{name} (not in allow list)")
         return None
     
     print(f"[{index}] {owner}/{name} …")
-    row, _ = extract_repo_coverage_and_tests(owner, name)
+    row, _, file_rows = extract_repo_coverage_and_tests(owner, name, facts)
+    if file_rows:
+        store_file_coverage(owner, name, file_rows)
     print(f"[{index}] {owner}/{name} → tests_static={row['Has Tests (static)']}, "
           f"ci_cfg={row['Tests in CI (configured)']}, ci_recent={row['Tests in CI (recent runs)']}, "
           f"samples={row['Coverage Samples']}")
@@ -974,6 +1102,11 @@ def main():
         "--allow-list",
         help="Path to a text file with one 'owner/repo' or 'owner' slug per line. Only process these repos.",
     )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Ignore the run journal and re-analyze every repo.",
+    )
     args = parser.parse_args()
 
     try:
@@ -994,12 +1127,27 @@ def main():
     total = len(projects)
     
     allow_list = AllowList(args.allow_list) if args.allow_list else None
-    
-    print(f"📊 Processing {total} repos with {WORKERS} workers…")
+
+    # Resume: rows already finished under the same tunables are replayed from the journal
+    journal = RunJournal("24_1_ci_theater_coverage_rust", {
+        "runs_per_repo": RUNS_PER_REPO,
+        "cutoff_days": CUTOFF_DAYS,
+    })
+    if args.fresh:
+        journal.reset()
+    done = journal.completed()
+
     ordered: List[Optional[Dict]] = [None] * total
+    for i, p in enumerate(projects):
+        ordered[i] = done.get(f"{p['owner']}/{p['name']}".lower())
+    resumed = sum(r is not None for r in ordered)
+    if resumed:
+        print(f"♻️  Resuming: {resumed} repos already in the run journal, {total - resumed} to go")
+
+    print(f"📊 Processing {total - resumed} repos with {WORKERS} workers…")
     processed_count = 0
 
-    # Define fieldnames early for use in periodic writese
+    # Output column order
     fieldnames = [
         "name",
         "Has Tests (static)",
@@ -1019,30 +1167,39 @@ def main():
     ]
 
     def write_results_to_csv(rows_to_write):
-        with open(CSV_FILE, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for r in rows_to_write:
-                writer.writerow({k: r.get(k, "") for k in fieldnames})
+        rows = [{k: r.get(k, "") for k in fieldnames} for r in rows_to_write]
+        return write_table(rows, CSV_FILE, "coverage", fieldnames=fieldnames)
 
     start = time.time()
+    todo = [p for i, p in enumerate(projects) if ordered[i] is None
+            and not (allow_list and not allow_list.is_allowed(p["owner"], p["name"]))]
+    facts = fetch_repo_facts(todo) if todo else {}
+
     with ThreadPoolExecutor(max_workers=WORKERS) as ex:
-        futures = []
+        futures = {}
         for i, p in enumerate(projects, start=1):
-            futures.append(ex.submit(process_repo, i, p["owner"], p["name"], allow_list))
+            if ordered[i - 1] is None:
+                slug = f"{p['owner']}/{p['name']}"
+                fut = ex.submit(process_repo, i, p["owner"], p["name"], allow_list, facts.get(slug))
+                futures[fut] = slug
 
+        # Each finished repo is committed to the journal immediately, so a
+        # killed run loses at most the repos that were in flight.
         for fut in as_completed(futures):
-            result = fut.result()
+            slug = futures[fut]
+            try:
+                result = fut.result()
+            except Exception as e:
+                print(f"❌ {slug}: {e}")
+                journal.record_failure(slug, e)
+                continue
             if result:
                 idx, row = result
                 ordered[idx - 1] = row
+                journal.record(slug, row)
                 processed_count += 1
-
-                # Write to CSV every 5 repos
-                if processed_count % 5 == 0 or processed_count == total:
-                    current_results = [r for r in ordered if r is not None]
-                    write_results_to_csv(current_results)
-                    print(f"  [checkpoint] Wrote {len(current_results)}/{processed_count} results to {CSV_FILE}")
+                if processed_count % 25 == 0:
+                    print(f"  [checkpoint] {processed_count} repos journaled")
 
     results = [r for r in ordered if r is not None]
 
@@ -1054,48 +1211,66 @@ def main():
             pass
 
         # Final write to ensure all results are saved
-        write_results_to_csv(results)
+        written = write_results_to_csv(results)
         dur = round(time.time() - start, 1)
-        print(f"\n✅ Results saved to {CSV_FILE} in {dur}s")
+        print(f"\n✅ Results saved to {', '.join(written)} in {dur}s")
+        print(f"📒 Run journal: {journal.summary()}")
+        if get_cache():
+            print(f"🗄️  HTTP cache: {get_cache().summary()}")
+        if journal.finish():
+            print("📒 No failures; run journal cleared (the next run starts fresh)")
     else:
         print("No results.")
 
 # ---------- Logs fallback parser (kept from original) ----------
-def parse_logs_zip_for_coverage(zip_bytes: bytes) -> Optional[float]:
-    """Scan ZIP of run logs and return highest plausible coverage percentage found (fallback)."""
+def _coverage_in_text(text: str) -> Optional[float]:
+    """Highest plausible percentage over all COVERAGE_PATTERNS matches, in one scan."""
+    best = None
+    for idx, _rule, m in COVERAGE_MATCHER.finditer(text):
+        val = None
+        for g in COVERAGE_MATCHER.rule_groups(idx, m):
+            try:
+                val = float(g)
+                break
+            except Exception:
+                continue
+        if val is not None and 0.0 <= val <= 100.0:
+            best = max(best, val) if best is not None else val
+    return best
+
+def parse_logs_zip_for_coverage(zip_file: IO[bytes]) -> Optional[float]:
+    """
+    Scan ZIP of run logs and return highest plausible coverage percentage found (fallback).
+    Step logs whose name points at coverage (tarpaulin, llvm-cov, codecov, ...) are
+    scanned first and a hit there is returned immediately. Otherwise the job logs are
+    scanned chunk by chunk; per-step copies of the same text are skipped.
+    """
     try:
-        zf = zipfile.ZipFile(io.BytesIO(zip_bytes))
+        zf = zipfile.ZipFile(zip_file)
     except Exception:
         return None
 
-    best = None
-    for info in zf.infolist():
-        if info.file_size == 0:
-            continue
-        try:
-            with zf.open(info, "r") as f:
-                chunk = f.read()
-            try:
-                text = chunk.decode("utf-8", errors="ignore")
-            except Exception:
-                text = chunk.decode("latin-1", errors="ignore")
-        except Exception:
-            continue
+    members = [info for info in zf.infolist() if info.file_size and not info.is_dir()]
+    hinted = [info for info in members if LOG_MEMBER_HINT.search(info.filename)]
+    top_level = [info for info in members if "/" not in info.filename]
+    # Job-level files (top level) already contain every step log of the job
+    rest = top_level or [info for info in members if info not in hinted]
 
-        for pat in COVERAGE_PATTERNS:
-            for m in pat.finditer(text):
-                if m.lastindex:
-                    val = None
-                    for gi in range(1, m.lastindex + 1):
-                        g = m.group(gi)
-                        try:
-                            val = float(g)
-                            break
-                        except Exception:
-                            continue
-                    if val is not None and 0.0 <= val <= 100.0:
+    for group, confident in ((hinted, True), (rest, False)):
+        best = None
+        for info in group:
+            try:
+                for text in iter_member_text(zf, info):
+                    val = _coverage_in_text(text)
+                    if val is not None:
                         best = max(best, val) if best is not None else val
-    return best
+            except Exception:
+                continue
+            if confident and best is not None:
+                return best
+        if best is not None:
+            return best
+    return None
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,6 +5,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from tables import read_table
+
 # --- Project Size Categorization ---
 def categorize_project(sloc: int) -> str:
     """Categorizes a project based on its Source Lines of Code (SLOC)."""
@@ -21,14 +23,11 @@ COL_HAS_TESTS = "Has Tests (static)"
 COL_TESTS_CI = "Tests in CI (configured)"
 COL_COV_CI = "Coverage in CI (configured)"
 COL_COV_LATEST = "Coverage Latest (%)"
+COVERAGE_COLS = [COL_HAS_TESTS, COL_TESTS_CI, COL_COV_CI, COL_COV_LATEST]
 
-def norm_yes_no(series: pd.Series) -> pd.Series:
-    """Normalize Yes/No values to booleans; anything else -> False."""
-    return series.astype(str).str.strip().str.lower().map({"yes": True, "no": False}).fillna(False)
-
-def numeric(series: pd.Series) -> pd.Series:
-    """Coerce series to numeric (NaN on failure)."""
-    return pd.to_numeric(series, errors="coerce")
+def flag(series: pd.Series) -> pd.Series:
+    """Yes/No columns arrive as nullable booleans from read_table(); missing -> False."""
+    return series.fillna(False).astype(bool)
 
 def load_coverage_data(input_csv: str, cohort_name: str) -> pd.Series:
     """
@@ -36,7 +35,7 @@ def load_coverage_data(input_csv: str, cohort_name: str) -> pd.Series:
     with coverage configured in CI.
     """
     try:
-        df = pd.read_csv(input_csv)
+        df = read_table(input_csv, COVERAGE_COLS, "coverage")
     except FileNotFoundError:
         print(f"Error: Input file not found at '{input_csv}'")
         return pd.Series(dtype=float)
@@ -47,15 +46,15 @@ def load_coverage_data(input_csv: str, cohort_name: str) -> pd.Series:
             print(f"Error: Missing expected column '{col}' in {input_csv}")
             return pd.Series(dtype=float)
     
-    has_tests = norm_yes_no(df[COL_HAS_TESTS])
-    tests_in_ci = norm_yes_no(df[COL_TESTS_CI])
-    cov_in_ci = norm_yes_no(df[COL_COV_CI])
+    has_tests = flag(df[COL_HAS_TESTS])
+    tests_in_ci = flag(df[COL_TESTS_CI])
+    cov_in_ci = flag(df[COL_COV_CI])
     
     # Determine projects that have CI with coverage configured.
     ci_with_coverage = has_tests & tests_in_ci & cov_in_ci
     
     if COL_COV_LATEST in df.columns:
-        cov_latest = numeric(df[COL_COV_LATEST])
+        cov_latest = df[COL_COV_LATEST]
     else:
         cov_latest = pd.Series(dtype=float)
     
@@ -142,8 +141,8 @@ def generate_coverage_by_size_plot(coverage_file: str, sizes_file: str, cohort_n
     Generates a boxplot of test coverage by project size for a single cohort.
     """
     try:
-        coverage_df = pd.read_csv(coverage_file)
-        sizes_df = pd.read_csv(sizes_file)
+        coverage_df = read_table(coverage_file, ["name"] + COVERAGE_COLS, "coverage")
+        sizes_df = read_table(sizes_file, ["name", "rust_sloc"], "sloc_summary")
     except FileNotFoundError as e:
         print(f"Error: Input file not found: {e.filename}")
         return False
@@ -156,13 +155,11 @@ def generate_coverage_by_size_plot(coverage_file: str, sizes_file: str, cohort_n
         return False
 
     # Filter for projects with valid coverage data
-    has_tests = norm_yes_no(df[COL_HAS_TESTS])
-    tests_in_ci = norm_yes_no(df[COL_TESTS_CI])
-    cov_in_ci = norm_yes_no(df[COL_COV_CI])
+    has_tests = flag(df[COL_HAS_TESTS])
+    tests_in_ci = flag(df[COL_TESTS_CI])
+    cov_in_ci = flag(df[COL_COV_CI])
     ci_with_coverage = has_tests & tests_in_ci & cov_in_ci
     
-    df[COL_COV_LATEST] = numeric(df[COL_COV_LATEST])
-    
     mask = ci_with_coverage & df[COL_COV_LATEST].notna()
     df = df[mask].copy()
 
@@ -238,14 +235,14 @@ def perform_ci_adoption_analysis(args):
     """
     if args.ci_input_csv:
         try:
-            df = pd.read_csv(args.ci_input_csv)
+            df = read_table(args.ci_input_csv, ["has_ci", COL_TESTS_CI], "coverage")
         except FileNotFoundError as e:
             print(f"Error: File not found: {e.filename}")
             return
     else:
         try:
-            df_mono = pd.read_csv(args.mono_input_csv)
-            df_poly = pd.read_csv(args.poly_input_csv)
+            df_mono = read_table(args.mono_input_csv, ["has_ci", COL_TESTS_CI], "coverage")
+            df_poly = read_table(args.poly_input_csv, ["has_ci", COL_TESTS_CI], "coverage")
         except FileNotFoundError as e:
             print(f"Error: File not found: {e.filename}")
             return
@@ -260,8 +257,11 @@ def perform_ci_adoption_analysis(args):
             print("Error: Expected column 'has_ci' or 'Tests in CI (configured)' not found in the CSV file(s).")
             return
 
-    # Convert yes/no to booleans
-    df['Has CI'] = df['has_ci'].astype(str).str.strip().str.lower().map({'yes': True, 'no': False})
+    # 'Tests in CI (configured)' is already boolean; a separate has_ci column may still be yes/no text
+    if df['has_ci'].dtype == "boolean":
+        df['Has CI'] = df['has_ci']
+    else:
+        df['Has CI'] = df['has_ci'].astype(str).str.strip().str.lower().map({'yes': True, 'no': False})
     
     # Count projects with and without CI
     counts = df['Has CI'].value_counts().sort_index()
@@ -2,13 +2,14 @@ import argparse
 import os
 import pandas as pd
 import matplotlib.pyplot as plt
-import git
-import tempfile
 import sys
 from datetime import datetime, timezone, timedelta
-import concurrent.futures
 import seaborn as sns
 
+from git_history import count_commits
+from mirror_cache import get_mirror_cache
+from pipeline import run_pipeline
+
 # --- Helper Function for sizing ---
 def categorize_project(sloc: int) -> str:
     """Categorizes a project based on its Source Lines of Code (SLOC)."""
@@ -19,24 +20,31 @@ def categorize_project(sloc: int) -> str:
     else:
         return "Large"
 
-# --- Core Metric Calculation (Clones repos to get velocity) ---
-def get_pre_ci_velocity(repo_name: str, clone_dir: str, ci_adoption_date_str: str) -> dict | None:
-    """Clones a repo to calculate commit velocity before a GIVEN CI adoption date."""
-    repo_url = f"https://github.com/{repo_name}.git"
-    repo_path = os.path.join(clone_dir, repo_name.replace("/", "_"))
+# --- Network stage (pipeline thread): sync the repo's local git mirror ---
+def sync_mirror(row: tuple) -> tuple:
+    """Clone (first run) or fetch the repo's mirror; returns the arguments for get_pre_ci_velocity."""
+    repo_name, ci_adoption_date_str = row
+    print(f"  Syncing mirror of {repo_name} (the first run may take a moment)...", flush=True)
+    # Only commit timestamps are needed: a commits-only (--filter=tree:0) mirror is enough
+    get_mirror_cache().ensure(repo_name, filter_spec="tree:0")
+    return repo_name, ci_adoption_date_str
+
+# --- Core Metric Calculation (pipeline worker process; a date-bounded rev-list on the synced mirror) ---
+def get_pre_ci_velocity(repo_name: str, ci_adoption_date_str: str) -> dict | None:
+    """Uses the repo's local mirror (cloned once, fetched afterwards) to calculate commit velocity before a GIVEN CI adoption date."""
     try:
-        print(f"  Cloning {repo_name} (this may take a moment)...", end="", flush=True)
-        repo = git.Repo.clone_from(repo_url, repo_path)
         ci_adoption_date_str = ci_adoption_date_str.split('T')[0]
         ci_adoption_date = datetime.strptime(ci_adoption_date_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
         window_start_date = ci_adoption_date - timedelta(days=182)
-        commits = list(repo.iter_commits())
-        pre_ci_commit_count = sum(1 for c in commits if window_start_date <= datetime.fromtimestamp(c.committed_date, tz=timezone.utc) < ci_adoption_date)
+        # Window [start, CI adoption) counted by git itself (--until is inclusive, hence the 1s)
+        with get_mirror_cache().using(repo_name, filter_spec="tree:0") as git_dir:
+            pre_ci_commit_count = count_commits(git_dir, since=window_start_date,
+                                                until=ci_adoption_date - timedelta(seconds=1))
         velocity = pre_ci_commit_count / 26.0
-        print(f" Done. Velocity={velocity:.2f}", flush=True)
+        print(f"  {repo_name}: velocity={velocity:.2f}", flush=True)
         return {"Project": repo_name, "velocity": velocity}
     except Exception as e:
-        print(f" Error during analysis for {repo_name}: {e}", flush=True)
+        print(f"  Error during analysis for {repo_name}: {e}", flush=True)
         return None
 
 # --- New function to handle the heavy computation and save results ---
@@ -55,25 +63,16 @@ def compute_and_cache_data(stats_file: str, sizes_file: str, cohort_name: str) -
         return pd.DataFrame()
 
     velocity_results = []
-    MAX_WORKERS = (os.cpu_count() or 1) * 2
-    
-    # Ensure /temp directory exists
-    os.makedirs('/temp', exist_ok=True)
-    with tempfile.TemporaryDirectory(dir='/temp') as temp_dir:
-        print(f"\nAnalyzing {len(stats_df)} repositories in {temp_dir}...")
-        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            future_to_repo = {
-                executor.submit(get_pre_ci_velocity, row['Project'], temp_dir, row['First CI Run Date']): row['Project']
-                for index, row in stats_df.iterrows()
-            }
-            for future in concurrent.futures.as_completed(future_to_repo):
-                try:
-                    metrics = future.result()
-                    if metrics:
-                        velocity_results.append(metrics)
-                except Exception as exc:
-                    print(f"\nAn exception occurred: {exc}", file=sys.stderr)
-    
+
+    print(f"\nAnalyzing {len(stats_df)} repositories (git mirror cache: {get_mirror_cache().root})...")
+    # Mirror syncs on threads, history walks (GIL-bound) on a process pool sized to the cores
+    rows = list(zip(stats_df['Project'], stats_df['First CI Run Date']))
+    for (repo_name, _date), metrics, error in run_pipeline(rows, sync_mirror, get_pre_ci_velocity):
+        if error is not None:
+            print(f"\nAn exception occurred for {repo_name}: {error}", file=sys.stderr)
+        elif metrics:
+            velocity_results.append(metrics)
+
     if not velocity_results: return pd.DataFrame()
         
     velocity_df = pd.DataFrame(velocity_results)
@@ -4,6 +4,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from tables import read_table
+
 def categorize_project(sloc: int) -> str:
     """Categorizes a project based on its source lines of code (SLOC)."""
     if sloc < 10000:
@@ -18,8 +20,8 @@ def process_cohort(builds_file: str, sizes_file: str, cohort_name: str):
     Reads build and size data, merges them, and prepares a DataFrame for plotting.
     """
     try:
-        builds_df = pd.read_csv(builds_file)
-        sizes_df = pd.read_csv(sizes_file)
+        builds_df = read_table(builds_file, ["name", "Avg Duration (min)", "Runs Counted"], "long_builds")
+        sizes_df = read_table(sizes_file, ["repo", "rust_sloc"], "sloc_summary")
     except FileNotFoundError as e:
         print(f"Error: Input file not found: {e.filename}")
         return None
@@ -28,10 +30,8 @@ def process_cohort(builds_file: str, sizes_file: str, cohort_name: str):
     sizes_df["Category"] = sizes_df["rust_sloc"].apply(categorize_project)
     df = pd.merge(builds_df, sizes_df[["repo", "Category"]], left_on="name", right_on="repo", how="inner")
     
-    # Clean and process data
-    df["Avg Duration (min)"] = pd.to_numeric(df["Avg Duration (min)"], errors="coerce")
-    df["Runs Counted"] = pd.to_numeric(df["Runs Counted"], errors="coerce")
-    df = df[df["Runs Counted"] > 0]
+    # Clean and process data (columns are already typed by read_table)
+    df = df[df["Runs Counted"].fillna(0) > 0]
     df.dropna(subset=["Avg Duration (min)"], inplace=True)
     
     if df.empty:
@@ -5,6 +5,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from tables import read_table
+
 # --- Project Size Categorization ---
 def categorize_project(sloc: int) -> str:
     """Categorizes a project based on its Source Lines of Code (SLOC)."""
@@ -21,8 +23,8 @@ def process_cohort(broken_builds_file: str, sizes_file: str, cohort_name: str):
     Loads, merges, and prepares data for a single cohort.
     """
     try:
-        builds_df = pd.read_csv(broken_builds_file)
-        sizes_df = pd.read_csv(sizes_file)
+        builds_df = read_table(broken_builds_file, ["name", "Mean Duration"], "broken_builds")
+        sizes_df = read_table(sizes_file, ["repo", "rust_sloc"], "sloc_summary")
     except FileNotFoundError as e:
         print(f"Error: Input file not found for cohort '{cohort_name}': {e.filename}")
         return None, None
@@ -34,9 +36,8 @@ def process_cohort(broken_builds_file: str, sizes_file: str, cohort_name: str):
         print(f"Warning: No matching projects found for cohort '{cohort_name}'.")
         return None, None
 
-    # Convert metrics to numeric, coercing errors. We'll plot the mean duration of broken stretches.
+    # Metrics are typed by read_table (unparseable -> NaN). We'll plot the mean duration of broken stretches.
     metric_to_plot = "Mean Duration"
-    df[metric_to_plot] = pd.to_numeric(df[metric_to_plot], errors='coerce')
     df.dropna(subset=[metric_to_plot], inplace=True)
 
     if df.empty:
@@ -1,20 +1,19 @@
 #!/usr/bin/env python3
 import os
-import time
-import csv
-import math
-import random
+import asyncio
 import argparse
 import importlib
-from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 from tabulate import tabulate
 
+from ci_warehouse import Warehouse, ingest
+from github_cache import get_cache
+from github_client import MAX_CONCURRENCY
+from run_journal import RunJournal
+from run_store import get_run_store
+from tables import write_table
+
 # --- Adapter for flat slugs ---
 def _parse_slug(slug: str) -> tuple[str, str]:
     """
@@ -54,246 +53,68 @@ def _to_project_dicts(slugs: list[str]) -> list[dict]:
 # --------------------------
 # Config
 # --------------------------
-MAX_WORKERS = 4
-PER_PAGE = 100
 MAX_RUNS_PER_REPO = 100
-BASE_BACKOFF = 1.0          # seconds
-MAX_BACKOFF = 60.0          # seconds
-PER_REQUEST_PAUSE = 0.2     # gentle pacing between requests
-USER_AGENT = "ci-theater-broken-builds/1.0"
 
-# --------------------------
-# Auth & session
-# --------------------------
 load_dotenv()
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "").strip()
-if not GITHUB_TOKEN:
+if not os.getenv("GITHUB_TOKEN", "").strip():
     print("⚠️  No GITHUB_TOKEN found. You will be heavily rate limited by GitHub.")
-HEADERS = {
-    "Authorization": f"token {GITHUB_TOKEN}" if GITHUB_TOKEN else "",
-    "Accept": "application/vnd.github+json",
-    "User-Agent": USER_AGENT,
-}
-
-session = requests.Session()
-# Robust retry for transient errors (NOT for 403 rate-limit)
-retry = Retry(
-    total=5,
-    read=5,
-    connect=5,
-    backoff_factor=0.8,
-    status_forcelist=(429, 500, 502, 503, 504),
-    allowed_methods=frozenset(["GET"]),
-    raise_on_status=False,
-)
-adapter = HTTPAdapter(max_retries=retry, pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
-session.mount("https://", adapter)
-session.mount("http://", adapter)
-
-# --------------------------
-# Helpers
-# --------------------------
-def _sleep_with_jitter(seconds: float):
-    # Add small jitter to avoid synchronized hammering
-    jitter = seconds * 0.1 * random.random()
-    time.sleep(seconds + jitter)
-
-def _handle_rate_limit(resp: requests.Response, attempt: int) -> bool:
-    """
-    Returns True if caller should retry after sleeping, False if not handled here.
-    Handles:
-      - Primary rate limit (X-RateLimit-Remaining == 0) with X-RateLimit-Reset
-      - Secondary/abuse rate limits (403 with message hints)
-      - 429 Too Many Requests with Retry-After
-    """
-    status = resp.status_code
-    # 429: respect Retry-After if present
-    if status == 429:
-        retry_after = resp.headers.get("Retry-After")
-        if retry_after:
-            try:
-                wait = float(retry_after)
-            except ValueError:
-                wait = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt))
-        else:
-            wait = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt))
-        print(f"🕒 429 Too Many Requests. Sleeping {wait:.1f}s…")
-        _sleep_with_jitter(wait)
-        return True
-
-    if status == 403:
-        remaining = resp.headers.get("X-RateLimit-Remaining")
-        reset = resp.headers.get("X-RateLimit-Reset")
-        # Primary rate limit exhausted
-        if remaining == "0" and reset:
-            try:
-                reset_epoch = int(reset)
-            except ValueError:
-                reset_epoch = math.ceil(time.time()) + int(min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt)))
-            now = math.ceil(time.time())
-            wait = max(1, reset_epoch - now) + 1  # add 1s cushion
-            # Cap the sleep to avoid excessively long pauses; still informative
-            capped = min(wait, 120)
-            print(f"🕒 Primary rate limit hit. Reset in ~{wait}s. Sleeping {capped}s…")
-            _sleep_with_jitter(capped)
-            return True
-
-        # Secondary/abuse rate limit (GitHub returns 403 with specific message)
-        try:
-            msg = resp.json().get("message", "").lower()
-        except Exception:
-            msg = ""
-        if "abuse detection" in msg or "secondary rate limit" in msg:
-            wait = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** (attempt + 1)))
-            print(f"🛡️  Secondary/abuse limit. Backing off {wait:.1f}s…")
-            _sleep_with_jitter(wait)
-            return True
-
-    return False  # not handled here
-
-def github_get(url: str, params=None, max_attempts: int = 8):
-    """
-    GET with robust handling for rate limits and transient errors.
-    Returns JSON on success; raises on non-retryable failure.
-    """
-    attempt = 0
-    while True:
-        attempt += 1
-        try:
-            resp = session.get(url, headers=HEADERS, params=params, timeout=30)
-        except requests.RequestException as e:
-            if attempt >= max_attempts:
-                raise
-            wait = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt))
-            print(f"🌐 Network error {e}. Retry {attempt}/{max_attempts} in {wait:.1f}s…")
-            _sleep_with_jitter(wait)
-            continue
-
-        # Successful
-        if 200 <= resp.status_code < 300:
-            _sleep_with_jitter(PER_REQUEST_PAUSE)
-            return resp.json()
-
-        # Rate limit handler may sleep & retry
-        if _handle_rate_limit(resp, attempt) and attempt < max_attempts:
-            continue
-
-        # If still here and retriable status, do backoff
-        if resp.status_code in (500, 502, 503, 504):
-            if attempt < max_attempts:
-                wait = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt))
-                print(f"🔁 {resp.status_code} from GitHub. Retry {attempt}/{max_attempts} in {wait:.1f}s…")
-                _sleep_with_jitter(wait)
-                continue
-
-        # Not retriable / maxed out
-        try:
-            detail = resp.json()
-        except Exception:
-            detail = resp.text
-        raise requests.HTTPError(f"GitHub GET failed: {resp.status_code} {detail}")
 
 # --------------------------
 # Core logic
 # --------------------------
-def fetch_runs(owner: str, name: str, max_runs: int = MAX_RUNS_PER_REPO):
-    all_runs = []
-    full_slug = f"{owner}/{name}"
-    page = 1
-    while len(all_runs) < max_runs:
-        url = f"https://api.github.com/repos/{owner}/{name}/actions/runs"
-        params = {"per_page": PER_PAGE, "page": page}
-        try:
-            data = github_get(url, params=params)
-        except Exception as e:
-            print(f"❌ Error fetching {full_slug}: {e}")
-            break
-
-        runs = data.get("workflow_runs", []) or []
-        if not runs:
-            break
-        all_runs.extend(runs)
-        if len(runs) < PER_PAGE:
-            break
-        page += 1
-    return all_runs[:max_runs]
-
-def compute_broken_stretches(runs):
-    # Sort by creation time ascending
-    runs = sorted(
-        runs,
-        key=lambda r: r.get("created_at") or ""
-    )
-    broken_periods = []
-    broken_since = None
-    for run in runs:
-        status = run.get("conclusion")
-        created_str = run.get("created_at")
-        if not created_str:
-            continue
-        created = datetime.fromisoformat(created_str.replace("Z", "+00:00"))
-        if status == "failure":
-            if broken_since is None:
-                broken_since = created
-        elif status == "success":
-            if broken_since:
-                delta_days = (created - broken_since).days
-                broken_periods.append(delta_days)
-                broken_since = None
-        else:
-            pass
-
-    if broken_since:
-        now = datetime.now(timezone.utc)
-        trailing_days = (now - broken_since).days
-        broken_periods.append(trailing_days)
-
-    if not broken_periods:
-        return 0, 0, 0, 0  # num_broken, q1, mean, q3
-
-    broken_periods.sort()
-    len_periods = len(broken_periods)
-
-    # 1st Quartile
-    index_q1 = math.ceil(0.25 * len_periods) - 1
-    first_quartile = broken_periods[index_q1]
-
-    # 3rd Quartile
-    index_q3 = math.ceil(0.75 * len_periods) - 1
-    third_quartile = broken_periods[index_q3]
-
-    mean_duration = sum(broken_periods) / len_periods
-    num_broken_builds = len_periods
-
-    return num_broken_builds, first_quartile, mean_duration, third_quartile
+def _empty_row(full_slug: str) -> dict:
+    return {
+        "name": full_slug,
+        "Runs Analyzed": 0,
+        "Number of Broken Builds": "",
+        "First Quartile": "",
+        "Mean Duration": "",
+        "Third Quartile": "",
+    }
 
-def process_project(p):
-    owner, name = p["owner"], p["name"]
-    full_slug = f"{owner}/{name}"
-    print(f"🔎 Checking {full_slug}…")
-    runs = fetch_runs(owner, name, max_runs=MAX_RUNS_PER_REPO)
-    if not runs:
-        return {
-            "name": full_slug,
-            "Runs Analyzed": 0,
-            "Number of Broken Builds": "",
-            "First Quartile": "",
-            "Mean Duration": "",
-            "Third Quartile": "",
-        }
-    num_broken_builds, first_quartile, mean_duration, third_quartile = compute_broken_stretches(runs)
+def _stretch_row(full_slug: str, stats: dict | None) -> dict:
+    """Format one row of Warehouse.broken_stretches() (failure → next success, in days)."""
+    if not stats:
+        return _empty_row(full_slug)
     return {
         "name": full_slug,
-        "Runs Analyzed": len(runs),
-        "Number of Broken Builds": num_broken_builds,
-        "First Quartile": first_quartile,
-        "Mean Duration": round(mean_duration, 2),
-        "Third Quartile": third_quartile,
+        "Runs Analyzed": stats["runs"],
+        "Number of Broken Builds": stats["num_broken"],
+        "First Quartile": stats["q1"],
+        "Mean Duration": round(stats["mean"], 2),
+        "Third Quartile": stats["q3"],
     }
 
 # --------------------------
-# Parallel execution (4 workers)
+# Warehouse sync + query
 # --------------------------
+def collect(projects, concurrency: int, journal: RunJournal):
+    """
+    Land the latest runs of every repo in the CI warehouse (only runs newer
+    than the run-store watermark hit the API). Each repo's broken-build
+    stretches are computed and journaled as soon as its load completes, so an
+    interrupted run keeps every repo that already finished.
+    """
+    warehouse = Warehouse()
+    rows = {}
+
+    def journal_repo(full_slug: str, error: str | None) -> None:
+        if error is not None:
+            journal.record_failure(full_slug, error)
+            rows[full_slug] = _empty_row(full_slug)
+            return
+        stats = warehouse.broken_stretches([full_slug], MAX_RUNS_PER_REPO)
+        row = _stretch_row(full_slug, stats.get(full_slug.lower()))
+        journal.record(full_slug, row)
+        rows[full_slug] = row
+
+    try:
+        asyncio.run(ingest(projects, warehouse, concurrency=concurrency,
+                           max_runs=MAX_RUNS_PER_REPO, on_done=journal_repo))
+    finally:
+        warehouse.close()
+    return [rows[f"{p['owner']}/{p['name']}"] for p in projects]
+
 def main():
     parser = argparse.ArgumentParser(description="Analyze broken build stretches for a list of GitHub repos.")
     parser.add_argument(
@@ -306,6 +127,17 @@ def main():
         required=True,
         help="Path to the output CSV file.",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=MAX_CONCURRENCY,
+        help="Maximum number of in-flight GitHub requests.",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Ignore the run journal and re-fetch every repo.",
+    )
     args = parser.parse_args()
 
     try:
@@ -320,26 +152,24 @@ def main():
         raise RuntimeError(error_msg)
 
     projects = _to_project_dicts(_slug_projects)
-    results = []
-    # Run in parallel with exactly 4 threads
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_map = {executor.submit(process_project, p): p for p in projects}
-        for fut in as_completed(future_map):
-            p = future_map[fut]
-            try:
-                res = fut.result()
-            except Exception as e:
-                full_slug = f"{p['owner']}/{p['name']}"
-                print(f"❌ Unhandled error on {full_slug}: {e}")
-                res = {
-                    "name": full_slug,
-                    "Runs Analyzed": 0,
-                    "Number of Broken Builds": "",
-                    "First Quartile": "",
-                    "Mean Duration": "",
-                    "Third Quartile": "",
-                }
-            results.append(res)
+
+    # Resume: replay repos already finished under the same parameters
+    journal = RunJournal("28_ci_theater_broken_builds_rust_new", {"max_runs": MAX_RUNS_PER_REPO})
+    if args.fresh:
+        journal.reset()
+    done = journal.completed()
+    results, pending = [], []
+    for p in projects:
+        row = done.get(f"{p['owner']}/{p['name']}".lower())
+        if row is not None:
+            results.append(row)
+        else:
+            pending.append(p)
+    if results:
+        print(f"♻️  Resuming: {len(results)} repos already in the run journal, {len(pending)} to go")
+
+    print(f"📊 Processing {len(pending)} repos with up to {args.concurrency} in-flight requests…")
+    results += collect(pending, args.concurrency, journal)
 
     # Keep output stable: sort by repo name
     results.sort(key=lambda r: r["name"])
@@ -354,11 +184,14 @@ def main():
     out_path = args.output_file
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
     if results:
-        with open(out_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=results[0].keys())
-            writer.writeheader()
-            writer.writerows(results)
-        print(f"\n✅ Results saved to {out_path}")
+        written = write_table(results, out_path, "broken_builds", fieldnames=list(results[0].keys()))
+        print(f"\n✅ Results saved to {', '.join(written)}")
+        print(f"📒 Run journal: {journal.summary()}")
+        print(f"🏃 Run store: {get_run_store().summary()}")
+        if get_cache():
+            print(f"🗄️  HTTP cache: {get_cache().summary()}")
+        if journal.finish():
+            print("📒 No failures; run journal cleared (the next run starts fresh)")
     else:
         print(f"\n⚠️ No rows written (no results).")
 
@@ -5,7 +5,8 @@ import matplotlib.pyplot as plt
 import argparse
 import importlib
 
-from bug_issue_utils import get_bug_issues
+from bug_issue_utils import COUNT_MODES, SEARCH_APPROXIMATION, count_bug_issues
+from tables import write_table
 
 OUTPUT_DIR = "data"
 STATS_CSV = "data/23_github_projects_stats_rust.csv"
@@ -22,7 +23,24 @@ def main():
         required=True,
         help="Path to the output CSV file.",
     )
+    parser.add_argument(
+        "--count-mode",
+        choices=COUNT_MODES,
+        default="scan",
+        help="'scan' (default): sync the local issue store (new/updated issues only) and apply the exact "
+             "keyword-in-body heuristic; 'local': re-classify the stored issues without API requests; "
+             "'search': two Search API totals per repo (fast, but approximate: whole-word matching "
+             "of fewer keywords).",
+    )
+    parser.add_argument(
+        "--bug-labels",
+        nargs="+",
+        help="Bug labels: in search mode they replace the keyword query; in scan/local mode "
+             "an issue carrying any of them also counts as a bug.",
+    )
     args = parser.parse_args()
+    if args.count_mode == "search":
+        print(f"⚠️  {SEARCH_APPROXIMATION}")
 
     try:
         projects_module = importlib.import_module(args.projects_file)
@@ -59,7 +77,7 @@ def main():
             owner, repo = project.split("/", 1)
             print(f"Processing {owner}/{repo}...")
 
-            stats = get_bug_issues(owner, repo, ci_date)
+            stats = count_bug_issues(owner, repo, ci_date, mode=args.count_mode, labels=args.bug_labels)
             results.append({
                 "Project": project,
                 "Bug Issues Before CI": stats["before"],
@@ -74,9 +92,8 @@ def main():
         bug_df = pd.DataFrame(results)
         # Save to CSV for other analyses
         out_csv_path = args.output_file
-        os.makedirs(os.path.dirname(out_csv_path) or ".", exist_ok=True)
-        bug_df.to_csv(out_csv_path, index=False)
-        print(f"✅ Bug data saved to {out_csv_path}")
+        written = write_table(bug_df, out_csv_path, "bugs")
+        print(f"✅ Bug data saved to {', '.join(written)}")
 
         plt.figure(figsize=(8, 6))
         bug_df[["Bug Issues Before CI", "Bug Issues After CI"]].plot.box()
@@ -1,13 +1,21 @@
 import os
+import csv
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, timedelta
 import matplotlib.pyplot as plt
 import argparse
 import importlib
 
-from bug_issue_utils import get_bug_issues
+from bug_issue_utils import COUNT_MODES, SEARCH_APPROXIMATION, count_bug_issues
+from tables import write_table
 
 OUTPUT_DIR = "data"
+OUTPUT_FIELDS = ["Project", "Bug Issues Before CI", "Bug Issues After CI"]
+# Concurrent repos; every worker draws from the shared rate limiter, so past
+# the token budget more workers only wait longer.
+DEFAULT_WORKERS = int(os.getenv("BUG_WORKERS", "8"))
 
 def main():
     parser = argparse.ArgumentParser(description="Count bug-like issues before and after CI adoption.")
@@ -26,7 +34,30 @@ def main():
         required=True,
         help="Path to the stats CSV file from 23_collect_github_stats.py for the cohort.",
     )
+    parser.add_argument(
+        "--count-mode",
+        choices=COUNT_MODES,
+        default="scan",
+        help="'scan' (default): sync the local issue store (new/updated issues only) and apply the exact "
+             "keyword-in-body heuristic; 'local': re-classify the stored issues without API requests; "
+             "'search': two Search API totals per repo (fast, but approximate: whole-word matching "
+             "of fewer keywords).",
+    )
+    parser.add_argument(
+        "--bug-labels",
+        nargs="+",
+        help="Bug labels: in search mode they replace the keyword query; in scan/local mode "
+             "an issue carrying any of them also counts as a bug.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Repos processed concurrently (default: {DEFAULT_WORKERS}, env BUG_WORKERS).",
+    )
     args = parser.parse_args()
+    if args.count_mode == "search":
+        print(f"⚠️  {SEARCH_APPROXIMATION}")
 
     try:
         projects_module = importlib.import_module(args.projects_file)
@@ -48,39 +79,67 @@ def main():
     df = stats_df[stats_df['Project'].isin(target_projects)].copy()
     print(f"Found {len(df)} of {len(target_projects)} target projects in {args.stats_file}.")
 
-    results = []
+    jobs = []
     for _, row in df.iterrows():
         project = row["Project"]
         ci_str = row["First CI Run Date"]
         if pd.isna(ci_str) or not ci_str:
             continue
+        if "/" not in project:
+            print(f"⚠️ Skipping invalid project slug: '{project}'")
+            continue
         try:
             ci_date = datetime.strptime(ci_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        except ValueError as e:
+            print(f"❌ Error processing {project}: {e}")
+            continue
+        jobs.append((project, ci_date))
 
-            if "/" not in project:
-                print(f"⚠️ Skipping invalid project slug: '{project}'")
-                continue
-            owner, repo = project.split("/", 1)
-            print(f"Processing {owner}/{repo}...")
-
-            stats = get_bug_issues(owner, repo, ci_date)
-            results.append({
-                "Project": project,
-                "Bug Issues Before CI": stats["before"],
-                "Bug Issues After CI": stats["after"]
-            })
+    def collect(project, ci_date):
+        owner, repo = project.split("/", 1)
+        start = time.time()
+        stats = count_bug_issues(owner, repo, ci_date, mode=args.count_mode, labels=args.bug_labels)
+        return {
+            "Project": project,
+            "Bug Issues Before CI": stats["before"],
+            "Bug Issues After CI": stats["after"]
+        }, time.time() - start
 
-        except Exception as e:
-            print(f"❌ Error processing {project}: {e}")
+    # Rows are streamed to a .partial CSV as repos finish, so a long run can be
+    # inspected (or interrupted) without losing completed repos. The final
+    # outputs are written in stats-file order once every repo is done.
+    out_csv_path = args.output_file
+    partial_path = out_csv_path + ".partial"
+    os.makedirs(os.path.dirname(out_csv_path) or ".", exist_ok=True)
+    latencies, rows = [], {}
+    run_start = time.time()
+    print(f"⚡ Collecting {len(jobs)} repos with {args.workers} workers ({args.count_mode} mode)...")
+    with open(partial_path, "w", newline="") as f, ThreadPoolExecutor(max_workers=args.workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=OUTPUT_FIELDS)
+        writer.writeheader()
+        futures = {pool.submit(collect, project, ci_date): i for i, (project, ci_date) in enumerate(jobs)}
+        for done, fut in enumerate(as_completed(futures), start=1):
+            project = jobs[futures[fut]][0]
+            try:
+                row, latency = fut.result()
+            except Exception as e:
+                print(f"❌ Error processing {project}: {e}")
+                continue
+            writer.writerow(row)
+            f.flush()
+            rows[futures[fut]] = row
+            latencies.append(latency)
+            print(f"[{done}/{len(jobs)}] {project}: {row['Bug Issues Before CI']} before, "
+                  f"{row['Bug Issues After CI']} after ({latency:.1f}s)")
 
-    # Convert to DataFrame and save
-    if results:
-        bug_df = pd.DataFrame(results)
-        # Save to CSV for other analyses
-        out_csv_path = args.output_file
-        os.makedirs(os.path.dirname(out_csv_path) or ".", exist_ok=True)
-        bug_df.to_csv(out_csv_path, index=False)
-        print(f"✅ Bug data saved to {out_csv_path}")
+    if latencies:
+        lat = pd.Series(latencies)
+        print(f"⏱️  {len(lat)} repos in {time.time() - run_start:.0f}s; per-repo latency "
+              f"median {lat.median():.1f}s, p90 {lat.quantile(0.9):.1f}s, max {lat.max():.1f}s")
+    if rows:
+        written = write_table([rows[i] for i in sorted(rows)], out_csv_path, "bugs", fieldnames=OUTPUT_FIELDS)
+        print(f"✅ Bug data saved to {', '.join(written)}")
+    os.remove(partial_path)
 
 if __name__ == "__main__":
     main()
@@ -12,11 +12,16 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-def load_and_combine(metric_prefix: str, monoglot_csv: str, polyglot_csv: str) -> pd.DataFrame:
-    """Loads and concatenates monoglot and polyglot data, adding a 'group' column."""
+from tables import read_table
+
+COMMIT_FREQ_COLUMNS = ["Avg_Commits_Weekday", "Avg Commits/Weekday (Mon–Fri)", "Weekday (Mon–Fri)"]
+
+def load_and_combine(metric_prefix: str, monoglot_csv: str, polyglot_csv: str,
+                     columns: list = None, schema: str = None) -> pd.DataFrame:
+    """Loads and concatenates monoglot and polyglot data (only `columns`), adding a 'group' column."""
     try:
-        mono_df = pd.read_csv(monoglot_csv)
-        poly_df = pd.read_csv(polyglot_csv)
+        mono_df = read_table(monoglot_csv, columns, schema)
+        poly_df = read_table(polyglot_csv, columns, schema)
         mono_df['group'] = 'Monoglot'
         poly_df['group'] = 'Polyglot'
         return pd.concat([mono_df, poly_df], ignore_index=True)
@@ -29,7 +34,7 @@ def compare_metric(df: pd.DataFrame, metric_column: str, title: str, ylabel: str
     if df.empty or metric_column not in df.columns:
         return
 
-    df[metric_column] = pd.to_numeric(df[metric_column], errors='coerce')
+    df[metric_column] = pd.to_numeric(df[metric_column], errors='coerce').astype("float64")
     df.dropna(subset=[metric_column], inplace=True)
 
     fig, ax = plt.subplots(figsize=(8, 6))
@@ -110,7 +115,8 @@ def main():
     os.makedirs(args.output_dir, exist_ok=True)
 
     # Compare commit frequency
-    commit_df = load_and_combine("Commit Frequency", args.commit_freq_mono, args.commit_freq_poly)
+    commit_df = load_and_combine("Commit Frequency", args.commit_freq_mono, args.commit_freq_poly,
+                                 COMMIT_FREQ_COLUMNS)
     if not commit_df.empty:
         # Handle multiple possible column names for commit frequency
         commit_col_new = "Avg_Commits_Weekday"
@@ -129,10 +135,11 @@ def main():
         compare_metric(commit_df, commit_col, "Commit Frequency: Monoglot vs. Polyglot", "Avg. Commits / Weekday", "commit_freq_comparison", args.output_dir)
 
     # Compare build durations
-    build_df = load_and_combine("Build Duration", args.build_duration_mono, args.build_duration_poly)
+    build_df = load_and_combine("Build Duration", args.build_duration_mono, args.build_duration_poly,
+                                ["Avg Duration (min)"], "long_builds")
     build_summary_text = None
     if not build_df.empty:
-        numeric_build_durations = pd.to_numeric(build_df["Avg Duration (min)"], errors="coerce").dropna()
+        numeric_build_durations = build_df["Avg Duration (min)"].dropna()
         if not numeric_build_durations.empty:
             median = numeric_build_durations.median()
             q3 = numeric_build_durations.quantile(0.75)
@@ -144,16 +151,19 @@ def main():
                    log_scale=False, summary_text=build_summary_text)
 
     # Compare test coverage
-    coverage_df = load_and_combine("Test Coverage", args.coverage_mono, args.coverage_poly)
+    coverage_df = load_and_combine("Test Coverage", args.coverage_mono, args.coverage_poly,
+                                   ["Coverage Latest (%)"], "coverage")
     compare_metric(coverage_df, "Coverage Latest (%)", "Test Coverage: Monoglot vs. Polyglot", "Latest Coverage (%)", "coverage_comparison", args.output_dir)
 
     # Compare broken build metrics
-    broken_df = load_and_combine("Broken Builds", args.broken_builds_mono, args.broken_builds_poly)
+    broken_df = load_and_combine("Broken Builds", args.broken_builds_mono, args.broken_builds_poly,
+                                 ["Max Broken Days", "Broken >2 Days"], "broken_builds")
     compare_metric(broken_df, "Max Broken Days", "Max Broken Build Duration: Monoglot vs. Polyglot", "Max Days Broken", "max_broken_days_comparison", args.output_dir)
     compare_metric(broken_df, "Broken >2 Days", "Long Broken Build Stretches (>2 Days): Monoglot vs. Polyglot", "Count of Stretches > 2 Days", "long_broken_stretches_comparison", args.output_dir)
 
     # Compare bug-like issues
-    bugs_df = load_and_combine("Bug Issues", args.bugs_mono, args.bugs_poly)
+    bugs_df = load_and_combine("Bug Issues", args.bugs_mono, args.bugs_poly,
+                               ["Bug Issues Before CI", "Bug Issues After CI"], "bugs")
     # To compare fairly, we'll look at the ratio of bugs after vs before CI
     if not bugs_df.empty:
         bugs_df["Bug_Ratio"] = (bugs_df["Bug Issues After CI"] + 1) / (bugs_df["Bug Issues Before CI"] + 1)
@@ -5,12 +5,17 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from tables import read_table
+
+COVERAGE_COLUMNS = ["Tests in CI (configured)", "Coverage in CI (configured)", "Coverage Samples"]
+
 def create_ci_adoption_graph(mono_csv, poly_csv, mono_total_csv, poly_total_csv, output_file):
     try:
-        mono_df = pd.read_csv(mono_csv)
-        poly_df = pd.read_csv(poly_csv)
-        mono_total_df = pd.read_csv(mono_total_csv)
-        poly_total_df = pd.read_csv(poly_total_csv)
+        mono_df = read_table(mono_csv, COVERAGE_COLUMNS, "coverage")
+        poly_df = read_table(poly_csv, COVERAGE_COLUMNS, "coverage")
+        # Only the row counts are needed from the cohort summaries
+        mono_total_df = read_table(mono_total_csv, ["repo"])
+        poly_total_df = read_table(poly_total_csv, ["repo"])
     except FileNotFoundError as e:
         print(f"Error: Input file not found: {e.filename}")
         return
@@ -18,21 +23,23 @@ def create_ci_adoption_graph(mono_csv, poly_csv, mono_total_csv, poly_total_csv,
     total_mono = len(mono_total_df)
     total_poly = len(poly_total_df)
 
-    # Convert Coverage Samples to numeric
-    mono_df['Coverage Samples'] = pd.to_numeric(mono_df['Coverage Samples'], errors='coerce').fillna(0)
-    poly_df['Coverage Samples'] = pd.to_numeric(poly_df['Coverage Samples'], errors='coerce').fillna(0)
+    # Flags and counts are typed by read_table; missing values count as No / 0
+    for df in (mono_df, poly_df):
+        df['Coverage Samples'] = df['Coverage Samples'].fillna(0)
+        for col in ('Tests in CI (configured)', 'Coverage in CI (configured)'):
+            df[col] = df[col].fillna(False).astype(bool)
 
     # CI test configured
-    mono_with_ci = mono_df[mono_df['Tests in CI (configured)'] == 'Yes']
-    poly_with_ci = poly_df[poly_df['Tests in CI (configured)'] == 'Yes']
+    mono_with_ci = mono_df[mono_df['Tests in CI (configured)']]
+    poly_with_ci = poly_df[poly_df['Tests in CI (configured)']]
 
     # CI coverage configured AND samples > 0
     mono_with_coverage = mono_with_ci[
-        (mono_with_ci['Coverage in CI (configured)'] == 'Yes') &
+        mono_with_ci['Coverage in CI (configured)'] &
         (mono_with_ci['Coverage Samples'] > 0)
     ]
     poly_with_coverage = poly_with_ci[
-        (poly_with_ci['Coverage in CI (configured)'] == 'Yes') &
+        poly_with_ci['Coverage in CI (configured)'] &
         (poly_with_ci['Coverage Samples'] > 0)
     ]
 
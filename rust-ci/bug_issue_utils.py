@@ -1,69 +1,164 @@
-import os
+import re
 import requests
 import time
-from datetime import datetime, timezone
-from dotenv import load_dotenv
+import pandas as pd
+from datetime import timezone
 
-# Load token
-load_dotenv()
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-if not GITHUB_TOKEN:
-    print("⚠️  GITHUB_TOKEN not found in .env file. API requests will be unauthenticated and may be rate-limited.")
-HEADERS = {"Authorization": f"token {GITHUB_TOKEN}"}
+from github_client import retry_delay, with_jitter
+from issue_store import get_issue_store
+from rate_limiter import get_limiter
+
+BUG_KEYWORDS = ['error', 'crash', 'fail', 'bug', 'broken', 'exception', 'hang', 'freeze', 'not working', 'does not work']
+
+try:
+    import pyarrow  # noqa: F401  (Arrow-backed strings: regex matching runs in RE2, outside the GIL)
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:
+    TEXT_DTYPE = "string"
+
+# ---------- Search API counting ----------
+SEARCH_URL = "https://api.github.com/search/issues"
+# GitHub rejects queries with more than five AND/OR/NOT operators, so only the
+# six strongest keywords are OR-ed. Search matches whole (stemmed) words in the
+# title and body, not substrings, so counts approximate is_likely_bug().
+SEARCH_KEYWORDS = ['bug', 'error', 'crash', 'fail', 'broken', 'exception']
+COUNT_MODES = ("search", "scan", "local")
+SEARCH_APPROXIMATION = (
+    "search mode approximates the bug heuristic: whole-word matches of "
+    + ", ".join(SEARCH_KEYWORDS) + " only (no 'hang', 'freeze', 'not working', 'does not work', no substrings); "
+    "counts are not comparable with scan mode"
+)
+MAX_RETRIES = 6
 
 
 def is_likely_bug(issue):
     """Heuristic: does the issue sound like a bug?"""
-    keywords = ['error', 'crash', 'fail', 'bug', 'broken', 'exception', 'hang', 'freeze', 'not working', 'does not work']
     title = issue.get("title") or ""
     body = issue.get("body") or ""
     text = (title + " " + body).lower()
-    return any(k in text for k in keywords)
+    return any(k in text for k in BUG_KEYWORDS)
 
 
-def get_bug_issues(owner, repo, ci_date):
+def bug_pattern(keywords=BUG_KEYWORDS):
+    """One alternation of the literal keywords (longest first), matched case-insensitively."""
+    return "|".join(re.escape(k.lower()) for k in sorted(keywords, key=len, reverse=True))
+
+
+def classify_bugs(issues, keywords=BUG_KEYWORDS, bug_labels=None, with_match=True):
     """
-    Pulls all issues for a repository and counts bug-like issues created
-    before and after a given CI adoption date.
+    Batch is_likely_bug() over a DataFrame with `title` and `body` columns
+    (and `labels`, lists of label names, when bug_labels is given). Title and
+    body are matched case-insensitively against one compiled pattern for the
+    whole column instead of one substring test per issue and keyword. Returns
+    a frame on the same index with `is_bug` (bool) and `matched` (the first
+    keyword found, or 'label:<name>' for a label rule, else None). An issue
+    is a bug if it carries any of `bug_labels` or mentions any of `keywords`.
+    with_match=False skips the (slower) keyword extraction; `matched` is then
+    'keyword' for keyword hits.
     """
-    url = f"https://api.github.com/repos/{owner}/{repo}/issues"
-    params = {"state": "all", "per_page": 100, "page": 1}
+    text = issues["title"].fillna("").astype(TEXT_DTYPE) + " " + issues["body"].fillna("").astype(TEXT_DTYPE)
+    matched = pd.Series(None, index=issues.index, dtype=object)
+    if keywords:
+        pattern = bug_pattern(keywords)
+        hit = text.str.contains(pattern, case=False, regex=True).fillna(False).astype(bool)
+        if not with_match:
+            matched[hit] = "keyword"
+        elif hit.any():
+            found = text[hit].str.extract(f"({pattern})", flags=re.IGNORECASE, expand=False)
+            matched[hit] = found.str.lower().astype(object)
+    if bug_labels:
+        wanted = {l.lower() for l in bug_labels}
+        by_label = issues["labels"].map(
+            lambda names: next((f"label:{n}" for n in names or () if n.lower() in wanted), None))
+        matched = by_label.where(by_label.notna(), matched)
+    is_bug = matched.notna()
+    return pd.DataFrame({"is_bug": is_bug, "matched": matched.where(is_bug, None)}, index=issues.index)
 
-    result = {"before": 0, "after": 0}
 
-    while True:
+def get_bug_issues(owner, repo, ci_date, sync=True, labels=None):
+    """
+    Counts bug-like issues created before and after a given CI adoption date.
+    Issues are kept in the local issue store (issue_store.py); sync=True first
+    fetches the ones created or updated since the last run, sync=False only
+    re-classifies what is stored (no API requests). `labels` adds a label
+    rule to the keyword heuristic (see classify_bugs()).
+    """
+    store = get_issue_store()
+    if sync:
         try:
-            resp = requests.get(url, headers=HEADERS, params=params, timeout=30)
-
-            if resp.status_code == 403 and 'rate limit' in resp.text.lower():
-                reset_timestamp = int(resp.headers.get('X-RateLimit-Reset', time.time() + 60))
-                sleep_duration = max(0, reset_timestamp - datetime.now().timestamp()) + 2
-                print(f"🕒 Rate limit hit for {owner}/{repo}. Sleeping for {sleep_duration:.0f}s...")
-                time.sleep(sleep_duration)
-                continue
-
-            resp.raise_for_status()
-            issues = resp.json()
-        except requests.RequestException as e:
-            print(f"❌ Failed to fetch {owner}/{repo} page {params['page']}: {e}")
-            break
-
-        if not issues:
-            break
-
-        for issue in issues:
-            if 'pull_request' in issue:
-                continue
-            created_at_str = issue.get('created_at')
-            if not created_at_str:
-                continue
-            created = datetime.strptime(created_at_str, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
-            if is_likely_bug(issue):
-                if created < ci_date:
-                    result["before"] += 1
-                else:
-                    result["after"] += 1
-        params["page"] += 1
-        time.sleep(0.1)
-
-    return result
\ No newline at end of file
+            new = store.sync(owner, repo)
+            print(f"🗂️  {owner}/{repo}: {new} issues synced")
+        except (requests.RequestException, RuntimeError) as e:
+            print(f"❌ Failed to sync {owner}/{repo}: {e}")
+    elif not store.synced(f"{owner}/{repo}"):
+        print(f"⚠️ {owner}/{repo} has never been synced; counts will be 0")
+    return store.bug_counts(f"{owner}/{repo}", ci_date,
+                            classify=lambda issues: classify_bugs(issues, bug_labels=labels, with_match=False)["is_bug"])
+
+
+def bug_search_query(owner, repo, labels=None):
+    """
+    Search qualifiers for bug-like issues of one repo: any of `labels`
+    (e.g. ["bug", "C-bug"]) if given, else SEARCH_KEYWORDS in title or body.
+    """
+    query = f"repo:{owner}/{repo} is:issue"
+    if labels:
+        return query + " label:" + ",".join(f'"{l}"' if " " in l else l for l in labels)
+    return query + " in:title,body " + " OR ".join(SEARCH_KEYWORDS)
+
+
+def search_issue_count(query):
+    """total_count of a search/issues query (one request, per_page=1), throttled on the 'search' budget."""
+    # Shared across processes and rotates over GITHUB_TOKENS (see rate_limiter.py)
+    limiter = get_limiter()
+    for attempt in range(1, MAX_RETRIES + 1):
+        token = limiter.acquire_blocking("search")
+        resp = requests.get(SEARCH_URL, headers=limiter.auth_headers(token),
+                            params={"q": query, "per_page": 1}, timeout=30)
+        limiter.update_from_headers(token, resp.headers)
+        wait = retry_delay(resp.status_code, resp.headers, resp.text, attempt)
+        if wait is not None and attempt < MAX_RETRIES:
+            print(f"⏳ {resp.status_code}: search retry in {wait:.0f}s …")
+            if resp.status_code in (403, 429):
+                limiter.penalize(token, wait, "search")
+            else:
+                time.sleep(with_jitter(wait))
+            continue
+        resp.raise_for_status()
+        data = resp.json()
+        if data.get("incomplete_results"):
+            raise RuntimeError(f"search timed out before counting all matches: {query}")
+        return int(data.get("total_count", 0))
+
+
+def search_bug_issues(owner, repo, ci_date, labels=None):
+    """
+    Same shape as get_bug_issues(), from two search/issues requests whose
+    total_count is computed server-side (created before / on-or-after ci_date).
+    """
+    if ci_date.tzinfo is not None:
+        ci_date = ci_date.astimezone(timezone.utc)
+    stamp = ci_date.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    query = bug_search_query(owner, repo, labels)
+    return {
+        "before": search_issue_count(f"{query} created:<{stamp}"),
+        "after": search_issue_count(f"{query} created:>={stamp}"),
+    }
+
+
+def count_bug_issues(owner, repo, ci_date, mode="scan", labels=None):
+    """
+    Bug-like issues before/after ci_date. mode="scan" (the default) syncs the
+    local issue store and applies classify_bugs() (exact keyword-in-body
+    matching, labels in addition); mode="local" classifies the stored issues
+    without any request; mode="search" (opt-in, see SEARCH_APPROXIMATION)
+    asks the Search API for the two totals (labels replace the keywords). A
+    search that GitHub could not complete falls back to a scan.
+    """
+    if mode in ("scan", "local"):
+        return get_bug_issues(owner, repo, ci_date, sync=mode == "scan", labels=labels)
+    try:
+        return search_bug_issues(owner, repo, ci_date, labels)
+    except RuntimeError as e:
+        print(f"⚠️ {owner}/{repo}: {e}; falling back to a full scan")
+        return get_bug_issues(owner, repo, ci_date, labels=labels)
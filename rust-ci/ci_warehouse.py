@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Columnar warehouse of GitHub Actions runs and jobs (DuckDB).
+
+One collector lands workflow runs (from the watermarked run store) and their
+jobs into typed tables; the per-script metrics are SQL queries over them:
+
+  - broken_stretches()   -> 28 (failure -> next success stretches)
+  - duration_summary()   -> 22 (run durations)
+  - job_summary()        -> 22_stats (slowest job types / longest job)
+  - ci_summary()         -> 23 (success/failure counts, first CI run date)
+
+24_1 also lands per-file coverage from artifact reports into `file_coverage`.
+
+Re-running an analysis only re-syncs what changed upstream and then runs a
+query, so repeated runs over a cohort are sub-second once the data is in.
+
+All timestamps are stored as UTC (TIMESTAMP without time zone).
+
+DuckDB lets only one process hold the file open for writing, so the
+warehouse never keeps it open: each load batch or query opens it, does its
+work and closes it again, and waits while another process (e.g. the other
+cohort's collector) holds it. Collectors can therefore run in parallel.
+
+Requirements:
+  pip install duckdb aiohttp python-dotenv
+
+Env:
+  CI_WAREHOUSE_DB=<path to duckdb file>   (default: data/ci_warehouse.duckdb)
+  CI_WAREHOUSE_LOCK_WAIT=<seconds>        (default: 300; how long to wait for another process)
+
+Usage (collector):
+  python ci_warehouse.py --projects-file rust_repos_monoglot --with-jobs
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import importlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import duckdb
+from dotenv import load_dotenv
+
+from github_client import AsyncGitHubClient, GH_REST, MAX_CONCURRENCY, with_jitter
+from run_store import collect_runs
+
+load_dotenv()
+
+DEFAULT_WAREHOUSE_PATH = os.path.join("data", "ci_warehouse.duckdb")
+INSERT_CHUNK = 500   # rows per multi-row INSERT
+JOB_BATCH_RUNS = 50  # runs whose jobs are written per warehouse connection
+LOCK_WAIT = float(os.getenv("CI_WAREHOUSE_LOCK_WAIT", "300"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    repo          VARCHAR NOT NULL,     -- lower-case 'owner/name'
+    run_id        BIGINT NOT NULL,
+    workflow_id   BIGINT,
+    name          VARCHAR,
+    event         VARCHAR,
+    status        VARCHAR,
+    conclusion    VARCHAR,
+    created_at    TIMESTAMP,
+    updated_at    TIMESTAMP,
+    run_attempt   INTEGER,
+    head_sha      VARCHAR,
+    head_branch   VARCHAR,
+    html_url      VARCHAR,
+    PRIMARY KEY (repo, run_id)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    repo          VARCHAR NOT NULL,
+    run_id        BIGINT NOT NULL,
+    job_id        BIGINT NOT NULL,
+    name          VARCHAR,
+    status        VARCHAR,
+    conclusion    VARCHAR,
+    started_at    TIMESTAMP,
+    completed_at  TIMESTAMP,
+    run_attempt   INTEGER,
+    PRIMARY KEY (repo, job_id)
+);
+CREATE TABLE IF NOT EXISTS job_runs (      -- runs whose job list has been loaded
+    repo          VARCHAR NOT NULL,
+    run_id        BIGINT NOT NULL,
+    PRIMARY KEY (repo, run_id)
+);
+CREATE TABLE IF NOT EXISTS file_coverage ( -- per-file line coverage from artifact reports (24_1)
+    repo          VARCHAR NOT NULL,
+    run_id        BIGINT NOT NULL,
+    source        VARCHAR NOT NULL,     -- 'artifacts:lcov' | 'artifacts:cobertura' | 'artifacts:jacoco'
+    path          VARCHAR NOT NULL,
+    lines_covered INTEGER NOT NULL,
+    lines_total   INTEGER NOT NULL,
+    PRIMARY KEY (repo, run_id, source, path)
+);
+"""
+
+
+def repo_key(owner: str, name: str) -> str:
+    return f"{owner}/{name}".lower()
+
+
+def _ts(value: Optional[str]) -> Optional[datetime]:
+    """GitHub ISO-8601 timestamp -> naive UTC datetime."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Warehouse:
+    """
+    DuckDB-backed run/job tables. Every call holds the file only briefly (see
+    the module docstring); a lock serializes access from worker threads.
+    """
+    def __init__(self, path: Optional[str] = None, read_only: bool = False):
+        self.path = path or os.getenv("CI_WAREHOUSE_DB", DEFAULT_WAREHOUSE_PATH)
+        self.read_only = read_only
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        if not read_only:
+            with self._connect() as conn:
+                conn.execute(_SCHEMA)
+
+    def close(self) -> None:
+        """Nothing stays open between calls; kept so callers can release explicitly."""
+
+    @contextmanager
+    def _connect(self):
+        """Open the file, retrying while another process holds its lock; closed on exit."""
+        deadline = time.monotonic() + LOCK_WAIT
+        delay = 0.05
+        while True:
+            try:
+                conn = duckdb.connect(self.path, read_only=self.read_only)
+                break
+            except duckdb.IOException as e:
+                if "lock" not in str(e).lower() or time.monotonic() >= deadline:
+                    raise
+                time.sleep(with_jitter(delay))
+                delay = min(delay * 2, 2.0)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[Tuple]:
+        with self._lock, self._connect() as conn:
+            return conn.execute(sql, list(params)).fetchall()
+
+    # ---------- loading ----------
+    def _write(self, batches: List[Tuple[str, List[Tuple]]]) -> None:
+        """
+        Upsert [(table, rows), ...] in one transaction with multi-row
+        INSERT OR REPLACE (much faster than executemany on DuckDB).
+        """
+        batches = [(table, rows) for table, rows in batches if rows]
+        if not batches:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN TRANSACTION")
+            for table, rows in batches:
+                placeholder = "(" + ", ".join("?" * len(rows[0])) + ")"
+                for i in range(0, len(rows), INSERT_CHUNK):
+                    chunk = rows[i:i + INSERT_CHUNK]
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {table} VALUES " + ", ".join([placeholder] * len(chunk)),
+                        [v for row in chunk for v in row],
+                    )
+            conn.execute("COMMIT")
+
+    def load_runs(self, repo: str, runs: List[Dict[str, Any]]) -> None:
+        if not runs:
+            return
+        rows = [
+            (
+                repo, int(r["id"]), r.get("workflow_id"), r.get("name"), r.get("event"),
+                r.get("status"), r.get("conclusion"), _ts(r.get("created_at")), _ts(r.get("updated_at")),
+                r.get("run_attempt"), r.get("head_sha"), r.get("head_branch"), r.get("html_url"),
+            )
+            for r in runs
+        ]
+        self._write([("runs", rows)])
+
+    def load_jobs(self, repo: str, jobs_by_run: Dict[int, List[Dict[str, Any]]]) -> None:
+        """Jobs of several runs in one batch; each run is marked as loaded."""
+        rows = [
+            (
+                repo, int(run_id), int(j["id"]), j.get("name"), j.get("status"), j.get("conclusion"),
+                _ts(j.get("started_at")), _ts(j.get("completed_at")), j.get("run_attempt"),
+            )
+            for run_id, jobs in jobs_by_run.items()
+            for j in jobs
+        ]
+        self._write([("jobs", rows), ("job_runs", [(repo, int(run_id)) for run_id in jobs_by_run])])
+
+    def load_file_coverage(self, repo: str, rows: List[Tuple[int, str, str, int, int]]) -> None:
+        """rows: (run_id, source, path, lines_covered, lines_total)."""
+        self._write([("file_coverage", [(repo, int(run_id), *rest) for run_id, *rest in rows])])
+
+    def runs_missing_jobs(self, repo: str, since: Optional[datetime], max_runs: Optional[int]) -> List[int]:
+        """Completed runs in the job window whose jobs have not been loaded yet."""
+        rows = self._query(
+            """
+            WITH recent AS (
+                SELECT run_id, status,
+                       row_number() OVER (ORDER BY created_at DESC, run_id DESC) AS rn
+                FROM runs
+                WHERE repo = ? AND created_at >= ?
+            )
+            SELECT run_id FROM recent
+            WHERE rn <= ? AND status = 'completed'
+              AND run_id NOT IN (SELECT run_id FROM job_runs WHERE repo = ?)
+            """,
+            (repo, since or datetime(1970, 1, 1), max_runs or 2**31, repo),
+        )
+        return [r[0] for r in rows]
+
+    # ---------- metrics ----------
+    def broken_stretches(self, repos: List[str], max_runs: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Over the latest `max_runs` runs of each repo: every stretch that starts at a
+        failing run and ends at the next successful one (or now, if still broken),
+        in whole days. Other conclusions neither open nor close a stretch.
+        Quartiles use the nearest-rank method (index ceil(q*n)).
+        """
+        rows = self._query(
+            """
+            WITH recent AS (
+                SELECT repo, run_id, created_at, conclusion,
+                       row_number() OVER (PARTITION BY repo ORDER BY created_at DESC, run_id DESC) AS rn
+                FROM runs
+                WHERE list_contains(?, repo)
+            ),
+            windowed AS (SELECT * FROM recent WHERE rn <= ?),
+            sf AS (
+                SELECT repo, run_id, created_at, conclusion,
+                       lag(conclusion) OVER (PARTITION BY repo ORDER BY created_at, run_id) AS prev
+                FROM windowed
+                WHERE conclusion IN ('success', 'failure')
+            ),
+            edges AS (
+                SELECT * FROM sf
+                WHERE (conclusion = 'failure' AND prev IS DISTINCT FROM 'failure')
+                   OR (conclusion = 'success' AND prev = 'failure')
+            ),
+            stretches AS (
+                SELECT repo, conclusion, created_at AS broken_since,
+                       lead(created_at) OVER (PARTITION BY repo ORDER BY created_at, run_id) AS fixed_at
+                FROM edges
+            ),
+            days AS (
+                SELECT repo,
+                       floor(date_diff('second', broken_since, coalesce(fixed_at, ?)) / 86400)::INTEGER AS d
+                FROM stretches
+                WHERE conclusion = 'failure'
+            ),
+            agg AS (
+                SELECT repo, list_sort(list(d)) AS ds, count(*) AS n, avg(d) AS mean_days
+                FROM days GROUP BY repo
+            )
+            SELECT w.repo, w.runs, coalesce(a.n, 0),
+                   coalesce(a.ds[ceil(0.25 * a.n)::INTEGER], 0),
+                   coalesce(a.mean_days, 0),
+                   coalesce(a.ds[ceil(0.75 * a.n)::INTEGER], 0)
+            FROM (SELECT repo, count(*) AS runs FROM windowed GROUP BY repo) w
+            LEFT JOIN agg a USING (repo)
+            """,
+            ([r.lower() for r in repos], max_runs, _utcnow()),
+        )
+        return {
+            repo: {"runs": runs, "num_broken": n, "q1": q1, "mean": mean_days, "q3": q3}
+            for repo, runs, n, q1, mean_days, q3 in rows
+        }
+
+    def duration_summary(
+        self, repos: List[str], cutoff_days: int, max_runs: int, duration_max: float
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Run duration (updated_at - created_at, minutes) over the latest `max_runs`
+        runs created within `cutoff_days` whose duration lies in [0, duration_max].
+        """
+        rows = self._query(
+            """
+            WITH valid AS (
+                SELECT repo, run_id, created_at, date_diff('second', created_at, updated_at) / 60.0 AS minutes
+                FROM runs
+                WHERE list_contains(?, repo) AND created_at >= ?
+                  AND date_diff('second', created_at, updated_at) / 60.0 BETWEEN 0 AND ?
+            ),
+            recent AS (
+                SELECT repo, minutes,
+                       row_number() OVER (PARTITION BY repo ORDER BY created_at DESC, run_id DESC) AS rn
+                FROM valid
+            )
+            SELECT repo, count(*), avg(minutes), max(minutes),
+                   100.0 * count(*) FILTER (WHERE minutes > 10) / count(*)
+            FROM recent
+            WHERE rn <= ?
+            GROUP BY repo
+            """,
+            ([r.lower() for r in repos], _utcnow() - timedelta(days=cutoff_days), duration_max, max_runs),
+        )
+        return {
+            repo: {"runs": n, "avg_min": avg_m, "max_min": max_m, "long_pct": long_pct}
+            for repo, n, avg_m, max_m, long_pct in rows
+        }
+
+    def run_counts(self, repos: List[str], cutoff_days: int) -> Dict[str, int]:
+        """Stored runs created within `cutoff_days`, per repo (valid duration or not)."""
+        rows = self._query(
+            "SELECT repo, count(*) FROM runs WHERE list_contains(?, repo) AND created_at >= ? GROUP BY repo",
+            ([r.lower() for r in repos], _utcnow() - timedelta(days=cutoff_days)),
+        )
+        return dict(rows)
+
+    def job_summary(self, repos: List[str], cutoff_days: int, max_runs: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Completed jobs of the latest `max_runs` runs within `cutoff_days`:
+        the job name with the highest mean duration and the single longest job.
+        """
+        rows = self._query(
+            """
+            WITH recent AS (
+                SELECT repo, run_id,
+                       row_number() OVER (PARTITION BY repo ORDER BY created_at DESC, run_id DESC) AS rn
+                FROM runs
+                WHERE list_contains(?, repo) AND created_at >= ?
+            ),
+            j AS (
+                SELECT j.repo, j.name, date_diff('second', j.started_at, j.completed_at) AS dur
+                FROM jobs j JOIN recent r USING (repo, run_id)
+                WHERE r.rn <= ? AND j.status = 'completed'
+                  AND j.started_at IS NOT NULL AND j.completed_at IS NOT NULL
+            ),
+            by_name AS (SELECT repo, name, avg(dur) AS avg_dur FROM j GROUP BY repo, name),
+            slowest AS (SELECT repo, arg_max(name, avg_dur) AS name, max(avg_dur) AS avg_dur FROM by_name GROUP BY repo),
+            longest AS (SELECT repo, arg_max(name, dur) AS name, max(dur) AS dur FROM j GROUP BY repo)
+            SELECT s.repo, s.name, s.avg_dur, l.name, l.dur
+            FROM slowest s JOIN longest l USING (repo)
+            """,
+            ([r.lower() for r in repos], _utcnow() - timedelta(days=cutoff_days), max_runs),
+        )
+        return {
+            repo: {"slowest_name": sn, "slowest_avg_s": sa, "longest_name": ln, "longest_s": ls}
+            for repo, sn, sa, ln, ls in rows
+        }
+
+    def ci_summary(self, repos: List[str]) -> Dict[str, Tuple[int, int, Optional[datetime]]]:
+        """(successful runs, failed runs, first run created_at as aware UTC) per repo."""
+        rows = self._query(
+            """
+            SELECT repo,
+                   count(*) FILTER (WHERE conclusion = 'success'),
+                   count(*) FILTER (WHERE conclusion = 'failure'),
+                   min(created_at)
+            FROM runs
+            WHERE list_contains(?, repo)
+            GROUP BY repo
+            """,
+            ([r.lower() for r in repos],),
+        )
+        return {
+            repo: (ok, bad, first.replace(tzinfo=timezone.utc) if first else None)
+            for repo, ok, bad, first in rows
+        }
+
+
+# ---------- Collector ----------
+async def ingest(
+    projects: List[Dict[str, str]],
+    warehouse: Warehouse,
+    *,
+    concurrency: int = MAX_CONCURRENCY,
+    since: Optional[datetime] = None,
+    max_runs: Optional[int] = None,
+    jobs_since: Optional[datetime] = None,
+    jobs_max_runs: Optional[int] = None,
+    with_jobs: bool = False,
+    on_done: Optional[Callable[[str, Optional[str]], None]] = None,
+) -> Dict[str, str]:
+    """
+    Land runs (newest first, created >= since, up to max_runs per repo) and,
+    if requested, the jobs of completed runs in the job window. Runs come from
+    the run store, so only runs past each repo's watermark hit the API; jobs
+    already loaded are never fetched again. Returns {slug: error} for failures.
+    on_done(slug, error) runs (in a worker thread) as soon as each repo's load
+    finishes, so callers can checkpoint repos one by one; error is None on success.
+    """
+    failures: Dict[str, str] = {}
+    async with AsyncGitHubClient(concurrency=concurrency) as gh:
+        async def one(p: Dict[str, str]) -> None:
+            owner, name = p["owner"], p["name"]
+            repo = repo_key(owner, name)
+            error = None
+            try:
+                runs = await collect_runs(gh, owner, name, since=since, limit=max_runs)
+                # Off the event loop: the warehouse may wait for another process's lock.
+                await asyncio.to_thread(warehouse.load_runs, repo, runs)
+                if with_jobs:
+                    jobs_by_run = {}
+                    missing = await asyncio.to_thread(warehouse.runs_missing_jobs, repo, jobs_since, jobs_max_runs)
+                    for n, run_id in enumerate(missing, start=1):
+                        url = f"{GH_REST}/repos/{owner}/{name}/actions/runs/{run_id}/jobs"
+                        jobs_by_run[run_id] = [j async for j in gh.paginate(url, item_key="jobs")]
+                        if len(jobs_by_run) >= JOB_BATCH_RUNS or n == len(missing):
+                            await asyncio.to_thread(warehouse.load_jobs, repo, jobs_by_run)
+                            jobs_by_run = {}
+            except Exception as e:
+                print(f"❌ Warehouse ingest failed for {owner}/{name}: {e}")
+                error = failures[f"{owner}/{name}"] = str(e)
+            if on_done is not None:
+                await asyncio.to_thread(on_done, f"{owner}/{name}", error)
+        await asyncio.gather(*(one(p) for p in projects))
+    return failures
+
+
+def _load_projects(module_name: str) -> List[Dict[str, str]]:
+    projects_module = importlib.import_module(module_name)
+    out, seen = [], set()
+    for slug in projects_module.projects:
+        s = slug.strip().strip("/")
+        if "/" not in s:
+            print(f"[warn] Skipping invalid slug: {slug}")
+            continue
+        owner, name = (part.strip() for part in s.split("/", 1))
+        if repo_key(owner, name) in seen:
+            continue
+        seen.add(repo_key(owner, name))
+        out.append({"owner": owner, "name": name})
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Land GitHub Actions runs (and jobs) for a cohort into the CI warehouse.")
+    parser.add_argument(
+        "--projects-file",
+        required=True,
+        help="The Python module name (without .py) containing the 'projects' list of repo slugs.",
+    )
+    parser.add_argument("--since-days", type=int, default=None, help="Only runs created in the last N days (default: full history).")
+    parser.add_argument("--max-runs", type=int, default=None, help="Cap runs per repo (newest first).")
+    parser.add_argument("--with-jobs", action="store_true", help="Also load jobs for completed runs.")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="Maximum number of in-flight GitHub requests.")
+    args = parser.parse_args()
+
+    projects = _load_projects(args.projects_file)
+    since = datetime.now(timezone.utc) - timedelta(days=args.since_days) if args.since_days else None
+    wh = Warehouse()
+    print(f"📥 Landing runs for {len(projects)} repos into {wh.path}…")
+    failures = asyncio.run(ingest(
+        projects, wh, concurrency=args.concurrency, since=since, max_runs=args.max_runs,
+        jobs_since=since, jobs_max_runs=args.max_runs, with_jobs=args.with_jobs,
+    ))
+    (n_runs,), = wh._query("SELECT count(*) FROM runs")
+    (n_jobs,), = wh._query("SELECT count(*) FROM jobs")
+    print(f"✅ Warehouse now holds {n_runs} runs / {n_jobs} jobs ({len(failures)} repos failed)")
+    wh.close()
+
+
+if __name__ == "__main__":
+    main()
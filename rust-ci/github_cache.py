@@ -0,0 +1,187 @@
+"""
+Persistent on-disk cache for GitHub REST responses.
+
+Bodies are stored content-addressed (sha256 of the payload) in a local SQLite
+file next to the per-URL validators (ETag / Last-Modified). Every GET that has
+a cached entry is sent as a conditional request (If-None-Match /
+If-Modified-Since); GitHub answers unchanged resources with 304, which does not
+count against the primary rate limit, and the cached body is replayed to the
+caller as a normal 200 response.
+
+Env:
+  GITHUB_HTTP_CACHE=<path to sqlite file>   (default: data/.cache/github_http.sqlite)
+  GITHUB_HTTP_CACHE=off                     (disable caching entirely)
+
+Usage:
+  from github_cache import cached_request
+  resp = cached_request(session, "GET", url, params=params, timeout=30)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+import requests
+
+DEFAULT_CACHE_PATH = os.path.join("data", ".cache", "github_http.sqlite")
+MAX_BODY_BYTES = 8 * 1024 * 1024   # never cache log/artifact archives
+REPLAYED_HEADERS = ("Content-Type", "Link", "ETag", "Last-Modified")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bodies (
+    digest  TEXT PRIMARY KEY,
+    body    BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS responses (
+    key           TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    digest        TEXT NOT NULL REFERENCES bodies(digest),
+    headers_json  TEXT NOT NULL,
+    fetched_at    REAL NOT NULL
+);
+"""
+
+
+def cache_key(method: str, url: str, accept: Optional[str] = None, auth: Optional[str] = None) -> str:
+    """
+    Key on method + fully-qualified URL (query string included), the Accept
+    header (it selects the representation, e.g. `application/vnd.github.sha`)
+    and the Authorization header, so a 304 never replays a body fetched as a
+    different media type or by a different identity. The key is a sha256, so
+    no credential is written to disk.
+    """
+    blob = f"{method.upper()} {url}\nAccept: {accept or ''}\nAuthorization: {auth or ''}"
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe SQLite response store. WAL mode lets several collector
+    processes (e.g. monoglot + polyglot cohorts) share the same file.
+    """
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_body_bytes: int = MAX_BODY_BYTES):
+        self.path = path
+        self.max_body_bytes = max_body_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.hits = 0      # 304 revalidations served from disk
+        self.misses = 0    # full 200 downloads
+
+    def lookup(self, key: str) -> Optional[Tuple[Dict[str, str], bytes]]:
+        """Return (headers, body) for a cached entry, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT r.headers_json, b.body FROM responses r "
+                "JOIN bodies b ON b.digest = r.digest WHERE r.key = ?",
+                (key,),
+            ).fetchone()
+        if not row:
+            return None
+        return json.loads(row[0]), bytes(row[1])
+
+    @staticmethod
+    def validators(headers: Dict[str, str]) -> Dict[str, str]:
+        """Conditional request headers for a cached entry."""
+        out = {}
+        if headers.get("ETag"):
+            out["If-None-Match"] = headers["ETag"]
+        if headers.get("Last-Modified"):
+            out["If-Modified-Since"] = headers["Last-Modified"]
+        return out
+
+    def store(self, key: str, url: str, headers, body: bytes) -> None:
+        """Persist a 200 response if it carries a validator and is small enough."""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not (etag or last_modified) or len(body) > self.max_body_bytes:
+            return
+        kept = {h: headers[h] for h in REPLAYED_HEADERS if headers.get(h)}
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO bodies (digest, body) VALUES (?, ?)",
+                (digest, sqlite3.Binary(body)),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, etag, last_modified, digest, headers_json, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, digest, json.dumps(kept), time.time()),
+            )
+            self._conn.commit()
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = (100.0 * self.hits / total) if total else 0.0
+        return f"{self.hits} revalidated (304) / {self.misses} downloaded ({rate:.0f}% served from cache)"
+
+    def request(self, session: requests.Session, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Drop-in replacement for `session.request(...)`. Only plain GETs are
+        cached; streamed downloads and other methods pass straight through.
+        """
+        if method.upper() != "GET" or kwargs.get("stream"):
+            return session.request(method, url, **kwargs)
+
+        params = kwargs.pop("params", None)
+        full_url = requests.Request(method, url, params=params).prepare().url
+        headers = dict(kwargs.pop("headers", None) or {})
+        sent = requests.structures.CaseInsensitiveDict(session.headers)
+        sent.update(headers)
+        key = cache_key(method, full_url, sent.get("Accept"), sent.get("Authorization"))
+        cached = self.lookup(key)
+
+        if cached:
+            headers.update(self.validators(cached[0]))
+        resp = session.request(method, full_url, headers=headers, **kwargs)
+
+        if resp.status_code == 304 and cached:
+            cached_headers, body = cached
+            resp.status_code = 200
+            resp.reason = "OK (cached)"
+            resp.from_cache = True
+            resp._content = body
+            for h, v in cached_headers.items():
+                resp.headers.setdefault(h, v)
+            self.hits += 1
+            return resp
+
+        if resp.status_code == 200:
+            self.misses += 1
+            self.store(key, full_url, resp.headers, resp.content)
+        return resp
+
+
+# ---------- Process-wide default ----------
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def get_cache() -> Optional[ResponseCache]:
+    """Lazily open the cache configured via GITHUB_HTTP_CACHE (None if disabled)."""
+    global _default_cache
+    path = os.getenv("GITHUB_HTTP_CACHE", DEFAULT_CACHE_PATH).strip()
+    if path.lower() in ("off", "0", "false", "none", ""):
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(path)
+    return _default_cache
+
+
+def cached_request(session: requests.Session, method: str, url: str, **kwargs) -> requests.Response:
+    """`session.request` with transparent ETag/Last-Modified revalidation."""
+    cache = get_cache()
+    if cache is None:
+        return session.request(method, url, **kwargs)
+    return cache.request(session, method, url, **kwargs)
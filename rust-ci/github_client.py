@@ -0,0 +1,261 @@
+"""
+Shared asyncio GitHub REST client.
+
+Replaces the per-script `requests.Session` + retry loop + ThreadPoolExecutor
+stacks with one aiohttp-based client:
+  - bounded connection pool and a global semaphore on in-flight requests
+  - Link-header pagination exposed as an async iterator
+  - one throttle policy (Retry-After, primary reset, secondary/abuse limits, 5xx)
+  - transparent ETag revalidation through github_cache.ResponseCache
+  - budget pacing and multi-token rotation through rate_limiter.SharedRateLimiter
+
+Requirements:
+  pip install aiohttp python-dotenv
+
+Env:
+  GITHUB_TOKEN=<token>              (or GITHUB_TOKENS=<t1>,<t2>,... to rotate)
+  GITHUB_MAX_CONCURRENCY=<in-flight requests, default 64>
+
+Usage:
+  async with AsyncGitHubClient() as gh:
+      async for run in gh.paginate(f"{GH_REST}/repos/o/r/actions/runs", item_key="workflow_runs"):
+          ...
+"""
+
+import os
+import re
+import json
+import time
+import random
+import asyncio
+from typing import Any, AsyncIterator, Dict, Mapping, Optional
+from urllib.parse import urlencode
+
+import aiohttp
+from dotenv import load_dotenv
+
+from github_cache import cache_key, get_cache
+from rate_limiter import SharedRateLimiter, get_limiter, resource_for_url
+
+load_dotenv()
+
+GH_REST = "https://api.github.com"
+USER_AGENT = "ci-theater-rust/async-client"
+ACCEPT = "application/vnd.github+json"
+MAX_CONCURRENCY = int(os.getenv("GITHUB_MAX_CONCURRENCY", "64"))
+MAX_RETRIES = 6
+MAX_BACKOFF = 120.0      # seconds
+
+_LINK_RE = re.compile(r'<([^>]+)>\s*;\s*rel="([^"]+)"')
+
+
+class GitHubError(RuntimeError):
+    """Non-retryable (or retries exhausted) GitHub API failure."""
+    def __init__(self, status: int, url: str, detail: str = ""):
+        super().__init__(f"GitHub {status} for {url}: {detail[:200]}")
+        self.status = status
+        self.url = url
+
+
+# ---------- Throttle policy (shared by sync and async callers) ----------
+def retry_delay(status: int, headers: Mapping[str, str], body: str, attempt: int) -> Optional[float]:
+    """
+    Seconds to wait before retrying a response, or None if it is not retryable.
+    Handles:
+      - Retry-After on 403/429
+      - Primary rate limit exhausted (X-RateLimit-Remaining == 0) until X-RateLimit-Reset
+      - Secondary rate limit / abuse detection (exponential backoff)
+      - 5xx server errors (exponential backoff)
+    """
+    backoff = min(MAX_BACKOFF, 2 ** attempt)
+    if status in (403, 429):
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                return backoff
+        reset = headers.get("X-RateLimit-Reset")
+        if headers.get("X-RateLimit-Remaining") == "0" and reset and reset.isdigit():
+            return max(1, int(reset) - int(time.time())) + 1
+        text = (body or "").lower()
+        if "secondary rate limit" in text or "abuse detection" in text:
+            return min(MAX_BACKOFF, 3 * 2 ** attempt)
+        if status == 429 or "rate limit" in text:
+            return backoff
+        return None
+    if status >= 500:
+        return backoff
+    return None
+
+
+def with_jitter(seconds: float) -> float:
+    """Add up to 10% jitter so concurrent workers do not retry in lockstep."""
+    return seconds + seconds * 0.1 * random.random()
+
+
+def parse_link_header(value: Optional[str]) -> Dict[str, str]:
+    """Parse an RFC 5988 Link header into {rel: url}."""
+    if not value:
+        return {}
+    return {rel: url for url, rel in _LINK_RE.findall(value)}
+
+
+# ---------- Response wrapper ----------
+class GitHubResponse:
+    def __init__(self, status: int, headers: Mapping[str, str], body: bytes, url: str, from_cache: bool = False):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.url = url
+        self.from_cache = from_cache
+
+    def json(self) -> Any:
+        return json.loads(self.body.decode("utf-8")) if self.body else None
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    @property
+    def links(self) -> Dict[str, str]:
+        return parse_link_header(self.headers.get("Link"))
+
+
+# ---------- Client ----------
+class AsyncGitHubClient:
+    def __init__(
+        self,
+        concurrency: int = MAX_CONCURRENCY,
+        timeout_s: float = 30,
+        max_retries: int = MAX_RETRIES,
+        use_cache: bool = True,
+        limiter: Optional[SharedRateLimiter] = None,
+    ):
+        self.concurrency = concurrency
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self.cache = get_cache() if use_cache else None
+        self.limiter = limiter or get_limiter()
+        self._sem = asyncio.Semaphore(concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncGitHubClient":
+        headers = {"Accept": ACCEPT, "User-Agent": USER_AGENT}
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        self._session = aiohttp.ClientSession(
+            headers=headers,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout_s),
+        )
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        json_body: Optional[Any] = None,
+    ) -> GitHubResponse:
+        """
+        Issue one request with retries. Returns the final response (any status
+        that is not retryable, e.g. 404, is returned to the caller as-is).
+        """
+        assert self._session is not None, "use 'async with AsyncGitHubClient()'"
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+
+        cached = None
+        key = None
+        resource = resource_for_url(url)
+        for attempt in range(1, self.max_retries + 1):
+            token = await self.limiter.acquire_async(resource)
+            auth = self.limiter.auth_headers(token) if resource else {}
+            if self.cache is not None and method.upper() == "GET":
+                # Keyed per credential: the limiter may hand out a different token each attempt
+                key = cache_key(method, url, ACCEPT, auth.get("Authorization"))
+                # The cache is SQLite too: read and write it off the event loop
+                cached = await asyncio.to_thread(self.cache.lookup, key)
+            headers = self.cache.validators(cached[0]) if cached else {}
+            headers.update(auth)
+            try:
+                async with self._sem:
+                    async with self._session.request(method, url, headers=headers, json=json_body) as resp:
+                        body = await resp.read()
+                        status, resp_headers = resp.status, resp.headers
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = min(MAX_BACKOFF, 2 ** attempt)
+                print(f"🔁 Network error retry in {wait}s … {e}")
+                await asyncio.sleep(with_jitter(wait))
+                continue
+
+            # Limiter writes take a cross-process SQLite lock: keep them off the event loop
+            await asyncio.to_thread(self.limiter.update_from_headers, token, resp_headers)
+
+            if status == 304 and cached:
+                await asyncio.to_thread(self.limiter.refund, token, resource)
+                self.cache.hits += 1
+                merged = dict(cached[0])
+                merged.update(resp_headers)
+                return GitHubResponse(200, merged, cached[1], url, from_cache=True)
+
+            wait = retry_delay(status, resp_headers, body.decode("utf-8", errors="ignore"), attempt)
+            if wait is not None and attempt < self.max_retries:
+                print(f"⏳ {status} from GitHub: retry {attempt}/{self.max_retries} in {wait:.0f}s … {url}")
+                if status in (403, 429):
+                    # Park this token; the limiter rotates to another or waits it out.
+                    await asyncio.to_thread(self.limiter.penalize, token, wait, resource)
+                else:
+                    await asyncio.sleep(with_jitter(wait))
+                continue
+
+            if status == 200 and key is not None:
+                self.cache.misses += 1
+                await asyncio.to_thread(self.cache.store, key, url, resp_headers, body)
+            return GitHubResponse(status, resp_headers, body, url)
+
+        raise GitHubError(0, url, "retries exhausted")  # pragma: no cover
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, allow_404: bool = False) -> Any:
+        """GET and decode JSON; raises GitHubError on non-2xx (404 → None if allowed)."""
+        resp = await self.request("GET", url, params=params)
+        if resp.status == 404 and allow_404:
+            return None
+        if not 200 <= resp.status < 300:
+            raise GitHubError(resp.status, url, resp.text)
+        return resp.json()
+
+    async def paginate(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        item_key: Optional[str] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        Yield items across all pages by following `Link: rel="next"`.
+        `item_key` selects the list inside object payloads (e.g. "workflow_runs");
+        array payloads (e.g. /issues) are yielded directly. A 404 yields nothing.
+        Break out of the loop to stop paging early.
+        """
+        next_url: Optional[str] = url
+        next_params = dict(params or {})
+        next_params.setdefault("per_page", 100)
+        while next_url:
+            resp = await self.request("GET", next_url, params=next_params)
+            if resp.status == 404:
+                return
+            if not 200 <= resp.status < 300:
+                raise GitHubError(resp.status, next_url, resp.text)
+            payload = resp.json() or {}
+            items = payload.get(item_key, []) if item_key else payload
+            for item in items or []:
+                yield item
+            next_url = resp.links.get("next")
+            next_params = {}  # the "next" URL already carries the query string
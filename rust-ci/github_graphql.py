@@ -0,0 +1,242 @@
+"""
+Batched GitHub GraphQL probes for per-repo metadata.
+
+Folds what used to be several REST calls per repo into aliased GraphQL
+queries covering many repos at once:
+  - defaultBranchRef name + HEAD oid + HEAD tree oid
+  - path existence probes        object(expression: "HEAD:tests")
+  - directory listings           object(expression: "HEAD:.github/workflows") { ... on Tree { entries } }
+    (optionally with blob text, e.g. to scan workflow YAML without downloads)
+  - commit counts since a date   history(since: ...) { totalCount }
+  - any extra repository fields the caller needs (e.g. issue / PR totals)
+
+Batch size adapts to the query cost GitHub reports in the `rateLimit`
+block: it grows while queries stay cheap and fast, shrinks towards the cost
+target, and is halved when GitHub times out (502/504) or reports resource
+limits, down to a single repo.
+
+Usage:
+  facts = GraphQLBatcher().repo_facts(projects, paths=["tests"], trees=[".github/workflows"])
+  facts["owner/name"]["paths"]["tests"]   -> True / False
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+from github_client import GitHubError, retry_delay, with_jitter
+from rate_limiter import SharedRateLimiter, get_limiter
+
+GH_GQL = "https://api.github.com/graphql"
+USER_AGENT = "ci-theater-rust/graphql-batcher"
+DEFAULT_BATCH = 50
+MAX_BATCH = 100
+TARGET_COST = 10        # rate-limit points we are happy to spend on one query
+SLOW_QUERY_S = 20       # do not grow the batch after a query this slow
+TIMEOUT_S = 60
+MAX_RETRIES = 5
+HEAVY_ERRORS = ("RESOURCE_LIMITS_EXCEEDED", "MAX_NODE_LIMIT_EXCEEDED", "timeout", "Something went wrong")
+
+
+class QueryTooHeavy(RuntimeError):
+    """GitHub gave up on the query; retry with fewer repos."""
+
+
+def _lit(value: str) -> str:
+    """GraphQL string literal (JSON escaping is valid GraphQL)."""
+    return json.dumps(value)
+
+
+def _tree_fragment(with_text: bool) -> str:
+    blob = " object { ... on Blob { text isBinary } }" if with_text else ""
+    return f"... on Tree {{ entries {{ name type path{blob} }} }}"
+
+
+def build_repo_block(
+    alias: str,
+    owner: str,
+    name: str,
+    *,
+    paths: Iterable[str] = (),
+    trees: Iterable[str] = (),
+    tree_texts: Iterable[str] = (),
+    history_since: Optional[datetime] = None,
+    fields: str = "",
+) -> str:
+    """One aliased `repository(...)` selection with every requested probe."""
+    parts = ["nameWithOwner"]
+    history = ""
+    if history_since is not None:
+        since = history_since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        history = f" history(since: {_lit(since)}) {{ totalCount }}"
+    parts.append(f"defaultBranchRef {{ name target {{ ... on Commit {{ oid tree {{ oid }}{history} }} }} }}")
+    for i, path in enumerate(paths):
+        parts.append(f"p{i}: object(expression: {_lit('HEAD:' + path)}) {{ __typename }}")
+    for i, path in enumerate(trees):
+        parts.append(f"t{i}: object(expression: {_lit('HEAD:' + path)}) {{ {_tree_fragment(False)} }}")
+    for i, path in enumerate(tree_texts):
+        parts.append(f"x{i}: object(expression: {_lit('HEAD:' + path)}) {{ {_tree_fragment(True)} }}")
+    if fields:
+        parts.append(fields)
+    body = "\n    ".join(parts)
+    return f"  {alias}: repository(owner: {_lit(owner)}, name: {_lit(name)}) {{\n    {body}\n  }}"
+
+
+def _parse_entries(obj: Optional[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    if not obj or "entries" not in obj:
+        return None
+    out = []
+    for e in obj.get("entries") or []:
+        item = {"name": e.get("name"), "type": e.get("type"), "path": e.get("path")}
+        blob = e.get("object")
+        if blob is not None and not blob.get("isBinary"):
+            item["text"] = blob.get("text")
+        out.append(item)
+    return out
+
+
+class GraphQLBatcher:
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        limiter: Optional[SharedRateLimiter] = None,
+        batch_size: int = DEFAULT_BATCH,
+        target_cost: int = TARGET_COST,
+    ):
+        self.session = session or requests.Session()
+        self.session.headers.setdefault("User-Agent", USER_AGENT)
+        self.limiter = limiter or get_limiter()
+        self.batch_size = batch_size
+        self.target_cost = target_cost
+        self.queries = 0
+        self.points = 0
+
+    # ---------- transport ----------
+    def post(self, query: str) -> Dict[str, Any]:
+        """POST one query; returns the full payload ({data, errors})."""
+        for attempt in range(1, MAX_RETRIES + 1):
+            token = self.limiter.acquire_blocking("graphql")
+            try:
+                resp = self.session.post(
+                    GH_GQL, json={"query": query}, headers=self.limiter.auth_headers(token), timeout=TIMEOUT_S
+                )
+            except requests.Timeout as e:
+                raise QueryTooHeavy(str(e))
+            except requests.RequestException as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                wait = min(60, 2 ** attempt)
+                print(f"🔁 GraphQL network error, retry in {wait}s … {e}")
+                time.sleep(wait)
+                continue
+
+            self.limiter.update_from_headers(token, resp.headers)
+            if resp.status_code in (502, 504):
+                raise QueryTooHeavy(f"HTTP {resp.status_code}")
+            wait = retry_delay(resp.status_code, resp.headers, resp.text, attempt)
+            if wait is not None and attempt < MAX_RETRIES:
+                print(f"⏳ GraphQL {resp.status_code}: retry in {wait:.0f}s")
+                if resp.status_code in (403, 429):
+                    self.limiter.penalize(token, wait, "graphql")
+                else:
+                    time.sleep(with_jitter(wait))
+                continue
+            if resp.status_code != 200:
+                raise GitHubError(resp.status_code, GH_GQL, resp.text)
+            return resp.json()
+        raise GitHubError(0, GH_GQL, "retries exhausted")  # pragma: no cover
+
+    # ---------- batching ----------
+    def _resize(self, cost: int, elapsed: float) -> None:
+        if cost > self.target_cost:
+            self.batch_size = max(1, int(self.batch_size * self.target_cost / cost))
+        elif elapsed < SLOW_QUERY_S:
+            self.batch_size = min(MAX_BATCH, int(self.batch_size * 1.5) + 1)
+
+    def _run_batch(self, batch: List[Dict[str, str]], probes: Dict[str, Any]) -> Dict[str, Any]:
+        blocks = [build_repo_block(f"r{i}", p["owner"], p["name"], **probes) for i, p in enumerate(batch)]
+        query = "query RepoBatch {\n" + "\n".join(blocks) + "\n  rateLimit { cost remaining resetAt nodeCount }\n}"
+        start = time.time()
+        payload = self.post(query)
+        elapsed = time.time() - start
+
+        errors = payload.get("errors") or []
+        heavy = [e for e in errors if any(h in (e.get("type", "") + e.get("message", "")) for h in HEAVY_ERRORS)]
+        if heavy or payload.get("data") is None:
+            if heavy or not errors:
+                raise QueryTooHeavy(str(heavy or "no data"))
+            raise GitHubError(200, GH_GQL, json.dumps(errors)[:500])
+
+        data = payload["data"]
+        rate = data.get("rateLimit") or {}
+        self.queries += 1
+        self.points += int(rate.get("cost") or 0)
+        self._resize(int(rate.get("cost") or 1), elapsed)
+        return data
+
+    def repo_facts(
+        self,
+        projects: List[Dict[str, str]],
+        *,
+        paths: Iterable[str] = (),
+        trees: Iterable[str] = (),
+        tree_texts: Iterable[str] = (),
+        history_since: Optional[datetime] = None,
+        fields: str = "",
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Probe every repo (dicts with 'owner'/'name'). Returns, keyed by 'owner/name':
+          exists, default_branch, head_oid, head_tree_oid, commits_since,
+          paths {path: bool}, trees {path: entries | None}, node (raw repository node).
+        Repos that could not be queried at all are left out.
+        """
+        probes = {
+            "paths": list(paths),
+            "trees": list(trees),
+            "tree_texts": list(tree_texts),
+            "history_since": history_since,
+            "fields": fields,
+        }
+        out: Dict[str, Dict[str, Any]] = {}
+        pending = list(projects)
+        while pending:
+            batch = pending[:self.batch_size]
+            try:
+                data = self._run_batch(batch, probes)
+            except QueryTooHeavy as e:
+                if len(batch) == 1:
+                    print(f"⚠️ GraphQL gave up on {batch[0]['owner']}/{batch[0]['name']}: {e}")
+                    pending = pending[1:]
+                    continue
+                self.batch_size = max(1, len(batch) // 2)
+                print(f"🪓 GraphQL query too heavy, shrinking batch to {self.batch_size}")
+                continue
+            pending = pending[len(batch):]
+
+            for i, p in enumerate(batch):
+                key = f"{p['owner']}/{p['name']}"
+                node = data.get(f"r{i}")
+                if not node:
+                    out[key] = {"exists": False}
+                    continue
+                ref = node.get("defaultBranchRef") or {}
+                target = ref.get("target") or {}
+                trees_out = {path: _parse_entries(node.get(f"t{j}")) for j, path in enumerate(probes["trees"])}
+                trees_out.update({path: _parse_entries(node.get(f"x{j}")) for j, path in enumerate(probes["tree_texts"])})
+                out[key] = {
+                    "exists": True,
+                    "default_branch": ref.get("name"),
+                    "head_oid": target.get("oid"),
+                    "head_tree_oid": (target.get("tree") or {}).get("oid"),
+                    "commits_since": (target.get("history") or {}).get("totalCount"),
+                    "paths": {path: node.get(f"p{j}") is not None for j, path in enumerate(probes["paths"])},
+                    "trees": trees_out,
+                    "node": node,
+                }
+        return out
+
+    def summary(self) -> str:
+        return f"{self.queries} queries, {self.points} points, final batch size {self.batch_size}"
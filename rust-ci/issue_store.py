@@ -0,0 +1,201 @@
+"""
+Local copy of every repo's issues, refreshed incrementally with `since=`.
+
+The bug-issue scripts (31_collect_bug_issues.py, 31_ci_bug_issues_count.py)
+re-downloaded every issue of every repo whenever the CI date or the bug
+heuristic changed, although only the classification had changed. IssueStore
+keeps one row per issue (and pull request) in SQLite:
+
+  (repo, number, created_at, updated_at, closed_at, labels, title, body, body_hash, is_pr)
+
+sync() pages `GET /repos/{owner}/{repo}/issues?state=all&sort=updated&since=`
+from the newest `updated_at` already stored, so a refresh downloads only
+issues created or edited since the last run. bug_counts() classifies the
+stored rows against a CI date, so a new keyword list or a new CI date is a
+local query and costs no API quota. Bodies are stored zlib-compressed
+(the heuristic matches on body text); body_hash tells edited bodies apart.
+
+Env:
+  ISSUE_STORE_DB=<path to sqlite file>   (default: data/.cache/issues.sqlite)
+
+Usage:
+  store = get_issue_store()
+  store.sync("owner", "repo")
+  store.bug_counts("owner/repo", ci_date, classify=lambda df: classify_bugs(df)["is_bug"])
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+import requests
+
+from github_client import parse_link_header, retry_delay, with_jitter
+from rate_limiter import get_limiter
+
+DEFAULT_CACHE_PATH = os.path.join("data", ".cache", "issues.sqlite")
+API = "https://api.github.com/repos/{owner}/{repo}/issues"
+MAX_RETRIES = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    repo        TEXT NOT NULL,
+    number      INTEGER NOT NULL,
+    created_at  TEXT NOT NULL,      -- ISO 8601 UTC ('...Z'), sorts as text
+    updated_at  TEXT NOT NULL,
+    closed_at   TEXT,
+    labels      TEXT NOT NULL,      -- json list of label names
+    title       TEXT NOT NULL,
+    body        BLOB,               -- zlib(utf-8 body)
+    body_hash   TEXT NOT NULL,
+    is_pr       INTEGER NOT NULL,
+    PRIMARY KEY (repo, number)
+);
+CREATE INDEX IF NOT EXISTS issues_by_created ON issues (repo, is_pr, created_at);
+CREATE TABLE IF NOT EXISTS sync_state (
+    repo        TEXT PRIMARY KEY,
+    since       TEXT,               -- newest updated_at stored for the repo
+    synced_at   REAL NOT NULL
+);
+"""
+
+
+def _iso(dt: datetime) -> str:
+    """GitHub's timestamp format; naive datetimes are taken as UTC."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class IssueStore:
+    """Thread-safe; WAL mode so several collector processes can share the file."""
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("ISSUE_STORE_DB", DEFAULT_CACHE_PATH)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.limiter = get_limiter()
+        self.requests = 0
+
+    # ---------- sync ----------
+    def _get(self, url: str, params: Optional[Dict] = None) -> requests.Response:
+        for attempt in range(1, MAX_RETRIES + 1):
+            token = self.limiter.acquire_blocking("core")
+            resp = requests.get(url, headers=self.limiter.auth_headers(token), params=params, timeout=30)
+            self.limiter.update_from_headers(token, resp.headers)
+            self.requests += 1
+            wait = retry_delay(resp.status_code, resp.headers, resp.text, attempt)
+            if wait is not None and attempt < MAX_RETRIES:
+                print(f"⏳ {resp.status_code}: retry in {wait:.0f}s … {url}")
+                if resp.status_code in (403, 429):
+                    self.limiter.penalize(token, wait, "core")
+                else:
+                    time.sleep(with_jitter(wait))
+                continue
+            resp.raise_for_status()
+            return resp
+        raise RuntimeError(f"retries exhausted for {url}")
+
+    def _pages(self, owner: str, repo: str, since: Optional[str]) -> Iterator[List[dict]]:
+        params = {"state": "all", "sort": "updated", "direction": "asc", "per_page": 100}
+        if since:
+            params["since"] = since
+        url: Optional[str] = API.format(owner=owner, repo=repo)
+        while url:
+            resp = self._get(url, params)
+            params = None   # the `next` link already carries the query
+            yield resp.json() or []
+            url = parse_link_header(resp.headers.get("Link")).get("next")
+
+    def sync(self, owner: str, repo: str) -> int:
+        """Fetch issues created or updated since the last sync; returns how many rows were written."""
+        key = f"{owner}/{repo}".lower()
+        with self._lock:
+            row = self._conn.execute("SELECT since FROM sync_state WHERE repo = ?", (key,)).fetchone()
+        since = row[0] if row else None
+        written = 0
+        for page in self._pages(owner, repo, since):
+            rows = []
+            for issue in page:
+                if not issue.get("created_at"):
+                    continue
+                body = (issue.get("body") or "").encode("utf-8")
+                rows.append((
+                    key, issue["number"], issue["created_at"], issue["updated_at"], issue.get("closed_at"),
+                    json.dumps([l.get("name") for l in issue.get("labels") or [] if isinstance(l, dict)]),
+                    issue.get("title") or "", zlib.compress(body), hashlib.sha1(body).hexdigest(),
+                    int("pull_request" in issue),
+                ))
+                since = max(since or "", issue["updated_at"])
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO issues (repo, number, created_at, updated_at, closed_at, labels, "
+                    "title, body, body_hash, is_pr) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                # Saved per page, so an interrupted sync resumes where it stopped.
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (repo, since, synced_at) VALUES (?, ?, ?)",
+                    (key, since, time.time()))
+                self._conn.commit()
+            written += len(rows)
+        return written
+
+    def synced(self, repo_full: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM sync_state WHERE repo = ?", (repo_full.lower(),)).fetchone() is not None
+
+    # ---------- local queries ----------
+    def frame(self, repo_full: str, include_prs: bool = False) -> pd.DataFrame:
+        """Stored issues of a repo: number, created_at, closed_at, labels (list of names), title, body, is_pr."""
+        sql = "SELECT number, created_at, closed_at, labels, title, body, is_pr FROM issues WHERE repo = ?"
+        if not include_prs:
+            sql += " AND is_pr = 0"
+        with self._lock:
+            rows = self._conn.execute(sql, (repo_full.lower(),)).fetchall()
+        df = pd.DataFrame(rows, columns=["number", "created_at", "closed_at", "labels", "title", "body", "is_pr"])
+        df["labels"] = df["labels"].map(json.loads)
+        df["body"] = df["body"].map(lambda b: zlib.decompress(b).decode("utf-8") if b else "")
+        df["is_pr"] = df["is_pr"].astype(bool)
+        return df
+
+    def bug_counts(self, repo_full: str, ci_date: datetime,
+                   classify: Callable[[pd.DataFrame], pd.Series]) -> Dict[str, int]:
+        """
+        Issues (not PRs) created before / on-or-after ci_date for which the
+        batch classifier `classify(frame) -> bool Series` holds.
+        """
+        df = self.frame(repo_full)
+        if df.empty:
+            return {"before": 0, "after": 0}
+        bugs = df["created_at"][classify(df).to_numpy(dtype=bool)]
+        before = int((bugs < _iso(ci_date)).sum())
+        return {"before": before, "after": len(bugs) - before}
+
+    def summary(self) -> str:
+        with self._lock:
+            repos, issues = self._conn.execute("SELECT COUNT(DISTINCT repo), COUNT(*) FROM issues").fetchone()
+        return f"{issues} issues/PRs stored for {repos} repos, {self.requests} API requests this run"
+
+
+# ---------- Process-wide default ----------
+_default_store: Optional[IssueStore] = None
+_default_lock = threading.Lock()
+
+
+def get_issue_store() -> IssueStore:
+    """Lazily open the store configured via ISSUE_STORE_DB."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = IssueStore()
+    return _default_store
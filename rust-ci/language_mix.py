@@ -0,0 +1,85 @@
+"""
+Language-mix helpers shared by the SLOC collectors.
+
+19 (Rust SLOC), 29 / 29a (language SLOC and share) and repo_metrics.py all
+turn a cloc-shaped result ({language: {"code": n, ...}, "header", "SUM"})
+into the same rows. The filtering and the row layout live here so every
+script produces identical summaries.
+
+Usage:
+  lang_sloc = extract_lang_sloc(cloc_data)
+  if is_rust_present(lang_sloc):
+      row = create_summary_row(name, "owner/repo", lang_sloc)
+"""
+
+import json
+
+# Treat these as non-programming or not useful for polyglot signal
+# (tweak to your taste)
+IGNORED_LANGS = {
+    "Markdown", "RMarkdown", "XML", "HTML", "SVG", "TeX", "LaTeX",
+    "Org", "AsciiDoc", "Text", "Plain Text", "JSON", "YAML", "TOML", "INI",
+    "CSV", "TSV", "Properties", "Dos Batch", "DOS Batch", "PowerShell Profile",
+    "CMake", "CMakeLists.txt", "Git Attributes", "Git Config", "Dockerfile",
+    "Makefile", "Ninja", "Bourne Shell", "BASH", "Zsh", "Fish",
+    "Protocol Buffers", "Protobuf", "GraphQL", "Thrift", "Cap'n Proto",
+    "reStructuredText", "Sphinx", "Doxygen", "RobotFramework",
+    # add anything noisy you want excluded
+}
+
+TOP_LANGS_N = 5  # how many top languages to show in summary column
+
+
+def categorize_project(sloc: int) -> str:
+    """19's size bucket for a Rust SLOC count."""
+    if sloc < 1000:
+        return "Very Small"
+    elif sloc < 10000:
+        return "Small"
+    elif sloc < 100000:
+        return "Medium"
+    elif sloc < 1000000:
+        return "Large"
+    else:
+        return "Very Large"
+
+
+def extract_lang_sloc(cloc_data: dict) -> dict:
+    """Return {language: sloc} after filtering out IGNORED_LANGS."""
+    lang_sloc = {}
+    for lang, stats in cloc_data.items():
+        if lang in ("header", "SUM"):
+            continue
+        if lang in IGNORED_LANGS:
+            continue
+        if not isinstance(stats, dict):
+            continue
+        code = int(stats.get("code", 0))
+        if code > 0:
+            lang_sloc[lang] = code
+    return lang_sloc
+
+
+def is_rust_present(lang_sloc: dict) -> bool:
+    return lang_sloc.get("Rust", 0) > 0
+
+
+def summarize_top_langs(lang_sloc: dict, n: int = TOP_LANGS_N) -> str:
+    items = sorted(lang_sloc.items(), key=lambda kv: kv[1], reverse=True)[:n]
+    return ", ".join([f"{k} ({v})" for k, v in items])
+
+
+def create_summary_row(name: str, repo_full: str, lang_sloc: dict) -> dict:
+    """One row of the 29 / 29a summary ("sizes") file."""
+    total = sum(lang_sloc.values())
+    rust = lang_sloc.get("Rust", 0)
+    return {
+        "name": name,
+        "repo": repo_full,
+        "total_sloc": total,
+        "rust_sloc": rust,
+        "rust_share_pct": round(100.0 * rust / total, 2) if total else 0.0,
+        "num_langs": len(lang_sloc),
+        "top_langs": summarize_top_langs(lang_sloc, TOP_LANGS_N),
+        "languages_json": json.dumps(lang_sloc, sort_keys=True),
+    }
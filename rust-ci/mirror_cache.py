@@ -0,0 +1,397 @@
+"""
+Persistent bare-mirror clone cache for the git-based collectors.
+
+19, 20, 25_1, 29, 29a and 29_polyglot used to clone every repo into a
+throwaway TemporaryDirectory and delete it afterwards, so each run
+re-downloaded the same history. Here each repo is cloned once into a bare
+mirror under `GIT_MIRROR_DIR`; later runs only `git fetch --prune` the
+delta (and skip even that if the mirror was refreshed recently).
+
+  - ensure(slug)      bare mirror (branches only; GitHub's refs/pull/* are not mirrored)
+  - using(slug)       context manager: mirror path, protected from eviction while in use
+  - checkout(slug)    context manager: temporary working tree of HEAD (for cloc & co.)
+  - head(slug)        (commit oid, tree oid) of the mirror's HEAD
+  - ls_remote_head()  HEAD commit oid on GitHub, without cloning
+
+Mirrors may be partial (`filter_spec="blob:none"` / `"tree:0"`) for
+history-only metrics: a tree:0 mirror holds commits only, typically a tenth
+of the bytes or less. A full mirror satisfies every request, a partial one
+is re-cloned when a fuller one is needed. Servers that reject a filter are
+retried with the next fuller one (tree:0 -> blob:none -> full), and servers
+that silently ignore it are recorded as full mirrors.
+
+Every clone and fetch (re)writes an incremental commit-graph
+(`--reachable --split`), so date-bounded walks such as
+`rev-list --count --since --until` stop early without parsing commit objects.
+
+Each repo has a lock file (flock): fetch / clone / eviction take it
+exclusively, readers share it, so several collector processes can use the
+cache at once. Least-recently-used mirrors are deleted once the cache grows
+past `GIT_MIRROR_MAX_GB`.
+
+The token is passed to git via GIT_CONFIG_* environment variables, so it is
+never written into the mirror's config or shown in the process list.
+
+Env:
+  GIT_MIRROR_DIR=<dir>              (default: data/.cache/git_mirrors)
+  GIT_MIRROR_MAX_GB=<float>         (default: 100; 0 disables eviction)
+  GIT_MIRROR_REFRESH_HOURS=<float>  (default: 12; skip fetch if refreshed more recently)
+
+Usage:
+  with get_mirror_cache().checkout("owner/repo") as path:
+      run_cloc(path)
+  with get_mirror_cache().using("owner/repo", filter_spec="tree:0") as git_dir:
+      Repo(git_dir).iter_commits()
+"""
+
+import os
+import time
+import base64
+import shutil
+import sqlite3
+import threading
+import subprocess
+from contextlib import contextmanager
+from tempfile import TemporaryDirectory
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: fall back to in-process locking only
+    fcntl = None
+
+DEFAULT_MIRROR_DIR = os.path.join("data", ".cache", "git_mirrors")
+REMOTE_URL = "https://github.com/{slug}.git"
+DEFAULT_MAX_GB = 100.0
+DEFAULT_REFRESH_HOURS = 12.0
+GIT_TIMEOUT_S = 3600
+MAX_RETRIES = 3
+TRANSIENT_ERRORS = (
+    "Failed to connect", "Could not resolve host", "Connection reset by peer", "Broken pipe",
+    "RPC failed", "early EOF", "unexpected disconnect", "Operation timed out",
+)
+# How much of the object graph a mirror holds: lower rank = fuller mirror
+FILTER_RANK = {None: 0, "blob:none": 1, "tree:0": 2}
+# Next filter to try when the server refuses one
+FILTER_FALLBACK = {"tree:0": "blob:none", "blob:none": None}
+FILTER_ERRORS = ("filter", "partial clone", "uploadpack.allowfilter")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mirrors (
+    key         TEXT PRIMARY KEY,     -- directory name, e.g. owner__repo.git
+    slug        TEXT NOT NULL,
+    filter_spec TEXT,                 -- NULL for a full mirror
+    bytes       INTEGER NOT NULL DEFAULT 0,
+    fetched_at  REAL NOT NULL,
+    last_used   REAL NOT NULL
+);
+"""
+
+
+class MirrorError(RuntimeError):
+    """git clone / fetch failed for a repo."""
+
+
+def mirror_key(slug: str) -> str:
+    owner, name = slug.strip().strip("/").lower().split("/", 1)
+    return f"{owner}__{name}.git"
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _dirs, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.lstat(os.path.join(dirpath, f)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def git_env() -> dict:
+    """Environment for git: no prompts, stall detection, token as an extra header."""
+    env = os.environ.copy()
+    env.update({
+        "GIT_TERMINAL_PROMPT": "0",
+        "GIT_HTTP_LOW_SPEED_LIMIT": "1000",  # bytes per second
+        "GIT_HTTP_LOW_SPEED_TIME": "300",    # 5 minutes
+    })
+    token = os.getenv("GITHUB_TOKEN")
+    if token:
+        basic = base64.b64encode(f"x-access-token:{token}".encode()).decode()
+        env.update({
+            "GIT_CONFIG_COUNT": "1",
+            "GIT_CONFIG_KEY_0": "http.https://github.com/.extraheader",
+            "GIT_CONFIG_VALUE_0": f"AUTHORIZATION: basic {basic}",
+        })
+    return env
+
+
+def run_git(args: List[str], *, cwd: Optional[str] = None, env: Optional[dict] = None,
+            timeout: int = GIT_TIMEOUT_S) -> str:
+    """Run git, returning stdout; raises MirrorError with git's last stderr line."""
+    proc = subprocess.run(
+        ["git", *args], cwd=cwd, env=env or git_env(), timeout=timeout,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    if proc.returncode != 0:
+        lines = [l for l in (proc.stderr or "").strip().splitlines() if l.strip()]
+        raise MirrorError(lines[-1] if lines else f"git {args[0]} exited with {proc.returncode}")
+    return proc.stdout
+
+
+def ls_remote_head(slug: str) -> Optional[str]:
+    """Commit oid of the remote HEAD (default branch) via `git ls-remote`; None if unreachable."""
+    try:
+        out = run_git(["ls-remote", REMOTE_URL.format(slug=slug), "HEAD"], timeout=120)
+    except (MirrorError, subprocess.TimeoutExpired):
+        return None
+    return out.split()[0] if out.strip() else None
+
+
+class MirrorCache:
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None,
+                 refresh_s: Optional[float] = None):
+        self.root = root or os.getenv("GIT_MIRROR_DIR", DEFAULT_MIRROR_DIR)
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("GIT_MIRROR_MAX_GB", DEFAULT_MAX_GB)) * 1024 ** 3)
+        self.max_bytes = max_bytes
+        if refresh_s is None:
+            refresh_s = float(os.getenv("GIT_MIRROR_REFRESH_HOURS", DEFAULT_REFRESH_HOURS)) * 3600
+        self.refresh_s = refresh_s
+        os.makedirs(os.path.join(self.root, "locks"), exist_ok=True)
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.root, "mirrors.sqlite"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._thread_locks: dict = {}
+        self.cloned = 0
+        self.fetched = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def path_for(self, slug: str) -> str:
+        return os.path.join(self.root, mirror_key(slug))
+
+    # ---------- locking ----------
+    @contextmanager
+    def _locked(self, key: str, exclusive: bool, blocking: bool = True) -> Iterator[bool]:
+        """Per-repo lock shared across processes (flock) and threads."""
+        if fcntl is None:
+            with self._db_lock:
+                lock = self._thread_locks.setdefault(key, threading.Lock())
+            got = lock.acquire(blocking)
+            try:
+                yield got
+            finally:
+                if got:
+                    lock.release()
+            return
+        fd = os.open(os.path.join(self.root, "locks", key + ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            try:
+                fcntl.flock(fd, mode if blocking else mode | fcntl.LOCK_NB)
+                got = True
+            except BlockingIOError:
+                got = False
+            yield got
+        finally:
+            os.close(fd)   # releases the flock
+
+    # ---------- bookkeeping ----------
+    def _row(self, key: str):
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT filter_spec, fetched_at FROM mirrors WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _record(self, key: str, slug: str, filter_spec: Optional[str], path: str, fetched: bool) -> None:
+        now = time.time()
+        with self._db_lock:
+            if fetched:
+                self._conn.execute(
+                    "INSERT INTO mirrors (key, slug, filter_spec, bytes, fetched_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                    "filter_spec = excluded.filter_spec, bytes = excluded.bytes, "
+                    "fetched_at = excluded.fetched_at, last_used = excluded.last_used",
+                    (key, slug, filter_spec, _dir_size(path), now, now),
+                )
+            else:
+                self._conn.execute("UPDATE mirrors SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+
+    def _forget(self, key: str) -> None:
+        with self._db_lock:
+            self._conn.execute("DELETE FROM mirrors WHERE key = ?", (key,))
+            self._conn.commit()
+
+    # ---------- git ----------
+    def _with_retries(self, slug: str, fn) -> None:
+        for attempt in range(MAX_RETRIES):
+            try:
+                return fn()
+            except MirrorError as e:
+                if attempt + 1 < MAX_RETRIES and any(err in str(e) for err in TRANSIENT_ERRORS):
+                    wait = 2 ** attempt  # Exponential backoff: 1, 2, 4 seconds
+                    print(f"  [warn] git failed for {slug} (attempt {attempt + 1}/{MAX_RETRIES}), "
+                          f"retrying in {wait}s... Reason: {e}")
+                    time.sleep(wait)
+                    continue
+                raise
+
+    def _clone(self, slug: str, path: str, filter_spec: Optional[str]) -> Optional[str]:
+        """Clone into `path`; returns the filter the mirror actually has (None = full)."""
+        tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+
+        def attempt(spec: Optional[str]):
+            shutil.rmtree(tmp, ignore_errors=True)
+            args = ["clone", "--bare", "--no-tags"]
+            if spec:
+                args.append(f"--filter={spec}")
+            run_git(args + [REMOTE_URL.format(slug=slug), tmp])
+            run_git(["config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*"], cwd=tmp)
+
+        try:
+            while True:
+                try:
+                    self._with_retries(slug, lambda: attempt(filter_spec))
+                    break
+                except MirrorError as e:
+                    if not filter_spec or not any(err in str(e).lower() for err in FILTER_ERRORS):
+                        raise
+                    fallback = FILTER_FALLBACK.get(filter_spec)
+                    print(f"  [warn] {slug}: server refused --filter={filter_spec} ({e}); "
+                          f"retrying with {'--filter=' + fallback if fallback else 'a full clone'}")
+                    filter_spec = fallback
+            if filter_spec and not self._is_partial(tmp):
+                filter_spec = None   # server ignored the filter and sent everything
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self._write_commit_graph(tmp)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp, path)
+        self.cloned += 1
+        return filter_spec
+
+    @staticmethod
+    def _is_partial(git_dir: str) -> bool:
+        """True if objects are actually missing (the filter was honored); never lazy-fetches."""
+        try:
+            out = run_git(["rev-list", "--objects", "--missing=print", "--max-count=1", "HEAD"], cwd=git_dir)
+        except MirrorError:
+            return False
+        return any(line.startswith("?") for line in out.splitlines())
+
+    @staticmethod
+    def _write_commit_graph(git_dir: str) -> None:
+        """Incremental commit-graph, so date-bounded rev-list walks read commit dates without parsing commits.
+        No --changed-paths: that needs trees, which commits-only mirrors do not have."""
+        try:
+            run_git(["commit-graph", "write", "--reachable", "--split"], cwd=git_dir)
+        except MirrorError as e:
+            print(f"  [warn] commit-graph not written for {git_dir}: {e}")
+
+    def _fetch(self, slug: str, path: str) -> None:
+        self._with_retries(slug, lambda: run_git(["fetch", "--prune", "--no-tags", "origin"], cwd=path))
+        self._write_commit_graph(path)
+        self.fetched += 1
+
+    def ensure(self, slug: str, filter_spec: Optional[str] = None, fresh: bool = False) -> str:
+        """Clone or refresh the mirror for 'owner/repo'; returns the bare repo path.
+        `fresh` fetches even if the mirror was refreshed within refresh_s."""
+        key = mirror_key(slug)
+        path = self.path_for(slug)
+        with self._locked(key, exclusive=True):
+            row = self._row(key) if os.path.isdir(path) else None
+            if row is not None and FILTER_RANK.get(row[0], 0) <= FILTER_RANK.get(filter_spec, 0):
+                if not fresh and time.time() - row[1] < self.refresh_s:
+                    self.reused += 1
+                    self._record(key, slug, row[0], path, fetched=False)
+                    return path
+                self._fetch(slug, path)
+                self._record(key, slug, row[0], path, fetched=True)
+            else:
+                actual = self._clone(slug, path, filter_spec)
+                self._record(key, slug, actual, path, fetched=True)
+        self.evict(keep=key)
+        return path
+
+    @contextmanager
+    def using(self, slug: str, filter_spec: Optional[str] = None, fresh: bool = False) -> Iterator[str]:
+        """Mirror path, held under a shared lock so eviction cannot remove it mid-use."""
+        key = mirror_key(slug)
+        while True:
+            path = self.ensure(slug, filter_spec, fresh)
+            with self._locked(key, exclusive=False):
+                if os.path.isdir(path):
+                    yield path
+                    return
+            # evicted between ensure() and the shared lock: fetch it again
+
+    def head(self, slug: str, expect: Optional[str] = None) -> Tuple[str, str]:
+        """(commit oid, tree oid) of HEAD in the full mirror; fetches now if HEAD is not `expect`."""
+        with self.using(slug) as git_dir:
+            commit, tree = run_git(["rev-parse", "HEAD", "HEAD^{tree}"], cwd=git_dir).split()
+        if expect and commit != expect:
+            with self.using(slug, fresh=True) as git_dir:
+                commit, tree = run_git(["rev-parse", "HEAD", "HEAD^{tree}"], cwd=git_dir).split()
+        return commit, tree
+
+    @contextmanager
+    def checkout(self, slug: str, tmp_parent: Optional[str] = None, rev: str = "HEAD") -> Iterator[str]:
+        """Temporary working tree of `rev` (default HEAD), materialized from the full mirror."""
+        with self.using(slug) as git_dir:
+            with TemporaryDirectory(dir=tmp_parent) as tmp:
+                dest = os.path.join(tmp, "src")
+                os.makedirs(dest)
+                env = git_env()
+                env["GIT_INDEX_FILE"] = os.path.join(tmp, "index")   # never touch the mirror's index
+                base = ["--git-dir", git_dir, "--work-tree", dest]
+                run_git(base + ["read-tree", rev], env=env)
+                run_git(base + ["checkout-index", "--all", "--force"], env=env)
+                os.remove(env["GIT_INDEX_FILE"])
+                yield dest
+
+    # ---------- eviction ----------
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Delete least-recently-used mirrors (except `keep`) until the cache fits in max_bytes."""
+        if self.max_bytes <= 0:
+            return
+        with self._db_lock:
+            rows = self._conn.execute("SELECT key, bytes FROM mirrors ORDER BY last_used").fetchall()
+        total = sum(b for _k, b in rows)
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            with self._locked(key, exclusive=True, blocking=False) as got:
+                if not got:
+                    continue   # in use right now
+                shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+                self._forget(key)
+            total -= size
+            self.evicted += 1
+
+    def summary(self) -> str:
+        with self._db_lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM mirrors").fetchone()
+        return (f"{self.cloned} cloned, {self.fetched} fetched, {self.reused} reused, "
+                f"{self.evicted} evicted; {count} mirrors / {size / 1024 ** 3:.1f} GB on disk")
+
+
+# ---------- Process-wide default ----------
+_default_cache: Optional[MirrorCache] = None
+_default_lock = threading.Lock()
+
+
+def get_mirror_cache() -> MirrorCache:
+    """Lazily open the cache configured via GIT_MIRROR_DIR."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = MirrorCache()
+    return _default_cache
@@ -0,0 +1,85 @@
+"""
+Single-pass multi-rule regex matcher.
+
+The detectors keep their rules as ordered (pattern, label) lists and used
+to run one `search` / `finditer` per rule over the same text, i.e. N full
+scans of every workflow file or multi-megabyte log. MultiPattern folds the
+rules into one alternation, each wrapped in a named group, so one scan
+reports which rule matched where:
+
+  (?P<r0>(?i:\\bcargo\\s+test\\b))|(?P<r1>(?i:\\bpytest...))|...
+
+Per-rule flags are kept as scoped inline flags, and each rule's own capture
+groups are still addressable (see `rule_groups`). Matches are leftmost and
+non-overlapping, like `finditer` on a single pattern.
+
+Usage:
+  TEST_CMDS = MultiPattern(TEST_CMD_PATTERNS)
+  TEST_CMDS.first_label(text)        # label of the highest-priority rule that matched
+  TEST_CMDS.labels(text)             # every label that matched
+  for idx, label, m in TEST_CMDS.finditer(text): ...
+"""
+
+import re
+from typing import Any, Iterator, List, Optional, Pattern, Sequence, Set, Tuple, Union
+
+_SCOPED_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"))
+
+
+def _scoped(pat: Pattern) -> str:
+    letters = "".join(ch for flag, ch in _SCOPED_FLAGS if pat.flags & flag)
+    return f"(?{letters}:{pat.pattern})" if letters else f"(?:{pat.pattern})"
+
+
+class MultiPattern:
+    """
+    `rules` is an ordered sequence of (pattern, label); patterns may be
+    compiled (their flags are honored) or strings (compiled with `flags`).
+    Earlier rules have priority in `first_label`.
+    """
+    def __init__(self, rules: Sequence[Tuple[Union[str, Pattern], Any]], flags: int = 0):
+        self.labels_by_rule: List[Any] = []
+        self._offsets: List[Tuple[int, int]] = []   # (first inner group, inner group count) per rule
+        parts = []
+        group = 0
+        for i, (pat, label) in enumerate(rules):
+            compiled = re.compile(pat, flags) if isinstance(pat, str) else pat
+            group += 1   # the wrapping r{i} group
+            self._offsets.append((group + 1, compiled.groups))
+            group += compiled.groups
+            parts.append(f"(?P<r{i}>{_scoped(compiled)})")
+            self.labels_by_rule.append(label)
+        self.regex = re.compile("|".join(parts)) if parts else None
+
+    def finditer(self, text: str, pos: int = 0) -> Iterator[Tuple[int, Any, "re.Match"]]:
+        """Yield (rule index, label, match) for each match, in text order."""
+        if self.regex is None:
+            return
+        for m in self.regex.finditer(text, pos):
+            idx = int(m.lastgroup[1:])
+            yield idx, self.labels_by_rule[idx], m
+
+    def rule_groups(self, idx: int, m: "re.Match") -> Tuple[Optional[str], ...]:
+        """The matched rule's own capture groups (what `m.groups()` would be for that rule alone)."""
+        start, count = self._offsets[idx]
+        return tuple(m.group(g) for g in range(start, start + count))
+
+    def search(self, text: str) -> Optional[Tuple[int, Any, "re.Match"]]:
+        return next(self.finditer(text), None)
+
+    def first_label(self, text: str) -> Optional[Any]:
+        """Label of the lowest-index rule that matches anywhere in `text` (one scan)."""
+        best = None
+        for idx, _label, _m in self.finditer(text):
+            if best is None or idx < best:
+                best = idx
+                if idx == 0:
+                    break
+        return None if best is None else self.labels_by_rule[best]
+
+    def labels(self, text: str) -> Set[Any]:
+        """Every label with at least one match."""
+        out: Set[Any] = set()
+        for _idx, label, _m in self.finditer(text):
+            out.add(label)
+        return out
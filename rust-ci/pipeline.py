@@ -0,0 +1,114 @@
+"""
+Two-stage scheduler: network-bound fetches on threads, CPU-bound analysis on processes.
+
+The clone-based collectors spend their time in two very different ways: a
+`git fetch` / clone / API lookup waits on the network, while counting SLOC,
+walking trees and parsing history burn CPU in Python (and hold the GIL).
+Running both on one ThreadPoolExecutor leaves most cores idle. run_pipeline()
+splits them:
+
+  items --> fetch(item) on FETCH_WORKERS threads
+              |  returns Done(value) (nothing left to compute, e.g. cache hit)
+              |  or the picklable arguments for compute
+              v
+            [ at most PIPELINE_QUEUE fetched items waiting ]
+              v
+            compute(*args) on a process pool of CPU_WORKERS (default: all cores)
+
+The bound is a semaphore taken before a fetch and released when the item's
+compute finishes, so the fetchers never run more than PIPELINE_QUEUE repos ahead
+of the CPU stage (bounded disk / memory), and the CPU stage never starves
+while fetches are outstanding. Worker processes are started with
+`forkserver` (`spawn` where unavailable) so they are never forked from a
+parent that is already running fetch threads. `compute` must be a
+module-level function.
+
+Env:
+  FETCH_WORKERS=<threads for the network stage>     (default: 8)
+  CPU_WORKERS=<processes for the CPU stage>         (default: os.cpu_count())
+  PIPELINE_QUEUE=<fetched items waiting for a CPU>  (default: 2 x CPU_WORKERS)
+
+Usage:
+  for item, value, error in run_pipeline(projects, fetch, compute):
+      ...
+"""
+
+import os
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional, Sequence, Tuple
+
+DEFAULT_FETCH_WORKERS = 8
+
+
+class Done:
+    """Returned by a fetch function when the item needs no CPU stage."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+def default_cpu_workers() -> int:
+    return int(os.getenv("CPU_WORKERS", 0)) or os.cpu_count() or 1
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def run_pipeline(
+    items: Sequence[Any],
+    fetch: Callable[[Any], Any],
+    compute: Callable[..., Any],
+    *,
+    fetch_workers: Optional[int] = None,
+    cpu_workers: Optional[int] = None,
+    queue_size: Optional[int] = None,
+) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """
+    Yield (item, value, error) for every item, in completion order. `fetch`
+    runs on threads and returns Done(value) or a tuple of arguments for
+    `compute`, which runs in a worker process. An exception in either stage
+    is reported as `error` (value None); the other items carry on.
+    """
+    fetch_workers = fetch_workers or int(os.getenv("FETCH_WORKERS", 0)) or DEFAULT_FETCH_WORKERS
+    n_cpu = cpu_workers or default_cpu_workers()
+    slots = threading.BoundedSemaphore(queue_size or int(os.getenv("PIPELINE_QUEUE", 0)) or 2 * n_cpu)
+    finished: "queue.Queue[Tuple[Any, Any, Optional[BaseException]]]" = queue.Queue()
+
+    with ProcessPoolExecutor(max_workers=n_cpu, mp_context=_mp_context()) as cpu, \
+            ThreadPoolExecutor(max_workers=fetch_workers) as net:
+
+        def computed(item: Any, future: Future) -> None:
+            slots.release()
+            error = future.exception()
+            finished.put((item, None if error else future.result(), error))
+
+        def fetch_one(item: Any) -> None:
+            slots.acquire()   # backpressure: wait until the CPU stage has room
+            try:
+                staged = fetch(item)
+            except Exception as e:
+                slots.release()
+                finished.put((item, None, e))
+                return
+            if isinstance(staged, Done):
+                slots.release()
+                finished.put((item, staged.value, None))
+                return
+            try:
+                future = cpu.submit(compute, *staged)
+            except Exception as e:
+                slots.release()
+                finished.put((item, None, e))
+                return
+            future.add_done_callback(lambda f: computed(item, f))
+
+        for item in items:
+            net.submit(fetch_one, item)
+        for _ in range(len(items)):
+            yield finished.get()
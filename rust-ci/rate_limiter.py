@@ -0,0 +1,289 @@
+"""
+Cross-process GitHub rate limiter with multi-token rotation.
+
+State lives in a small SQLite file so that several collectors running at the
+same time (e.g. the monoglot and polyglot cohorts in parallel) draw from one
+shared budget instead of trampling each other. For every (token, resource)
+pair we keep:
+  - the primary budget reported by GitHub (X-RateLimit-Remaining / -Reset)
+  - a token bucket refilled at `remaining / seconds-until-reset`, so requests
+    are spread evenly across the reset window instead of bursting to zero
+    and then stalling
+  - a `blocked_until` timestamp set when a secondary limit / abuse response
+    (403/429 + Retry-After) parks that token
+
+`acquire()` picks the token that can send soonest, so with several tokens a
+throttled one is simply skipped.
+
+Env:
+  GITHUB_TOKEN=<token>
+  GITHUB_TOKENS=<token1>,<token2>,...          (optional extra tokens to rotate)
+  GITHUB_RATELIMIT_DB=<path to sqlite file>    (default: data/.cache/github_ratelimit.sqlite)
+
+Usage:
+  from rate_limiter import get_limiter, resource_for_url
+  limiter = get_limiter()
+  token = limiter.acquire_blocking(resource_for_url(url))
+  resp = session.get(url, headers=limiter.auth_headers(token))
+  limiter.update_from_headers(token, resp.headers)
+  # on 403/429 secondary limits: limiter.penalize(token, retry_after_seconds)
+"""
+
+import os
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from typing import Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_DB_PATH = os.path.join("data", ".cache", "github_ratelimit.sqlite")
+RESERVE = 50          # leave this much primary budget untouched per token (capped per resource below)
+BURST = 100           # token-bucket capacity (requests that may go out back-to-back)
+MAX_SLEEP_SLICE = 30  # re-check shared state at least this often while waiting
+
+# Defaults used until GitHub has told us the real numbers for a resource
+RESOURCE_LIMITS = {"core": 5000, "graphql": 5000, "search": 30}
+RESOURCE_WINDOWS = {"core": 3600, "graphql": 3600, "search": 60}
+UNAUTHENTICATED_LIMITS = {"core": 60, "graphql": 0, "search": 10}
+# Per-resource reserve; search's per-minute window refills quickly, so nothing is held back.
+# Any reserve is also capped at a tenth of the token's limit, so it always stays below it.
+RESOURCE_RESERVE = {"search": 0}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS budgets (
+    token_id       TEXT NOT NULL,
+    resource       TEXT NOT NULL,
+    remaining      INTEGER NOT NULL,
+    reset_epoch    REAL NOT NULL,
+    bucket         REAL NOT NULL,
+    bucket_at      REAL NOT NULL,
+    blocked_until  REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (token_id, resource)
+);
+"""
+
+
+def load_tokens() -> List[str]:
+    """GITHUB_TOKENS (comma-separated) followed by GITHUB_TOKEN, de-duplicated."""
+    raw = (os.getenv("GITHUB_TOKENS") or "").split(",") + [os.getenv("GITHUB_TOKEN") or ""]
+    out: List[str] = []
+    for t in raw:
+        t = t.strip()
+        if t and t not in out:
+            out.append(t)
+    return out
+
+
+def token_id(token: str) -> str:
+    """Stable, non-secret identifier for a token (the token itself is never stored)."""
+    if not token:
+        return "anonymous"
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+def resource_for_url(url: str) -> Optional[str]:
+    """Which GitHub rate-limit bucket a URL draws from (None for non-API hosts)."""
+    parsed = urlparse(url)
+    if parsed.hostname != "api.github.com":
+        return None
+    if parsed.path.startswith("/graphql"):
+        return "graphql"
+    if parsed.path.startswith("/search/"):
+        return "search"
+    return "core"
+
+
+class SharedRateLimiter:
+    def __init__(self, tokens: Optional[List[str]] = None, path: str = DEFAULT_DB_PATH,
+                 reserve: int = RESERVE, burst: int = BURST):
+        self.tokens = tokens if tokens is not None else load_tokens()
+        if not self.tokens:
+            self.tokens = [""]  # unauthenticated
+        self._by_id = {token_id(t): t for t in self.tokens}
+        self.reserve = reserve
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._rr = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def auth_headers(token: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {token}"} if token else {}
+
+    def _limit(self, tid: str, resource: str) -> int:
+        """Default budget per window for this token (unauthenticated requests get far less)."""
+        limits = RESOURCE_LIMITS if self._by_id[tid] else UNAUTHENTICATED_LIMITS
+        return limits.get(resource, RESOURCE_LIMITS.get(resource, 5000))
+
+    def _reserve(self, tid: str, resource: str) -> int:
+        """Budget left untouched for this token/resource; always well below its limit."""
+        return min(RESOURCE_RESERVE.get(resource, self.reserve), self._limit(tid, resource) // 10)
+
+    def _row(self, tid: str, resource: str, now: float) -> Tuple[int, float, float, float, float]:
+        row = self._conn.execute(
+            "SELECT remaining, reset_epoch, bucket, bucket_at, blocked_until FROM budgets "
+            "WHERE token_id = ? AND resource = ?",
+            (tid, resource),
+        ).fetchone()
+        limit = self._limit(tid, resource)
+        window = RESOURCE_WINDOWS.get(resource, 3600)
+        if row is None:
+            return limit, now + window, float(self.burst), now, 0.0
+        remaining, reset_epoch, bucket, bucket_at, blocked_until = row
+        if reset_epoch <= now:
+            # Window rolled over since GitHub last reported; assume a fresh budget.
+            remaining, reset_epoch = limit, now + window
+        return remaining, reset_epoch, bucket, bucket_at, blocked_until
+
+    def acquire(self, resource: Optional[str] = "core") -> Tuple[str, float, bool]:
+        """
+        Try to reserve one request. Returns (token, seconds_to_wait, reserved).
+        When `reserved` is True a bucket slot is held for the caller, who sends
+        after sleeping `seconds_to_wait`. When every token is exhausted or
+        parked, nothing is reserved and the caller should ask again later.
+        """
+        if resource is None:
+            with self._lock:
+                self._rr = (self._rr + 1) % len(self.tokens)
+                return self.tokens[self._rr], 0.0, True
+
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")  # cross-process critical section
+            try:
+                best = None
+                for tid in self._by_id:
+                    remaining, reset_epoch, bucket, bucket_at, blocked_until = self._row(tid, resource, now)
+                    usable = remaining - self._reserve(tid, resource)
+                    if usable <= 0 or blocked_until > now:
+                        wait = max(blocked_until, reset_epoch if usable <= 0 else now) - now
+                        cand = (wait, False, tid, remaining, reset_epoch, bucket, blocked_until)
+                    else:
+                        rate = usable / max(1.0, reset_epoch - now)   # requests/second
+                        bucket = min(float(self.burst), bucket + (now - bucket_at) * rate)
+                        wait = 0.0 if bucket >= 1 else (1 - bucket) / rate
+                        cand = (wait, True, tid, remaining, reset_epoch, bucket, blocked_until)
+                    if best is None or (cand[0], -cand[3]) < (best[0], -best[3]):
+                        best = cand
+
+                wait, reserved, tid, remaining, reset_epoch, bucket, blocked_until = best
+                if reserved:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO budgets "
+                        "(token_id, resource, remaining, reset_epoch, bucket, bucket_at, blocked_until) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (tid, resource, remaining - 1, reset_epoch, bucket - 1, now, blocked_until),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._by_id[tid], max(0.0, wait), reserved
+
+    def acquire_blocking(self, resource: Optional[str] = "core") -> str:
+        """Sleep until a token may send; returns that token."""
+        while True:
+            token, wait, reserved = self.acquire(resource)
+            if reserved:
+                if wait > 0:
+                    time.sleep(wait)
+                return token
+            print(f"⏸️  Rate limiter: all tokens throttled for '{resource}', next slot in {wait:.0f}s")
+            time.sleep(min(max(wait, 1.0), MAX_SLEEP_SLICE))
+
+    async def acquire_async(self, resource: Optional[str] = "core") -> str:
+        """
+        asyncio flavour of acquire_blocking(). acquire() runs in a worker
+        thread: BEGIN IMMEDIATE may wait on another process's lock, which must
+        not stall the event loop.
+        """
+        while True:
+            token, wait, reserved = await asyncio.to_thread(self.acquire, resource)
+            if reserved:
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                return token
+            print(f"⏸️  Rate limiter: all tokens throttled for '{resource}', next slot in {wait:.0f}s")
+            await asyncio.sleep(min(max(wait, 1.0), MAX_SLEEP_SLICE))
+
+    def update_from_headers(self, token: str, headers: Mapping[str, str]) -> None:
+        """Adopt GitHub's authoritative budget for this token/resource."""
+        resource = headers.get("X-RateLimit-Resource")
+        rem = headers.get("X-RateLimit-Remaining")
+        rst = headers.get("X-RateLimit-Reset")
+        if not resource or rem is None or rst is None:
+            return
+        try:
+            remaining, reset_epoch = int(rem), float(rst)
+        except ValueError:
+            return
+        tid = token_id(token)
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                _r, _e, bucket, bucket_at, blocked_until = self._row(tid, resource, now)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO budgets "
+                    "(token_id, resource, remaining, reset_epoch, bucket, bucket_at, blocked_until) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (tid, resource, remaining, reset_epoch, bucket, bucket_at, blocked_until),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def refund(self, token: str, resource: Optional[str] = "core") -> None:
+        """Give back a bucket slot for a request GitHub did not charge (e.g. a 304)."""
+        if resource is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "UPDATE budgets SET bucket = MIN(?, bucket + 1) WHERE token_id = ? AND resource = ?",
+                (float(self.burst), token_id(token), resource),
+            )
+
+    def penalize(self, token: str, seconds: float, resource: Optional[str] = "core") -> None:
+        """Park a token after a secondary-limit / Retry-After response."""
+        if resource is None:
+            return
+        tid = token_id(token)
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                remaining, reset_epoch, bucket, bucket_at, blocked_until = self._row(tid, resource, now)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO budgets "
+                    "(token_id, resource, remaining, reset_epoch, bucket, bucket_at, blocked_until) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (tid, resource, remaining, reset_epoch, bucket, bucket_at, max(blocked_until, now + seconds)),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+# ---------- Process-wide default ----------
+_default_limiter: Optional[SharedRateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def get_limiter() -> SharedRateLimiter:
+    """Lazily open the limiter configured via GITHUB_RATELIMIT_DB / GITHUB_TOKENS."""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = SharedRateLimiter(path=os.getenv("GITHUB_RATELIMIT_DB", DEFAULT_DB_PATH))
+    return _default_limiter
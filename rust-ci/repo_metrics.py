@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+One pass per repo for every clone-based metric.
+
+19 (Rust SLOC), 29 (language SLOC), 29a (language share), 20 (commit
+frequency) and legacy 12 (test / CI detection, foundational-models-ci) each
+fetched every repo on their own. sync_repo() syncs the repo's full git
+mirror once (mirror_cache.py) and analyze_repo() derives all of them from
+it, without a checkout (the two run as pipeline.py's network and CPU stages):
+
+  - SLOC per language: the HEAD tree counted via sloc_cache.py (tree-hash
+    cache + per-subtree memo); 19's Rust SLOC is the Rust entry of the same count
+  - commit frequency: one `git log` stream over HEAD (git_history.py)
+  - tests / CI: legacy 12's analyze_repo() rules, evaluated on the HEAD tree
+    listing and the few config blobs they read
+
+write_outputs() then emits every script's CSVs with their original schemas:
+
+  data/19_rust_sloc.csv
+  data/29_{all,polyglot,monoglot}_rust_repos_{summary,by_language}.csv
+  data/29a_{all,polyglot,monoglot}_rust_repos_{summary,by_language}.csv
+  --commit-output (20's --output-file schema)
+  data/12_ci_theater_test_tool_detection_report.csv
+
+Usage:
+  python repo_metrics.py --projects-file rust_repos_monoglot --commit-output data/20_commit_freq_monoglot.csv
+"""
+import os
+import re
+import argparse
+import importlib
+from typing import Dict, List, Optional, Set
+
+from tabulate import tabulate
+from dotenv import load_dotenv
+
+from git_history import commit_frequency, read_history
+from language_mix import categorize_project, create_summary_row, extract_lang_sloc
+from mirror_cache import get_mirror_cache, run_git
+from pipeline import run_pipeline
+from sloc_cache import count_mirror_tree, get_sloc_cache, resolve_repo_sloc
+from tables import write_table
+from tree_sloc import GitObjectReader
+
+# ----------------------- Config -----------------------
+load_dotenv()
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+if not GITHUB_TOKEN:
+    print("⚠️  GITHUB_TOKEN not found in .env file. Git operations will be unauthenticated and may be rate-limited.")
+
+# legacy 12: detection keywords
+TEST_KEYWORDS = ["pytest", "unittest", "nose", "mocha", "jest", "go test", "cargo test", "ctest"]
+COVERAGE_KEYWORDS = ["coverage", "--cov", "lcov", "gcov", "codecov", "coveralls", "nyc", "pytest-cov", "tarpaulin", "cargo tarpaulin", "kcov"]
+CONFIG_FILES = [".coveragerc", ".codecov.yml", ".coveralls.yml", "coverage.xml", "lcov.info"]
+TEST_CONFIG_FILES = ["Makefile", "tox.ini", "setup.cfg", "pyproject.toml", "package.json", "Cargo.toml"]
+README_BADGE_PATTERN = re.compile(r"(codecov|coveralls|github\.com/.+/actions)")
+TEST_DIR_NAMES = {"test", "tests"}
+CI_FILES = [   # (CI system, file) checked after GitHub Actions, in legacy 12's order
+    ("Travis CI", ".travis.yml"),
+    ("CircleCI", ".circleci/config.yml"),
+    ("GitLab CI", ".gitlab-ci.yml"),
+]
+
+SLOC_FIELDS = ["name", "SLOC", "Category", "Languages"]
+SUMMARY_FIELDS = ["name", "repo", "total_sloc", "rust_sloc", "rust_share_pct", "num_langs", "top_langs", "languages_json"]
+LONG_FIELDS = ["name", "repo", "language", "sloc"]
+COMMIT_FIELDS = ["name", "Last Commit Date", "Total Commits (since inception)", "Avg_Commits_Weekday"]
+TEST_FIELDS = [
+    "Project", "Repo URL", "Has Tests", "CI Workflows Used", "CI System", "Tests in Workflow",
+    "Test Tools", "Coverage Tools", "Test Config Files", "Extra Test Tools",
+    "Coverage Config Found", "Coverage Badges",
+]
+
+
+# --------------------- Helpers ------------------------
+def _load_projects(module_name: str) -> List[Dict[str, str]]:
+    """'owner/repo' slugs or {name, repo} dicts (ci_rust_projects) -> [{name, repo}], de-duplicated."""
+    projects_module = importlib.import_module(module_name)
+    out, seen = [], set()
+    for entry in projects_module.projects:
+        slug = entry["repo"] if isinstance(entry, dict) else entry
+        s = slug.strip().strip("/")
+        if "/" not in s:
+            print(f"[warn] Skipping invalid slug: {slug}")
+            continue
+        owner, repo = (part.strip() for part in s.split("/", 1))
+        full = f"{owner}/{repo}"
+        if full.lower() in seen:
+            continue
+        seen.add(full.lower())
+        name = entry.get("name", full) if isinstance(entry, dict) else full
+        out.append({"name": name, "repo": full})
+    return out
+
+
+# ----------------- Test / CI detection (legacy 12) -----------------
+class _HeadTree:
+    """Paths and file contents of one commit, read from the bare mirror."""
+    def __init__(self, git_dir: str, reader: GitObjectReader, commit: str):
+        self.git_dir = git_dir
+        self.reader = reader
+        self.commit = commit
+        self.root = set(self.ls(""))
+
+    def ls(self, path: str) -> List[str]:
+        """Entry names directly under `path` ('' for the root); empty if it is not a directory."""
+        try:
+            out = run_git(["ls-tree", "--name-only", f"{self.commit}:{path}"], cwd=self.git_dir)
+        except Exception:
+            return []
+        return out.splitlines()
+
+    def dirs(self) -> List[str]:
+        return run_git(["ls-tree", "-r", "-d", "--name-only", self.commit], cwd=self.git_dir).splitlines()
+
+    def exists(self, path: str) -> bool:
+        if "/" not in path:
+            return path in self.root
+        parent, name = path.rsplit("/", 1)
+        return name in self.ls(parent)
+
+    def text(self, path: str) -> Optional[str]:
+        """Lower-cased file content, like open(..., errors='ignore').read().lower()."""
+        try:
+            kind, data = self.reader.read(f"{self.commit}:{path}")
+        except KeyError:
+            return None
+        return data.decode("utf-8", "ignore").lower() if kind == "blob" else None
+
+
+def _keywords_in(content: Optional[str], keywords: List[str]) -> Set[str]:
+    if content is None:
+        return set()
+    return {key for key in keywords if key.lower() in content}
+
+
+def detect_tests(git_dir: str, commit: str) -> dict:
+    """legacy 12's analyze_repo() on a commit of the mirror (no checkout)."""
+    results = {
+        "Has Tests": "No",
+        "CI Workflows Used": "No",
+        "CI System": "None",
+        "Tests in Workflow": "No",
+        "Test Tools": set(),
+        "Coverage Tools": set(),
+        "Test Config Files": set(),
+        "Extra Test Tools": set(),
+        "Coverage Config Found": "No",
+        "Coverage Badges": [],
+    }
+    with GitObjectReader(git_dir) as reader:
+        tree = _HeadTree(git_dir, reader, commit)
+
+        if any(d.rsplit("/", 1)[-1].lower() in TEST_DIR_NAMES for d in tree.dirs()):
+            results["Has Tests"] = "Yes"
+
+        if any(f in tree.root for f in CONFIG_FILES):
+            results["Coverage Config Found"] = "Yes"
+
+        for file_name in TEST_CONFIG_FILES:
+            if file_name in tree.root:
+                results["Test Config Files"].add(file_name)
+                results["Extra Test Tools"].update(_keywords_in(tree.text(file_name), TEST_KEYWORDS + COVERAGE_KEYWORDS))
+
+        def add_ci_file(path: str) -> None:
+            found = _keywords_in(tree.text(path), TEST_KEYWORDS + COVERAGE_KEYWORDS)
+            results["Test Tools"].update(found & set(TEST_KEYWORDS))
+            results["Coverage Tools"].update(found & set(COVERAGE_KEYWORDS))
+
+        ci_detected = []
+        if tree.exists(".github/workflows"):
+            ci_detected.append("GitHub Actions")
+            for wf_file in sorted(tree.ls(".github/workflows")):
+                if wf_file.endswith(".yml"):
+                    add_ci_file(f".github/workflows/{wf_file}")
+        for system, path in CI_FILES:
+            if tree.exists(path):
+                ci_detected.append(system)
+                add_ci_file(path)
+        if ci_detected:
+            results["CI Workflows Used"] = "Yes"
+            if results["Test Tools"]:
+                results["Tests in Workflow"] = "Yes"
+        results["CI System"] = " + ".join(ci_detected) if ci_detected else "None"
+
+        # README badges: the first README that can be read
+        for readme in sorted(f for f in tree.root if f.startswith("README")):
+            content = tree.text(readme)
+            if content is not None:
+                results["Coverage Badges"] = list(set(README_BADGE_PATTERN.findall(content)))
+                break
+    return results
+
+
+def _test_row(project: dict, analysis: Optional[dict]) -> dict:
+    row = {"Project": project["name"], "Repo URL": f"https://github.com/{project['repo']}"}
+    if analysis is None:
+        row.update({k: "Error" for k in TEST_FIELDS[2:]})
+        return row
+    for field in TEST_FIELDS[2:]:
+        value = analysis[field]
+        row[field] = (", ".join(value) or "None") if isinstance(value, (set, list)) else value
+    return row
+
+
+# --------------------- Processing ---------------------
+def sync_repo(project: dict) -> tuple:
+    """Network stage: the one clone / fetch for this repo, plus the SLOC cache lookup."""
+    commit, tree = get_mirror_cache().head(project["repo"])
+    cloc_data, _pending = resolve_repo_sloc(project["repo"], head={"head_oid": commit, "head_tree_oid": tree})
+    return project, commit, tree, cloc_data
+
+
+def analyze_repo(project: dict, commit: str, tree: str, cloc_data: Optional[dict] = None) -> dict:
+    """
+    CPU stage (pipeline.py worker process): every metric for one repo from
+    its synced mirror. Each part fails on its own (None / "Error" rows), like
+    in the script it replaces.
+    """
+    name, repo_full = project["name"], project["repo"]
+    out = {"project": project, "cloc": cloc_data, "commits": None, "tests": None}
+    if cloc_data is None:
+        try:
+            out["cloc"] = count_mirror_tree(repo_full, commit, tree, workers=1)
+        except Exception as e:
+            print(f"[error] {name} (SLOC): {e}")
+
+    with get_mirror_cache().using(repo_full) as git_dir:
+        try:
+            out["commits"] = commit_frequency(read_history(git_dir, rev=commit).timestamps)
+        except Exception as e:
+            print(f"[error] {name} (commits): {e}")
+        try:
+            out["tests"] = detect_tests(git_dir, commit)
+        except Exception as e:
+            print(f"[error] {name} (tests): {e}")
+    return out
+
+
+# ----------------------- Output -----------------------
+def _write_csv(path: str, rows: List[dict], fieldnames: List[str], schema: Optional[str] = None,
+               skip_empty: bool = False) -> None:
+    if skip_empty and not rows:
+        print(f"ℹ️ No data for {path}, skipping.")
+        return
+    written = write_table(rows, path, schema, fieldnames=fieldnames)
+    print(f"✅ Wrote {len(rows)} rows to {', '.join(written)}")
+
+
+def _write_cohorts(prefix: str, cohorts: Dict[str, List[dict]], long_rows: List[dict], skip_empty: bool) -> None:
+    for cohort, summary_rows in cohorts.items():
+        repos = {row["repo"] for row in summary_rows}
+        _write_csv(f"data/{prefix}_{cohort}_rust_repos_summary.csv", summary_rows, SUMMARY_FIELDS,
+                   "sloc_summary", skip_empty)
+        _write_csv(f"data/{prefix}_{cohort}_rust_repos_by_language.csv",
+                   [r for r in long_rows if r["repo"] in repos], LONG_FIELDS, "sloc_by_language", skip_empty)
+
+
+def write_outputs(results: List[dict], commit_output: str) -> None:
+    os.makedirs("data", exist_ok=True)
+
+    # --- 19: Rust SLOC (repos without Rust dropped) ---
+    sloc_rows = []
+    for r in results:
+        rust = (r["cloc"] or {}).get("Rust", {})
+        sloc = int(rust.get("code", 0)) if isinstance(rust, dict) else 0
+        if sloc:
+            sloc_rows.append({"name": r["project"]["name"], "SLOC": sloc,
+                              "Category": categorize_project(sloc), "Languages": f"Rust ({sloc})"})
+    sloc_rows.sort(key=lambda row: -row["SLOC"])
+    _write_csv("data/19_rust_sloc.csv", sloc_rows, SLOC_FIELDS, "rust_sloc")
+
+    # --- 29 / 29a: language mix of repos with Rust ---
+    summary_rows, long_rows = [], []
+    for r in results:
+        lang_sloc = extract_lang_sloc(r["cloc"] or {})
+        if lang_sloc.get("Rust", 0) <= 0:
+            continue
+        name, repo_full = r["project"]["name"], r["project"]["repo"]
+        summary_rows.append(create_summary_row(name, repo_full, lang_sloc))
+        long_rows.extend({"name": name, "repo": repo_full, "language": lang, "sloc": sloc}
+                         for lang, sloc in lang_sloc.items())
+    if summary_rows:
+        _write_cohorts("29", {
+            "all": summary_rows,
+            "polyglot": [row for row in summary_rows if row["num_langs"] >= 2],
+            "monoglot": [row for row in summary_rows if row["num_langs"] == 1],
+        }, long_rows, skip_empty=False)
+        _write_cohorts("29a", {
+            "all": summary_rows,
+            "polyglot": [row for row in summary_rows if 50.0 <= row["rust_share_pct"] < 100.0],
+            "monoglot": [row for row in summary_rows if row["rust_share_pct"] == 100.0],
+        }, long_rows, skip_empty=True)
+    else:
+        print("No repositories with Rust detected.")
+
+    # --- 20: commit frequency (errors at bottom) ---
+    commit_rows = []
+    for r in results:
+        total, avg, last = r["commits"] if r["commits"] else ("Error", "Error", "Error")
+        commit_rows.append({"name": r["project"]["name"], "Last Commit Date": last,
+                            "Total Commits (since inception)": total, "Avg_Commits_Weekday": avg})
+    commit_rows.sort(key=lambda row: (1, "") if row["Last Commit Date"] in ("Error", "Unknown")
+                     else (0, row["Last Commit Date"]), reverse=True)
+    _write_csv(commit_output, commit_rows, COMMIT_FIELDS, "commit_freq")
+
+    # --- legacy 12: test / CI detection ---
+    _write_csv("data/12_ci_theater_test_tool_detection_report.csv",
+               [_test_row(r["project"], r["tests"]) for r in results], TEST_FIELDS)
+
+    print(tabulate(sloc_rows[:25], headers="keys", tablefmt="grid"))
+
+
+# ---------------------- Main flow ---------------------
+def main():
+    parser = argparse.ArgumentParser(description="Compute SLOC, language share, commit frequency and test detection from one clone per repo.")
+    parser.add_argument(
+        "--projects-file",
+        required=True,
+        help="The Python module name (without .py) containing the 'projects' list (slugs or {name, repo} dicts).",
+    )
+    parser.add_argument(
+        "--commit-output",
+        default="data/20_commit_freq.csv",
+        help="Path of the commit frequency CSV (20's --output-file).",
+    )
+    args = parser.parse_args()
+
+    projects = _load_projects(args.projects_file)
+    print(f"🔍 Analyzing {len(projects)} repositories (one mirror sync each)...")
+    results = []
+    # Mirror syncs on threads, counting / history / tree scans on a process pool sized to the cores
+    for done, (project, out, error) in enumerate(run_pipeline(projects, sync_repo, analyze_repo), 1):
+        if error is not None:
+            print(f"[error] {project['name']}: {error}")
+            out = {"project": project, "cloc": None, "commits": None, "tests": None}
+        results.append(out)
+        if done % 10 == 0 or done == len(projects):
+            print(f"  Progress: {done}/{len(projects)} repositories processed.")
+    results.sort(key=lambda r: r["project"]["repo"].lower())
+
+    write_outputs(results, args.commit_output)
+    print(f"🗃️  SLOC cache: {get_sloc_cache().summary()}")
+    print(f"🪞 Git mirrors: {get_mirror_cache().summary()}")
+
+
+if __name__ == "__main__":
+    main()
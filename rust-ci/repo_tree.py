@@ -0,0 +1,252 @@
+"""
+Recursive git tree listings, fetched once per SHA and queried in memory.
+
+The static heuristics probed `contents/<path>` for the same repos over and
+over: one HTTP round trip per candidate path, often once per branch guess
+(`main`, then `master`), and downloaded files one request at a time. The
+foundational-models-ci scripts import this module too (they put rust-ci on
+sys.path), so both trees share one implementation. RepoTrees fetches
+
+  GET /repos/{owner}/{repo}/git/trees/{sha}?recursive=1
+
+once per tree (or commit) SHA and keeps it in SQLite. A SHA names immutable
+content, so entries never go stale. Path probes are answered from a trie
+(PathIndex): exists / is_dir / children / files walk a few dict levels
+instead of making requests. File contents are fetched by blob SHA
+(`git/blobs/{sha}`) and cached the same way, so an unchanged config file is
+downloaded once.
+
+The SHA comes from the caller (e.g. GraphQL head_tree_oid) or from one
+`GET /repos/{owner}/{repo}/commits/HEAD` with the `sha` media type, which
+resolves the default branch without guessing its name.
+
+GitHub cuts recursive listings short for very large trees (`truncated`).
+read_contents / list_contents ask the contents API for a single path, so
+callers can confirm a miss in a truncated index before reporting it.
+
+Env:
+  REPO_TREE_DB=<path to sqlite file>   (default: data/.cache/repo_trees.sqlite)
+
+Usage:
+  trees = get_repo_trees()
+  index = trees.tree("owner", "repo", sha=head_tree_oid)   # sha optional
+  index.is_dir("tests"), index.children(".github/workflows")
+  text = trees.read_text("owner", "repo", index, "Cargo.toml")
+"""
+
+import os
+import json
+import zlib
+import base64
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+API = "https://api.github.com/repos/{owner}/{repo}"
+DEFAULT_CACHE_PATH = os.path.join("data", ".cache", "repo_trees.sqlite")
+SHA_MEDIA_TYPE = "application/vnd.github.sha"
+RAW_MEDIA_TYPE = "application/vnd.github.raw"
+MAX_INDEXES = 32   # tries kept in memory (most recently used); older ones are reloaded from SQLite
+_ENTRY = "\x00"   # trie key holding a node's own (type, sha, size); never a path component
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trees (
+    sha        TEXT PRIMARY KEY,     -- tree or commit sha the listing was fetched for
+    truncated  INTEGER NOT NULL,
+    entries    BLOB NOT NULL         -- zlib(json [[path, type, sha, size], ...])
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha        TEXT PRIMARY KEY,
+    content    BLOB NOT NULL
+);
+"""
+
+Entry = Tuple[str, str, Optional[int]]   # (type, sha, size)
+
+
+class PathIndex:
+    """Trie over a repo's paths. `truncated` is True if GitHub cut the listing short."""
+    def __init__(self, entries: List[list], truncated: bool = False):
+        self.root: Dict = {_ENTRY: ("tree", None, None)}
+        self.truncated = truncated
+        for path, kind, sha, size in entries:
+            node = self.root
+            for part in path.split("/"):
+                node = node.setdefault(part, {})
+            node[_ENTRY] = (kind, sha, size)
+
+    def _node(self, path: str) -> Optional[Dict]:
+        node = self.root
+        for part in path.strip("/").split("/") if path.strip("/") else []:
+            node = node.get(part)
+            if node is None:
+                return None
+        return node
+
+    def entry(self, path: str) -> Optional[Entry]:
+        node = self._node(path)
+        return node.get(_ENTRY) if node is not None else None
+
+    def exists(self, path: str) -> bool:
+        return self._node(path) is not None
+
+    def is_dir(self, path: str) -> bool:
+        e = self.entry(path)
+        return e is not None and e[0] == "tree"
+
+    def is_file(self, path: str) -> bool:
+        e = self.entry(path)
+        return e is not None and e[0] == "blob"
+
+    def children(self, path: str = "") -> List[str]:
+        """Names directly under a directory ('' = root); empty if it does not exist."""
+        node = self._node(path)
+        return [k for k in node if k != _ENTRY] if node is not None else []
+
+    def files(self, prefix: str = "") -> Iterator[str]:
+        """Paths of all blobs under `prefix` (a directory, '' = whole repo), in listing order."""
+        node = self._node(prefix)
+        if node is None:
+            return
+        base = prefix.strip("/")
+        stack = [(base, node)]
+        while stack:
+            path, node = stack.pop()
+            kids = [(f"{path}/{k}" if path else k, child) for k, child in node.items() if k != _ENTRY]
+            for child_path, child in reversed(kids):
+                stack.append((child_path, child))
+            e = node.get(_ENTRY)
+            if e is not None and e[0] == "blob":
+                yield path
+
+
+def _default_get(url: str, **kwargs) -> requests.Response:
+    headers = {"Accept": "application/vnd.github+json"}
+    token = os.getenv("GITHUB_TOKEN")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    headers.update(kwargs.pop("headers", None) or {})
+    return requests.get(url, headers=headers, timeout=30, **kwargs)
+
+
+class RepoTrees:
+    """Thread-safe; `get(url, headers=...)` performs the REST calls (e.g. a rate-limited session)."""
+    def __init__(self, path: Optional[str] = None, get: Optional[Callable[..., requests.Response]] = None):
+        self.path = path or os.getenv("REPO_TREE_DB", DEFAULT_CACHE_PATH)
+        self.get = get or _default_get
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._indexes: "OrderedDict[str, PathIndex]" = OrderedDict()
+        self._heads: Dict[str, Optional[str]] = {}   # 'owner/repo' -> HEAD sha, resolved once per process
+        self.fetched = 0
+        self.cached = 0
+
+    def head_sha(self, owner: str, repo: str) -> Optional[str]:
+        """Commit SHA of the default branch (one small request per run), None if the repo is gone."""
+        key = f"{owner}/{repo}".lower()
+        if key in self._heads:
+            return self._heads[key]
+        resp = self.get(f"{API.format(owner=owner, repo=repo)}/commits/HEAD", headers={"Accept": SHA_MEDIA_TYPE})
+        if resp.status_code in (404, 409, 451):   # missing, empty, blocked
+            sha = None
+        else:
+            resp.raise_for_status()
+            sha = resp.text.strip() or None
+        self._heads[key] = sha
+        return sha
+
+    def tree(self, owner: str, repo: str, sha: Optional[str] = None) -> PathIndex:
+        """Index of the tree at `sha` (default: the default branch's HEAD); empty if there is none."""
+        sha = sha or self.head_sha(owner, repo)
+        if not sha:
+            return PathIndex([])
+        with self._lock:
+            index = self._indexes.get(sha)
+            row = None if index else self._conn.execute(
+                "SELECT truncated, entries FROM trees WHERE sha = ?", (sha,)).fetchone()
+        if index is None and row is not None:
+            index = PathIndex(json.loads(zlib.decompress(row[1])), bool(row[0]))
+        if index is not None:
+            self.cached += 1
+        else:
+            resp = self.get(f"{API.format(owner=owner, repo=repo)}/git/trees/{sha}?recursive=1")
+            if resp.status_code in (404, 409):
+                return PathIndex([])
+            resp.raise_for_status()
+            data = resp.json() or {}
+            entries = [[e["path"], e["type"], e.get("sha"), e.get("size")] for e in data.get("tree", [])]
+            truncated = bool(data.get("truncated"))
+            if truncated:
+                print(f"  [warn] {owner}/{repo}: tree listing truncated by GitHub ({len(entries)} entries)")
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO trees (sha, truncated, entries) VALUES (?, ?, ?)",
+                    (sha, int(truncated), zlib.compress(json.dumps(entries).encode())),
+                )
+                self._conn.commit()
+            index = PathIndex(entries, truncated)
+            self.fetched += 1
+        with self._lock:
+            self._indexes[sha] = index
+            self._indexes.move_to_end(sha)
+            while len(self._indexes) > MAX_INDEXES:
+                self._indexes.popitem(last=False)
+        return index
+
+    def read(self, owner: str, repo: str, index: PathIndex, path: str) -> Optional[bytes]:
+        """Content of a file in the index, fetched by blob SHA once and cached; None if absent."""
+        e = index.entry(path)
+        if e is None or e[0] != "blob" or not e[1]:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM blobs WHERE sha = ?", (e[1],)).fetchone()
+        if row is not None:
+            return row[0]
+        resp = self.get(f"{API.format(owner=owner, repo=repo)}/git/blobs/{e[1]}")
+        if resp.status_code != 200:
+            return None
+        content = base64.b64decode((resp.json() or {}).get("content") or "")
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO blobs (sha, content) VALUES (?, ?)", (e[1], content))
+            self._conn.commit()
+        return content
+
+    def read_text(self, owner: str, repo: str, index: PathIndex, path: str) -> str:
+        data = self.read(owner, repo, index, path)
+        return data.decode("utf-8", errors="ignore") if data else ""
+
+    def read_contents(self, owner: str, repo: str, path: str) -> Optional[bytes]:
+        """Content of `path` on the default branch via the contents API (not cached); None if absent."""
+        resp = self.get(f"{API.format(owner=owner, repo=repo)}/contents/{path}", headers={"Accept": RAW_MEDIA_TYPE})
+        return resp.content if resp.status_code == 200 else None
+
+    def list_contents(self, owner: str, repo: str, path: str) -> List[str]:
+        """Paths of the files directly under directory `path` via the contents API; empty if absent."""
+        resp = self.get(f"{API.format(owner=owner, repo=repo)}/contents/{path}")
+        if resp.status_code != 200:
+            return []
+        items = resp.json()
+        return [i["path"] for i in items if i.get("type") == "file"] if isinstance(items, list) else []
+
+    def summary(self) -> str:
+        return f"{self.fetched} trees fetched, {self.cached} served from cache"
+
+
+# ---------- Process-wide default ----------
+_default_trees: Optional[RepoTrees] = None
+_default_lock = threading.Lock()
+
+
+def get_repo_trees(get: Optional[Callable[..., requests.Response]] = None) -> RepoTrees:
+    """Lazily open the cache configured via REPO_TREE_DB; `get` is used when it is first created."""
+    global _default_trees
+    with _default_lock:
+        if _default_trees is None:
+            _default_trees = RepoTrees(get=get)
+    return _default_trees
@@ -0,0 +1,140 @@
+"""
+Write-ahead result journal for long collection runs.
+
+Every finished repo is committed to a small SQLite file as soon as it is
+processed, keyed by (script, parameters, repo slug). A collector that is
+killed at repo 1,400 of 1,700 can simply be restarted: repos already in the
+journal are replayed from disk and only the remaining tail (plus repos that
+failed last time) are fetched again. Changing a parameter that affects the
+rows (e.g. `RUNS_PER_REPO`) changes the run key, so rows from another
+configuration are never mixed in. Once every repo is written without a
+failure, finish() drops the run's entries: only an interrupted (or partly
+failed) run resumes, and the next full run collects fresh data.
+
+Env:
+  RUN_JOURNAL_DB=<path to sqlite file>   (default: data/.cache/run_journal.sqlite)
+
+Usage:
+  journal = RunJournal("28_ci_theater_broken_builds_rust_new", {"max_runs": 100})
+  done = journal.completed()            # {slug: row}
+  ...
+  journal.record(slug, row)             # or journal.record_failure(slug, err)
+  ...                                   # write the output file
+  journal.finish()                      # forget the run if nothing failed
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Mapping
+
+DEFAULT_JOURNAL_PATH = os.path.join("data", ".cache", "run_journal.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    run_key     TEXT NOT NULL,
+    script      TEXT NOT NULL,
+    slug        TEXT NOT NULL,
+    status      TEXT NOT NULL,          -- 'ok' | 'error'
+    row_json    TEXT,
+    error       TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 1,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (run_key, slug)
+);
+"""
+
+
+def run_key(script: str, params: Mapping[str, Any]) -> str:
+    """Stable identifier for a script + parameter combination."""
+    blob = json.dumps({"script": script, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+class RunJournal:
+    """
+    Thread-safe; WAL mode so a second collector process can share the file.
+    Slugs are matched case-insensitively.
+    """
+    def __init__(self, script: str, params: Mapping[str, Any], path: str = None):
+        self.script = script
+        self.params = dict(params)
+        self.key = run_key(script, self.params)
+        self.path = path or os.getenv("RUN_JOURNAL_DB", DEFAULT_JOURNAL_PATH)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def completed(self) -> Dict[str, Dict[str, Any]]:
+        """Rows of repos that finished successfully under this run key."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT slug, row_json FROM entries WHERE run_key = ? AND status = 'ok'",
+                (self.key,),
+            ).fetchall()
+        return {slug: json.loads(row_json) for slug, row_json in rows}
+
+    def failures(self) -> Dict[str, str]:
+        """Last error message for repos that will be retried."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT slug, error FROM entries WHERE run_key = ? AND status = 'error'",
+                (self.key,),
+            ).fetchall()
+        return dict(rows)
+
+    def _write(self, slug: str, status: str, row_json, error) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO entries (run_key, script, slug, status, row_json, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(run_key, slug) DO UPDATE SET "
+                "status = excluded.status, row_json = excluded.row_json, error = excluded.error, "
+                "attempts = attempts + 1, updated_at = excluded.updated_at",
+                (self.key, self.script, slug.lower(), status, row_json, error, time.time()),
+            )
+            self._conn.commit()
+
+    def record(self, slug: str, row: Mapping[str, Any]) -> None:
+        """Persist a finished repo's output row."""
+        self._write(slug, "ok", json.dumps(row, default=str), None)
+
+    def record_failure(self, slug: str, error: Any) -> None:
+        """Remember a failed repo so the next run retries it."""
+        self._write(slug, "error", None, str(error)[:500])
+
+    def reset(self) -> None:
+        """Forget everything recorded under this run key (used by --fresh)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE run_key = ?", (self.key,))
+            self._conn.commit()
+
+    def finish(self) -> bool:
+        """
+        Close the run once its output is written: drop its entries unless some
+        repo failed (those keep the journal so a rerun retries just them).
+        Returns True when the run was closed.
+        """
+        with self._lock:
+            failed = self._conn.execute(
+                "SELECT 1 FROM entries WHERE run_key = ? AND status = 'error' LIMIT 1", (self.key,),
+            ).fetchone()
+            if failed:
+                return False
+            self._conn.execute("DELETE FROM entries WHERE run_key = ?", (self.key,))
+            self._conn.commit()
+        return True
+
+    def summary(self) -> str:
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM entries WHERE run_key = ? GROUP BY status",
+                (self.key,),
+            ).fetchall())
+        return f"{counts.get('ok', 0)} completed / {counts.get('error', 0)} failed (run key {self.key})"
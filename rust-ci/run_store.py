@@ -0,0 +1,307 @@
+"""
+Local store of GitHub Actions workflow runs with incremental refresh.
+
+Every collector that looks at `/actions/runs` (22, 23, 24_1, 28) reads runs
+through this store instead of paging the endpoint from page 1 on each run.
+Per repo we keep a contiguous slice of history, newest first:
+
+  - head refresh: only runs with `created>=<watermark>` are requested, where
+    the watermark is the newest stored `created_at` (or the oldest run that
+    was still queued / in progress a few days ago, so its final conclusion is
+    picked up). A daily refresh is typically one page. Filtered listings stop
+    at 1,000 runs, so after a long gap the refresh re-queries
+    `created=<watermark>..<oldest fetched>` until it reaches the watermark.
+  - stale runs: a run that was still unfinished when it dropped out of that
+    window is re-fetched by id (`actions/runs/<id>`) on later refreshes until
+    it completes, so no run keeps a stale status and a NULL conclusion.
+    Deleted runs (404) are removed.
+  - lazy backfill: when a caller reads past the oldest stored run, older
+    pages are fetched with `created<=<oldest stored>` and appended, until
+    GitHub has nothing older (the repo is then marked exhausted).
+
+Runs are stored as the raw REST payload, so callers see the same dicts as
+before.
+
+Env:
+  RUN_STORE_DB=<path to sqlite file>   (default: data/.cache/run_store.sqlite)
+
+Usage:
+  async with AsyncGitHubClient() as gh:
+      async for run in get_run_store().iter_runs(gh, owner, name, since=cutoff):
+          ...
+  runs = collect_runs_blocking(owner, name, limit=30)   # from thread-based scripts
+"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from github_client import AsyncGitHubClient, GH_REST
+
+DEFAULT_STORE_PATH = os.path.join("data", ".cache", "run_store.sqlite")
+PENDING_LOOKBACK_DAYS = 3   # re-fetch unfinished runs created within this window
+LISTING_CAP = 1000          # GitHub returns at most this many runs per filtered listing
+STALE_BATCH = 100           # unfinished runs past the lookback window re-fetched by id per refresh
+ISO_FMT = "%Y-%m-%dT%H:%M:%SZ"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    repo        TEXT NOT NULL,
+    run_id      INTEGER NOT NULL,
+    created_at  TEXT NOT NULL,
+    status      TEXT,
+    conclusion  TEXT,
+    run_json    TEXT NOT NULL,
+    PRIMARY KEY (repo, run_id)
+);
+CREATE INDEX IF NOT EXISTS runs_by_created ON runs (repo, created_at);
+CREATE TABLE IF NOT EXISTS repos (
+    repo        TEXT PRIMARY KEY,
+    exhausted   INTEGER NOT NULL DEFAULT 0,   -- full history is stored
+    synced_at   REAL NOT NULL
+);
+"""
+
+
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    if dt is None:
+        return None
+    return dt.astimezone(timezone.utc).strftime(ISO_FMT)
+
+
+class RunStore:
+    """Thread-safe; WAL mode so several collector processes can share the file."""
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("RUN_STORE_DB", DEFAULT_STORE_PATH)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.up_to_date = 0      # refreshes that found nothing new beyond the watermark
+        self.runs_fetched = 0    # runs downloaded from GitHub
+
+    # ---------- storage ----------
+    def _upsert(self, repo: str, runs: List[Dict[str, Any]]) -> int:
+        """Insert or update runs; returns how many were not stored before."""
+        if not runs:
+            return 0
+        ids = {int(r["id"]) for r in runs}
+        with self._lock:
+            known = {
+                r[0] for r in self._conn.execute(
+                    f"SELECT run_id FROM runs WHERE repo = ? AND run_id IN ({','.join('?' * len(ids))})",
+                    (repo, *ids),
+                )
+            }
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO runs (repo, run_id, created_at, status, conclusion, run_json) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (repo, int(r["id"]), r.get("created_at") or "", r.get("status"), r.get("conclusion"), json.dumps(r))
+                    for r in runs
+                ],
+            )
+            self._conn.execute(
+                "INSERT INTO repos (repo, synced_at) VALUES (?, ?) "
+                "ON CONFLICT(repo) DO UPDATE SET synced_at = excluded.synced_at",
+                (repo, time.time()),
+            )
+            self._conn.commit()
+        return len(ids - known)
+
+    def _mark_exhausted(self, repo: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO repos (repo, exhausted, synced_at) VALUES (?, 1, ?) "
+                "ON CONFLICT(repo) DO UPDATE SET exhausted = 1, synced_at = excluded.synced_at",
+                (repo, time.time()),
+            )
+            self._conn.commit()
+
+    def _delete(self, repo: str, run_ids: List[int]) -> None:
+        if not run_ids:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM runs WHERE repo = ? AND run_id = ?", [(repo, i) for i in run_ids])
+            self._conn.commit()
+
+    def _exhausted(self, repo: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT exhausted FROM repos WHERE repo = ?", (repo,)).fetchone()
+        return bool(row and row[0])
+
+    def _oldest(self, repo: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(created_at) FROM runs WHERE repo = ?", (repo,)).fetchone()
+        return row[0] if row else None
+
+    def watermark(self, repo: str) -> Optional[str]:
+        """created_at from which a head refresh must re-request runs."""
+        recent = _iso(datetime.now(timezone.utc) - timedelta(days=PENDING_LOOKBACK_DAYS))
+        with self._lock:
+            pending = self._conn.execute(
+                "SELECT MIN(created_at) FROM runs WHERE repo = ? AND status != 'completed' AND created_at >= ?",
+                (repo, recent),
+            ).fetchone()[0]
+            newest = self._conn.execute(
+                "SELECT MAX(created_at) FROM runs WHERE repo = ?", (repo,)
+            ).fetchone()[0]
+        return pending or newest
+
+    def stale_pending(self, repo: str) -> List[int]:
+        """Ids of runs that were still unfinished when they left the lookback window (oldest first)."""
+        recent = _iso(datetime.now(timezone.utc) - timedelta(days=PENDING_LOOKBACK_DAYS))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id FROM runs WHERE repo = ? AND status != 'completed' AND created_at < ? "
+                "ORDER BY created_at LIMIT ?",
+                (repo, recent, STALE_BATCH),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def stored_runs(self, repo: str, since: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Stored runs for a repo, newest first (optionally only created >= since, at most `limit`)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_json FROM runs WHERE repo = ? AND created_at >= ? "
+                "ORDER BY created_at DESC, run_id DESC LIMIT ?",
+                (repo, since or "", -1 if limit is None else limit),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    # ---------- sync ----------
+    async def refresh(self, gh: AsyncGitHubClient, owner: str, name: str) -> None:
+        """Fetch runs created at/after the watermark (no-op for repos never synced)."""
+        repo = f"{owner}/{name}".lower()
+        mark = self.watermark(repo)
+        if mark is None:
+            return
+        url = f"{GH_REST}/repos/{owner}/{name}/actions/runs"
+        # Collect before writing so a failed refresh never leaves a gap below the new watermark
+        fresh: Dict[int, Dict[str, Any]] = {}
+        created = f">={mark}"
+        while True:
+            batch = [run async for run in gh.paginate(url, params={"created": created}, item_key="workflow_runs")]
+            self.runs_fetched += len(batch)
+            new = [run for run in batch if int(run["id"]) not in fresh]
+            fresh.update((int(run["id"]), run) for run in new)
+            if len(batch) < LISTING_CAP or not new:
+                break
+            # Capped listing: page down from the oldest run fetched until the watermark is reached
+            oldest = min(run.get("created_at") or "" for run in batch)
+            if oldest <= mark:
+                break
+            created = f"{mark}..{oldest}"
+        if not self._upsert(repo, list(fresh.values())):
+            self.up_to_date += 1
+        await self._refresh_stale(gh, owner, name)
+
+    async def _refresh_stale(self, gh: AsyncGitHubClient, owner: str, name: str) -> None:
+        """Re-fetch, by id, unfinished runs the head refresh no longer covers."""
+        repo = f"{owner}/{name}".lower()
+        ids = self.stale_pending(repo)
+        if not ids:
+            return
+        url = f"{GH_REST}/repos/{owner}/{name}/actions/runs"
+        runs = await asyncio.gather(*(gh.get_json(f"{url}/{run_id}", allow_404=True) for run_id in ids))
+        self.runs_fetched += len(ids)
+        self._upsert(repo, [run for run in runs if run])
+        self._delete(repo, [run_id for run_id, run in zip(ids, runs) if not run])
+
+    async def iter_runs(
+        self,
+        gh: AsyncGitHubClient,
+        owner: str,
+        name: str,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield runs newest first (optionally only those created >= since, at
+        most `limit`). The head is refreshed first; older history is
+        backfilled on demand, so breaking out of the loop early also stops
+        the API calls.
+        """
+        repo = f"{owner}/{name}".lower()
+        since_iso = _iso(since)
+        await self.refresh(gh, owner, name)
+        stored = self.stored_runs(repo, since_iso, limit)
+        for run in stored:
+            yield run
+        if limit is not None and len(stored) >= limit:
+            return
+
+        url = f"{GH_REST}/repos/{owner}/{name}/actions/runs"
+        while not self._exhausted(repo):
+            oldest = self._oldest(repo)
+            if since_iso and oldest and oldest < since_iso:
+                return
+            params = {"created": f"<={oldest}"} if oldest else {}
+            # Filtered listings are capped at 1,000 results, so re-query from
+            # the new oldest run until GitHub has nothing older to give.
+            new = 0
+            async for run in gh.paginate(url, params=params, item_key="workflow_runs"):
+                self.runs_fetched += 1
+                if not self._upsert(repo, [run]):
+                    continue
+                new += 1
+                if since_iso and (run.get("created_at") or "") < since_iso:
+                    return
+                yield run
+            if new == 0:
+                self._mark_exhausted(repo)
+
+    def summary(self) -> str:
+        return f"{self.runs_fetched} runs fetched, {self.up_to_date} repos already up to date"
+
+
+# ---------- Process-wide default ----------
+_default_store: Optional[RunStore] = None
+_default_lock = threading.Lock()
+
+
+def get_run_store() -> RunStore:
+    """Lazily open the store configured via RUN_STORE_DB."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = RunStore()
+    return _default_store
+
+
+async def collect_runs(
+    gh: AsyncGitHubClient,
+    owner: str,
+    name: str,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Newest-first list of up to `limit` runs created >= since."""
+    out: List[Dict[str, Any]] = []
+    if limit is not None and limit <= 0:
+        return out
+    async for run in get_run_store().iter_runs(gh, owner, name, since=since, limit=limit):
+        out.append(run)
+        if limit is not None and len(out) >= limit:
+            break
+    return out
+
+
+def collect_runs_blocking(
+    owner: str,
+    name: str,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """collect_runs() for thread-based scripts (one short-lived client per call)."""
+    async def _run():
+        async with AsyncGitHubClient(concurrency=4) as gh:
+            return await collect_runs(gh, owner, name, since=since, limit=limit)
+    return asyncio.run(_run())
@@ -0,0 +1,245 @@
+"""
+SLOC results cached by git tree hash.
+
+19, 29, 29a and 29_polyglot count the default branch of every repo on every
+run, even when nothing changed. A tree OID names the exact content of a
+checkout, so counts are stored under
+
+  (repo, HEAD tree oid, sloc_counter.COUNTER_VERSION, scope)
+
+where scope is the set of languages counted ("*" for all, "Rust" for 19).
+Before any clone or fetch the current HEAD is looked up cheaply:
+
+  - fetch_remote_heads(): one batched GraphQL pass (github_graphql.py)
+    returning defaultBranchRef.target.tree.oid for many repos per query;
+  - otherwise `git ls-remote` per repo (commit oid, matched against the
+    commit last seen for a cached tree).
+
+An unchanged repo therefore costs one metadata lookup; only cache misses go
+to the mirror (mirror_cache.py). There the tree is counted from git objects
+by tree_sloc.py, which memoizes every subtree by its tree OID in the same
+file (`subtrees` table), so a changed repo only re-reads the directories that
+changed. Bumping COUNTER_VERSION invalidates every entry.
+
+Env:
+  SLOC_CACHE_DB=<path to sqlite file>   (default: data/.cache/sloc_cache.sqlite)
+
+Usage:
+  heads = fetch_remote_heads([p["repo"] for p in projects])
+  cloc_data = count_repo_sloc("owner/repo", head=heads.get("owner/repo"))
+  for slug, cloc_data, error in iter_repo_sloc(slugs, heads=heads): ...
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from github_graphql import GraphQLBatcher
+from mirror_cache import get_mirror_cache, ls_remote_head
+from pipeline import Done, run_pipeline
+from sloc_counter import COUNTER_VERSION
+from tree_sloc import count_tree
+
+DEFAULT_CACHE_PATH = os.path.join("data", ".cache", "sloc_cache.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sloc (
+    repo            TEXT NOT NULL,
+    tree_oid        TEXT NOT NULL,
+    counter_version TEXT NOT NULL,
+    scope           TEXT NOT NULL,
+    commit_oid      TEXT,              -- last commit seen with this tree
+    cloc_json       TEXT NOT NULL,
+    counted_at      REAL NOT NULL,
+    PRIMARY KEY (repo, tree_oid, counter_version, scope)
+);
+CREATE INDEX IF NOT EXISTS sloc_by_commit ON sloc (repo, commit_oid);
+CREATE TABLE IF NOT EXISTS subtrees (
+    tree_oid        TEXT NOT NULL,
+    counter_version TEXT NOT NULL,
+    entries         BLOB NOT NULL,     -- tree_sloc.ENTRY_DTYPE records
+    PRIMARY KEY (tree_oid, counter_version)
+);
+"""
+
+
+def sloc_scope(include_langs: Optional[Iterable[str]]) -> str:
+    return ",".join(sorted(include_langs)) if include_langs else "*"
+
+
+class SlocCache:
+    """Thread-safe; WAL mode so several collector processes can share the file."""
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("SLOC_CACHE_DB", DEFAULT_CACHE_PATH)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, repo: str, scope: str, *, tree_oid: Optional[str] = None,
+            commit_oid: Optional[str] = None) -> Optional[dict]:
+        """Cached cloc-shaped counts for a tree (or for the tree last seen at a commit)."""
+        if tree_oid:
+            where, key = "tree_oid = ?", tree_oid
+        elif commit_oid:
+            where, key = "commit_oid = ?", commit_oid
+        else:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT cloc_json FROM sloc WHERE repo = ? AND counter_version = ? AND scope = ? AND {where}",
+                (repo.lower(), COUNTER_VERSION, scope, key),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, repo: str, scope: str, tree_oid: str, commit_oid: Optional[str], cloc_data: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sloc (repo, tree_oid, counter_version, scope, commit_oid, cloc_json, counted_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (repo.lower(), tree_oid, COUNTER_VERSION, scope, commit_oid, json.dumps(cloc_data), time.time()),
+            )
+            self._conn.commit()
+
+    def note_commit(self, repo: str, scope: str, tree_oid: str, commit_oid: str) -> None:
+        """Remember that `commit_oid` has this (already counted) tree, for ls-remote lookups."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sloc SET commit_oid = ? WHERE repo = ? AND tree_oid = ? AND counter_version = ? AND scope = ?",
+                (commit_oid, repo.lower(), tree_oid, COUNTER_VERSION, scope),
+            )
+            self._conn.commit()
+
+    # ---------- per-subtree memo (tree_sloc.py) ----------
+    def get_subtree(self, tree_oid: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT entries FROM subtrees WHERE tree_oid = ? AND counter_version = ?",
+                (tree_oid, COUNTER_VERSION),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_subtrees(self, entries: Dict[str, bytes]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO subtrees (tree_oid, counter_version, entries) VALUES (?, ?, ?)",
+                [(oid, COUNTER_VERSION, blob) for oid, blob in entries.items()],
+            )
+            self._conn.commit()
+
+    def summary(self) -> str:
+        return f"{self.hits} repos unchanged (cache hits), {self.misses} counted"
+
+
+# ---------- Process-wide default ----------
+_default_cache: Optional[SlocCache] = None
+_default_lock = threading.Lock()
+
+
+def get_sloc_cache() -> SlocCache:
+    """Lazily open the cache configured via SLOC_CACHE_DB."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SlocCache()
+    return _default_cache
+
+
+def fetch_remote_heads(slugs: List[str]) -> Dict[str, Dict]:
+    """
+    {'owner/repo': {'head_oid', 'head_tree_oid'}} for the default branch of
+    every repo, via batched GraphQL. Empty if GraphQL is unavailable (e.g. no
+    token); count_repo_sloc() then falls back to `git ls-remote`.
+    """
+    projects = []
+    for slug in slugs:
+        owner, name = slug.strip().strip("/").split("/", 1)
+        projects.append({"owner": owner, "name": name})
+    batcher = GraphQLBatcher()
+    try:
+        facts = batcher.repo_facts(projects)
+    except Exception as e:
+        print(f"⚠️ GraphQL HEAD lookup failed, falling back to git ls-remote: {e}")
+        return {}
+    print(f"🧬 GraphQL HEAD lookup: {batcher.summary()}")
+    return {slug: facts[slug] for slug in slugs if facts.get(slug, {}).get("exists")}
+
+
+def resolve_repo_sloc(repo_full: str, include_langs: Optional[Iterable[str]] = None,
+                      head: Optional[Dict] = None) -> Tuple[Optional[dict], Optional[Tuple[str, str]]]:
+    """
+    Network half of count_repo_sloc(): (cached counts, None) when the HEAD
+    tree is unchanged, else (None, (commit oid, tree oid)) with the mirror
+    synced, ready for count_mirror_tree().
+    """
+    cache = get_sloc_cache()
+    scope = sloc_scope(include_langs)
+    head = head or {}
+
+    remote_commit = head.get("head_oid")
+    if head.get("head_tree_oid"):
+        hit = cache.get(repo_full, scope, tree_oid=head["head_tree_oid"])
+    else:
+        remote_commit = remote_commit or ls_remote_head(repo_full)
+        hit = cache.get(repo_full, scope, commit_oid=remote_commit)
+    if hit is not None:
+        print(f"[cache] {repo_full}")
+        cache.hits += 1
+        return hit, None
+
+    print(f"[mirror] {repo_full}")
+    commit_oid, tree_oid = get_mirror_cache().head(repo_full, expect=remote_commit)
+    hit = cache.get(repo_full, scope, tree_oid=tree_oid)   # new commit, same tree
+    if hit is not None:
+        cache.note_commit(repo_full, scope, tree_oid, commit_oid)
+        cache.hits += 1
+        return hit, None
+    cache.misses += 1
+    return None, (commit_oid, tree_oid)
+
+
+def count_mirror_tree(repo_full: str, commit_oid: str, tree_oid: str,
+                      include_langs: Optional[Iterable[str]] = None, workers: Optional[int] = None) -> dict:
+    """CPU half of count_repo_sloc(): count a tree from the mirror's objects and store it."""
+    cache = get_sloc_cache()
+    with get_mirror_cache().using(repo_full) as git_dir:
+        cloc_data = count_tree(git_dir, tree_oid, memo=cache, include_langs=include_langs, workers=workers)
+    cache.put(repo_full, sloc_scope(include_langs), tree_oid, commit_oid, cloc_data)
+    return cloc_data
+
+
+def count_repo_sloc(repo_full: str, include_langs: Optional[Iterable[str]] = None,
+                    head: Optional[Dict] = None) -> dict:
+    """
+    cloc-shaped counts for the default branch of 'owner/repo'. Served from the
+    cache when the HEAD tree is unchanged; otherwise counted from the git
+    mirror's objects (only subtrees not seen before are read) and stored.
+    """
+    hit, pending = resolve_repo_sloc(repo_full, include_langs, head)
+    if hit is not None:
+        return hit
+    return count_mirror_tree(repo_full, *pending, include_langs=include_langs)
+
+
+def iter_repo_sloc(slugs: List[str], include_langs: Optional[Iterable[str]] = None,
+                   heads: Optional[Dict[str, Dict]] = None) -> Iterator[Tuple[str, Optional[dict], Optional[BaseException]]]:
+    """
+    count_repo_sloc() for many repos through pipeline.py: cache lookups and
+    mirror syncs on threads, tree counting on a process pool (one process per
+    repo, counting in-process). Yields (slug, cloc_data, error) as repos finish.
+    """
+    heads = heads or {}
+    include = sorted(include_langs) if include_langs else None
+
+    def fetch(slug: str):
+        hit, pending = resolve_repo_sloc(slug, include, heads.get(slug))
+        return Done(hit) if hit is not None else (slug, *pending, include, 1)
+
+    yield from run_pipeline(slugs, fetch, count_mirror_tree)
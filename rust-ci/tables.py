@@ -0,0 +1,182 @@
+"""
+Typed handoff tables between the collectors and the analysis scripts.
+
+Every stage wrote CSV and the next one re-parsed it with `pd.read_csv`,
+re-coercing each column (`pd.to_numeric(errors="coerce")`, `norm_yes_no`)
+in every script that touched it. The collectors now write through
+write_table(), which always writes the CSV (several downstream scripts and
+helper_create_cohorts.py still read it) and can also emit a typed Parquet
+file next to it (same path, `.parquet` suffix), typed by the SCHEMAS below:
+counts as nullable integers, Yes/No flags as booleans, dates as UTC
+timestamps.
+
+The analysis scripts read through read_table(path, columns=[...]). It
+prefers the Parquet sibling of `path` when one exists and is not older than
+the CSV, and reads only the requested columns. Otherwise it reads the CSV
+(only those columns) and applies the same schema, so callers get the same
+dtypes from either format. Requested columns missing from a file are
+skipped, as with a full read.
+
+Env:
+  DATA_FORMAT=csv|parquet|both   (default: csv; parquet and both write CSV + Parquet; Parquet needs pyarrow)
+
+Usage:
+  write_table(rows, "data/22_long_builds_monoglot.csv", "long_builds", fieldnames=FIELDS)
+  df = read_table("data/22_long_builds_monoglot.csv", ["name", "Avg Duration (min)"], "long_builds")
+"""
+
+import os
+import csv
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - CSV only
+    pq = None
+
+# Column kinds: str, int (nullable), float, bool (Yes/No), date / datetime (UTC timestamps)
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    # 19_collect_rust_sloc.py
+    "rust_sloc": {"name": "str", "SLOC": "int", "Category": "str", "Languages": "str"},
+    # 29_*, 29a_*, repo_metrics.py: per-repo language summary (the "sizes" file)
+    "sloc_summary": {
+        "name": "str", "repo": "str", "total_sloc": "int", "rust_sloc": "int", "rust_share_pct": "float",
+        "num_langs": "int", "top_langs": "str", "languages_json": "str",
+    },
+    "sloc_by_language": {"name": "str", "repo": "str", "language": "str", "sloc": "int"},
+    # 20_ci_theater_commit_frequency_rust.py, repo_metrics.py
+    "commit_freq": {
+        "name": "str", "Last Commit Date": "date", "Total Commits (since inception)": "int",
+        "Avg_Commits_Weekday": "float",
+    },
+    # 22_ci_theater_long_builds_rust.py
+    "long_builds": {
+        "name": "str", "Avg Duration (min)": "float", "Max Duration (min)": "float",
+        "Long Builds >10min": "str", "Runs Counted": "int",
+    },
+    # 23_github_project_statistics_rust.py
+    "github_stats": {
+        "Project": "str", "Repo URL": "str", "Created At": "datetime", "First CI Run Date": "date",
+        "Time to First CI (months)": "float", "Active Period (months)": "float",
+        "Total PRs": "int", "Total Issues": "int", "Contributors": "int",
+        "Workflows Used": "str", "Workflow Runs (Success)": "int", "Workflow Runs (Failure)": "int",
+    },
+    # 24_1_ci_theater_coverage_rust.py
+    "coverage": {
+        "name": "str", "Has Tests (static)": "bool", "Tests in CI (configured)": "bool",
+        "Tests in CI (recent runs)": "bool", "Coverage in CI (configured)": "bool",
+        "Coverage Tool (configured)": "str", "Test Tool (guess)": "str", "Test Evidence": "str",
+        "Coverage Latest (%)": "float", "Coverage Mean (%)": "float", "Coverage Best (%)": "float",
+        "Coverage Samples": "int", "Method": "str", "Latest Run ID": "int", "Latest Run Date": "datetime",
+    },
+    # 28_ci_theater_broken_builds_rust_new.py
+    "broken_builds": {
+        "name": "str", "Runs Analyzed": "int", "Number of Broken Builds": "int",
+        "First Quartile": "float", "Mean Duration": "float", "Third Quartile": "float",
+    },
+    # 31_collect_bug_issues.py, 31_ci_bug_issues_count.py
+    "bugs": {"Project": "str", "Bug Issues Before CI": "int", "Bug Issues After CI": "int"},
+}
+
+_YES_NO = {"yes": True, "true": True, "no": False, "false": False}
+
+
+def data_format() -> str:
+    """DATA_FORMAT, downgraded to csv (with a warning) when pyarrow is missing."""
+    fmt = os.getenv("DATA_FORMAT", "csv").strip().lower()
+    if fmt not in ("csv", "parquet", "both"):
+        return "csv"
+    if fmt != "csv" and pq is None:
+        print("⚠️ DATA_FORMAT asks for Parquet but pyarrow is not installed; writing CSV only")
+        return "csv"
+    return fmt
+
+
+def parquet_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def coerce(df: pd.DataFrame, schema: Optional[str]) -> pd.DataFrame:
+    """Cast the schema's columns that are present (unparseable values become missing)."""
+    for col, kind in SCHEMAS.get(schema or "", {}).items():
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if kind == "int":
+            df[col] = pd.to_numeric(s, errors="coerce").round().astype("Int64")
+        elif kind == "float":
+            df[col] = pd.to_numeric(s, errors="coerce").astype("float64")
+        elif kind == "bool":
+            if s.dtype != "boolean":
+                s = s.astype("string").str.strip().str.lower().map(_YES_NO)
+            df[col] = s.astype("boolean")
+        elif kind in ("date", "datetime"):
+            df[col] = pd.to_datetime(s, errors="coerce", utc=True)
+        else:
+            df[col] = s.astype("string")
+    return df
+
+
+def write_table(rows: Union[pd.DataFrame, Iterable[dict]], path: str, schema: Optional[str] = None,
+                fieldnames: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    Write rows as CSV at `path`, plus typed Parquet beside it unless
+    DATA_FORMAT is csv. Columns default to the schema's order. Returns the
+    paths written.
+    """
+    fmt = data_format()
+    if isinstance(rows, pd.DataFrame):
+        df = rows
+        fieldnames = list(fieldnames or df.columns)
+    else:
+        rows = list(rows)
+        fieldnames = list(fieldnames or SCHEMAS.get(schema, {}) or (rows[0].keys() if rows else []))
+        df = None
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if df is not None:
+        df.to_csv(path, columns=fieldnames, index=False)
+    else:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+    written = [path]
+    if fmt != "csv":
+        written.append(write_parquet(df if df is not None else rows, path, schema, fieldnames))
+    return written
+
+
+def write_parquet(rows: Union[pd.DataFrame, Iterable[dict]], path: str, schema: Optional[str] = None,
+                  fieldnames: Optional[Sequence[str]] = None) -> str:
+    """Typed Parquet beside `path` only (for collectors that stream their CSV); returns its path."""
+    if isinstance(rows, pd.DataFrame):
+        frame = rows[list(fieldnames or rows.columns)].copy()
+    else:
+        rows = list(rows)
+        frame = pd.DataFrame(rows, columns=list(fieldnames or SCHEMAS.get(schema, {})) or None)
+    out = parquet_path(path)
+    coerce(frame, schema).to_parquet(out, index=False)
+    return out
+
+
+def read_table(path: str, columns: Optional[Sequence[str]] = None, schema: Optional[str] = None) -> pd.DataFrame:
+    """
+    The table written for `path`: its Parquet sibling when present and not
+    older than the CSV, else the CSV. Only `columns` are read (all if None).
+    Raises FileNotFoundError (with the CSV path) if neither exists.
+    """
+    pq_file = path if path.endswith(".parquet") else parquet_path(path)
+    use_parquet = pq is not None and os.path.exists(pq_file) and (
+        pq_file == path or not os.path.exists(path) or os.path.getmtime(pq_file) >= os.path.getmtime(path))
+    if use_parquet:
+        if columns is not None:
+            available = set(pq.read_schema(pq_file).names)
+            columns = [c for c in columns if c in available]
+        return coerce(pd.read_parquet(pq_file, columns=columns), schema)
+    if not os.path.exists(path):
+        raise FileNotFoundError(2, "No such file", path)
+    wanted = set(columns) if columns is not None else None
+    df = pd.read_csv(path, usecols=(lambda c: c in wanted) if wanted is not None else None)
+    return coerce(df, schema)
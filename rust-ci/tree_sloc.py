@@ -0,0 +1,227 @@
+"""
+Incremental SLOC counting straight from git tree objects.
+
+A git tree OID names the exact content of a directory, recursively, so the
+counts of a subtree never change once computed. count_tree() walks a commit's
+tree in the bare mirror through one long-lived `git cat-file --batch`
+process (no checkout), and memoizes every subtree it computes by tree OID:
+
+  - subtrees whose OID is already memoized are not read at all;
+  - only blobs in changed directories are fetched and counted;
+  - a refresh of a big repo touches the changed files plus their ancestor
+    trees, not the whole checkout.
+
+A subtree's memo is the table of its unique (blob oid, language) files with
+their blank / comment / code counts, as a packed NumPy record array, so the
+parent combines children by concatenation and de-duplicates identical files
+the way count_sloc() does. Tree OIDs are content hashes, so memo entries are
+shared across repos (forks, vendored copies) and across runs. Entries are
+keyed by sloc_counter.COUNTER_VERSION.
+
+Usage:
+  with get_mirror_cache().using("owner/repo") as git_dir:
+      cloc_data = count_tree(git_dir, tree_oid, memo=get_sloc_cache())
+"""
+
+import time
+import subprocess
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from sloc_counter import (
+    LANG_IDS, LANG_NAMES, MAX_FILE_BYTES,
+    cloc_result, count_blobs, language_for_name, may_have_shebang, shebang_language,
+)
+
+ENTRY_DTYPE = np.dtype([
+    ("oid", "S20"), ("lang", "u1"), ("blank", "<u4"), ("comment", "<u4"), ("code", "<u4"),
+])
+TREE_MODE = b"40000"
+BLOB_MODES = {b"100644", b"100755", b"100664"}   # symlinks (120000) and submodules (160000) are skipped
+COUNT_BATCH_BYTES = 64 * 1024 * 1024             # blob bytes held in memory per counting round
+READ_CHUNK = 1 << 20
+
+
+class GitObjectReader:
+    """One `git cat-file --batch` process; read() returns (type, content)."""
+    def __init__(self, git_dir: str):
+        self.proc = subprocess.Popen(
+            ["git", "-C", git_dir, "cat-file", "--batch"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+
+    def read(self, oid: str, max_size: Optional[int] = None) -> Tuple[str, Optional[bytes]]:
+        """Object type and content; content is None if larger than max_size (skipped unread)."""
+        self.proc.stdin.write(oid.encode() + b"\n")
+        self.proc.stdin.flush()
+        header = self.proc.stdout.readline().split()
+        if len(header) != 3:
+            raise KeyError(f"git object {oid} missing from the mirror")
+        kind, size = header[1].decode(), int(header[2])
+        if max_size is not None and size > max_size:
+            left = size + 1
+            while left:
+                left -= len(self.proc.stdout.read(min(left, READ_CHUNK)))
+            return kind, None
+        data = self.proc.stdout.read(size)
+        self.proc.stdout.read(1)   # trailing newline
+        return kind, data
+
+    def close(self) -> None:
+        self.proc.stdin.close()
+        self.proc.wait()
+        self.proc.stdout.close()
+
+    def __enter__(self) -> "GitObjectReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def parse_tree(data: bytes) -> List[Tuple[bytes, str, bytes]]:
+    """(mode, name, 20-byte oid) for each entry of a raw tree object."""
+    out = []
+    i, n = 0, len(data)
+    while i < n:
+        sp = data.index(b" ", i)
+        nul = data.index(b"\x00", sp)
+        out.append((data[i:sp], data[sp + 1:nul].decode("utf-8", "surrogateescape"), data[nul + 1:nul + 21]))
+        i = nul + 21
+    return out
+
+
+def _unique(entries: np.ndarray) -> np.ndarray:
+    if len(entries) < 2:
+        return entries
+    _keys, idx = np.unique(entries[["oid", "lang"]], return_index=True)
+    return entries[np.sort(idx)]
+
+
+class _TreeWalk:
+    def __init__(self, reader: GitObjectReader, memo, workers: Optional[int] = None):
+        self.reader = reader
+        self.memo = memo
+        self.workers = workers
+        self.known: Dict[str, np.ndarray] = {}
+        self.pending: Dict[str, Tuple[List[str], List[Tuple[bytes, str]]]] = {}
+        self.shebangs: Dict[bytes, str] = {}   # extensionless blob -> language from its #! line
+        self.trees_read = 0
+        self.blobs_counted = 0
+
+    def plan(self, root: str) -> None:
+        """Read every tree not yet memoized (memoized subtrees are not descended into)."""
+        stack = [root]
+        while stack:
+            oid = stack.pop()
+            if oid in self.known or oid in self.pending:
+                continue
+            cached = self.memo.get_subtree(oid) if self.memo is not None else None
+            if cached is not None:
+                self.known[oid] = np.frombuffer(cached, dtype=ENTRY_DTYPE)
+                continue
+            _kind, data = self.reader.read(oid)
+            self.trees_read += 1
+            children, files = [], []
+            for mode, name, raw in parse_tree(data):
+                if mode == TREE_MODE:
+                    children.append(raw.hex())
+                elif mode in BLOB_MODES and (language_for_name(name) or may_have_shebang(name)):
+                    files.append((raw, name))
+            stack.extend(children)
+            self.pending[oid] = (children, files)
+
+    def count_blobs(self) -> Dict[Tuple[bytes, str], Tuple[int, int, int]]:
+        """Counts for every (blob, language) in the pending trees, reading blobs in bounded rounds."""
+        wanted: Dict[bytes, Set[Optional[str]]] = {}
+        for _children, files in self.pending.values():
+            for raw, name in files:
+                wanted.setdefault(raw, set()).add(language_for_name(name))
+        results: Dict[Tuple[bytes, str], Tuple[int, int, int]] = {}
+        items: List[Tuple[bytes, str]] = []
+        keys: List[Tuple[bytes, str]] = []
+        held = 0
+
+        def flush():
+            for key, counts in zip(keys, count_blobs(items, self.workers)):
+                if counts is not None:
+                    results[key] = counts
+            items.clear()
+            keys.clear()
+
+        for raw, langs in wanted.items():
+            _kind, data = self.reader.read(raw.hex(), max_size=MAX_FILE_BYTES)
+            if data is None:
+                continue
+            for lang in langs:
+                if lang is None:   # extensionless file
+                    lang = shebang_language(data[:256])
+                    if lang is None:
+                        continue
+                    self.shebangs[raw] = lang
+                items.append((data, lang))
+                keys.append((raw, lang))
+            held += len(data)
+            if held >= COUNT_BATCH_BYTES:
+                flush()
+                held = 0
+        flush()
+        self.blobs_counted += len(results)
+        return results
+
+    def build(self, oid: str, counts: Dict[Tuple[bytes, str], Tuple[int, int, int]],
+              new: Dict[str, bytes]) -> np.ndarray:
+        """Entries of a subtree, children first; newly built subtrees are collected in `new`."""
+        if oid in self.known:
+            return self.known[oid]
+        children, files = self.pending[oid]
+        parts = [self.build(child, counts, new) for child in children]
+        own = []
+        for raw, name in files:
+            lang = language_for_name(name) or self.shebangs.get(raw)
+            c = counts.get((raw, lang)) if lang else None
+            if c is not None:
+                own.append((raw, LANG_IDS[lang], *c))
+        parts.append(np.array(own, dtype=ENTRY_DTYPE))
+        entries = _unique(np.concatenate(parts))
+        self.known[oid] = entries
+        new[oid] = entries.tobytes()
+        return entries
+
+
+def count_tree(git_dir: str, tree_oid: str, memo=None,
+               include_langs: Optional[Iterable[str]] = None, workers: Optional[int] = None) -> dict:
+    """
+    cloc --json shaped counts for a tree in `git_dir`. `memo` (e.g. SlocCache)
+    provides get_subtree(oid) -> bytes | None and put_subtrees({oid: bytes}).
+    `workers=1` counts in this process (e.g. inside a pipeline.py worker).
+    """
+    start = time.time()
+    new: Dict[str, bytes] = {}
+    with GitObjectReader(git_dir) as reader:
+        walk = _TreeWalk(reader, memo, workers)
+        walk.plan(tree_oid)
+        counts = walk.count_blobs() if walk.pending else {}
+        entries = walk.build(tree_oid, counts, new)
+    if memo is not None and new:
+        memo.put_subtrees(new)
+
+    if include_langs:
+        wanted = np.array([LANG_IDS[l] for l in include_langs if l in LANG_IDS], dtype=np.uint8)
+        entries = entries[np.isin(entries["lang"], wanted)]
+    n = len(LANG_NAMES)
+    files = np.bincount(entries["lang"], minlength=n)
+    sums = {k: np.bincount(entries["lang"], weights=entries[k], minlength=n) for k in ("blank", "comment", "code")}
+    langs = {
+        LANG_NAMES[i]: {
+            "nFiles": int(files[i]),
+            "blank": int(sums["blank"][i]),
+            "comment": int(sums["comment"][i]),
+            "code": int(sums["code"][i]),
+        }
+        for i in np.nonzero(files)[0]
+    }
+    result = cloc_result(langs, time.time() - start, counter="tree_sloc")
+    result["header"].update({"trees_read": walk.trees_read, "blobs_counted": walk.blobs_counted})
+    return result